@@ -0,0 +1,201 @@
+""" CrashTrakr is a test data retrieval tool built to work together 
+    with Jenkins test automation projects.
+    Copyright (C) 2017 Cosmin Ștefănică
+
+    Permission is hereby granted, free of charge, to any person obtaining a copy
+    of this software and associated documentation files (the "Software"), to deal
+    in the Software without restriction, including without limitation the rights
+    to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+    copies of the Software, and to permit persons to whom the Software is
+    furnished to do so, subject to the following conditions:
+
+    The above copyright notice and this permission notice shall be included in all
+    copies or substantial portions of the Software.
+
+    THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+    IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+    FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+    AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+    LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+    OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+    SOFTWARE.
+"""
+
+import numpy
+import CrashTrakr_config
+import CrashTrakr_series
+
+def getFailRates(test_data):
+    """Gets the fail rate of every build of a series, failed / completed tests,
+    with NaN for builds saved without results.
+
+    Args:
+        test_data: The BuildSeries to analyze.
+    """
+
+    total = test_data.values("total").astype(numpy.float64)
+    failed = test_data.values("failed").astype(numpy.float64)
+    fail_rates = numpy.full(len(total), numpy.nan)
+    known = total > 0
+    fail_rates[known] = failed[known] / total[known]
+    return fail_rates
+
+def getRollingSums(values, window):
+    """Gets the sum, sum of squares and count of the known values in the 
+    window ending just before every position, from cumulative sums.
+
+    Args:
+        values: Array of values, NaN for unknown ones.
+        window: How many positions every window covers.
+
+    Returns:
+        (sums, squares, counts) arrays with one entry per position.
+    """
+
+    known = ~numpy.isnan(values)
+    filled = numpy.where(known, values, 0.0)
+    cumulative_sums = numpy.concatenate(([0.0], numpy.cumsum(filled)))
+    cumulative_squares = numpy.concatenate(([0.0], numpy.cumsum(filled * filled)))
+    cumulative_counts = numpy.concatenate(([0], numpy.cumsum(known)))
+
+    ends = numpy.arange(len(values))
+    starts = numpy.maximum(ends - window, 0)
+    return (cumulative_sums[ends] - cumulative_sums[starts],
+            cumulative_squares[ends] - cumulative_squares[starts],
+            cumulative_counts[ends] - cumulative_counts[starts])
+
+def findChangePoint(fail_rates):
+    """Finds the position where the mean fail rate shifts the most, comparing
+    the builds before and after every possible split in a single pass.
+
+    Args:
+        fail_rates: Array of fail rates, NaN for builds without results.
+
+    Returns:
+        (position, score, shift) where position is the first build after the
+        split, score is the shift weighted by how many builds back it on both
+        sides, and shift is the difference of the means. (None, 0.0, 0.0) if
+        there are too few builds to split.
+    """
+
+    known_rates = fail_rates[~numpy.isnan(fail_rates)]
+    positions = numpy.flatnonzero(~numpy.isnan(fail_rates))
+    count = len(known_rates)
+    if count < 4:
+        return None, 0.0, 0.0
+
+    cumulative_sums = numpy.cumsum(known_rates)
+    left_counts = numpy.arange(1, count)
+    right_counts = count - left_counts
+    left_means = cumulative_sums[:-1] / left_counts
+    right_means = (cumulative_sums[-1] - cumulative_sums[:-1]) / right_counts
+    shifts = right_means - left_means
+    scores = numpy.abs(shifts) * numpy.sqrt(left_counts * right_counts / count)
+
+    best = int(numpy.argmax(scores))
+    return int(positions[best + 1]), float(scores[best]), float(shifts[best])
+
+def analyzeSeries(test_data, window=20, spike_threshold=3.0, fail_threshold=100):
+    """Analyzes the history of a project in one vectorized pass.
+
+    Args:
+        test_data: The BuildSeries to analyze, oldest build first.
+        window: How many earlier builds the rolling fail rate and the spike
+            detection compare every build with.
+        spike_threshold: How many standard deviations above the rolling mean a
+            fail rate has to be to count as a spike.
+        fail_threshold: How many more failed tests than the previous build 
+            with results count as a regression on their own.
+
+    Returns:
+        A dictionary with the last build and its fail rate, the rolling fail 
+        rate and z-score of the last build, the builds that spiked, the build
+        where the mean fail rate shifted the most and by how much, the trend of
+        the fail rate per 100 builds, and whether the last build looks like a 
+        regression.
+    """
+
+    builds = test_data.values("build")
+    failed = test_data.values("failed")
+    fail_rates = getFailRates(test_data)
+    known = ~numpy.isnan(fail_rates)
+
+    summary = {"last_build": int(builds[-1]) if len(builds) else None,
+               "last_fail_rate": None,
+               "rolling_fail_rate": None,
+               "z_score": None,
+               "spikes": [],
+               "change_point": None,
+               "change_shift": 0.0,
+               "trend_per_100_builds": 0.0,
+               "regression": False}
+    if not known.any():
+        return summary
+
+    sums, squares, counts = getRollingSums(fail_rates, window)
+    with numpy.errstate(divide="ignore", invalid="ignore"):
+        rolling_means = sums / counts
+        rolling_deviations = numpy.sqrt(numpy.maximum(squares / counts - rolling_means * rolling_means, 0.0))
+        z_scores = (fail_rates - rolling_means) / rolling_deviations
+    z_scores[(counts < 2) | ~known] = numpy.nan
+    steady = known & (counts >= 2) & (rolling_deviations == 0)
+    z_scores[steady] = numpy.where(fail_rates[steady] > rolling_means[steady], numpy.inf, 0.0)
+    spikes = numpy.flatnonzero(z_scores >= spike_threshold)
+
+    known_positions = numpy.flatnonzero(known)
+    last = known_positions[-1]
+    if len(known_positions) >= 2:
+        slope = numpy.polyfit(builds[known_positions].astype(numpy.float64), fail_rates[known_positions], 1)[0]
+    else:
+        slope = 0.0
+    change_position, change_score, change_shift = findChangePoint(fail_rates)
+
+    failed_increase = 0
+    if len(known_positions) >= 2:
+        failed_increase = int(failed[last]) - int(failed[known_positions[-2]])
+
+    summary["last_build"] = int(builds[last])
+    summary["last_fail_rate"] = float(fail_rates[last])
+    summary["rolling_fail_rate"] = float(rolling_means[last]) if counts[last] else None
+    summary["z_score"] = None if numpy.isnan(z_scores[last]) else float(z_scores[last])
+    summary["spikes"] = [int(build) for build in builds[spikes]]
+    summary["change_point"] = int(builds[change_position]) if change_position is not None else None
+    summary["change_shift"] = change_shift
+    summary["trend_per_100_builds"] = float(slope * 100)
+    summary["regression"] = bool(z_scores[last] >= spike_threshold or failed_increase > fail_threshold)
+    return summary
+
+def analyzeProject(project_code, window=None, spike_threshold=None, fail_threshold=100):
+    """Analyzes the saved history of a project. See analyzeSeries.
+
+    Args:
+        project_code: The internal code to the project we wish to analyze.
+        window: Defaults to the AnalysisWindow setting of the project.
+        spike_threshold: Defaults to the SpikeThreshold setting of the project.
+        fail_threshold: See analyzeSeries.
+    """
+
+    registry = CrashTrakr_config.getRegistry()
+    if window is None:
+        window = int(registry.getProjectSetting(project_code, "AnalysisWindow", 20))
+    if spike_threshold is None:
+        spike_threshold = float(registry.getProjectSetting(project_code, "SpikeThreshold", 3.0))
+    history_builds = int(registry.getProjectSetting(project_code, "AnalysisHistory", 1000))
+
+    test_data = CrashTrakr_series.getSeries(project_code, history_builds)
+    return analyzeSeries(test_data, window, spike_threshold, fail_threshold)
+
+def analyzeProjects(project_codes=None):
+    """Analyzes the saved history of many projects.
+
+    Args:
+        project_codes: The internal codes to the projects we wish to analyze.
+            Defaults to every configured project.
+
+    Returns:
+        A dictionary of project codes and analyzeProject summaries.
+    """
+
+    if project_codes is None:
+        project_codes = CrashTrakr_config.getRegistry().getProjectCodes()
+    return {project_code: analyzeProject(project_code) for project_code in project_codes}
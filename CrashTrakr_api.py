@@ -0,0 +1,256 @@
+""" CrashTrakr is a test data retrieval tool built to work together 
+    with Jenkins test automation projects.
+    Copyright (C) 2017 Cosmin Ștefănică
+
+    Permission is hereby granted, free of charge, to any person obtaining a copy
+    of this software and associated documentation files (the "Software"), to deal
+    in the Software without restriction, including without limitation the rights
+    to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+    copies of the Software, and to permit persons to whom the Software is
+    furnished to do so, subject to the following conditions:
+
+    The above copyright notice and this permission notice shall be included in all
+    copies or substantial portions of the Software.
+
+    THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+    IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+    FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+    AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+    LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+    OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+    SOFTWARE.
+"""
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib import parse
+import json
+import threading
+import CrashTrakr_config
+import CrashTrakr_metrics
+import CrashTrakr_store
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+BUILD_FIELDS = ("build", "total", "failed", "skipped", "duration")
+
+class ResponseCache:
+    """Keeps encoded responses in memory, each tagged with the revision of the
+    project history it was built from. A cached response is only served while
+    the revision is unchanged, so any write to the history invalidates it."""
+
+    def __init__(self, max_entries=1024):
+        """
+        Args:
+            max_entries: How many responses are kept before the cache is 
+                cleared.
+        """
+
+        self.max_entries = max_entries
+        self.entries = {}
+        self.lock = threading.Lock()
+
+    def get(self, key, revision):
+        """Gets a cached response, None if it is missing or out of date."""
+
+        with self.lock:
+            entry = self.entries.get(key)
+        if entry is not None and entry[0] == revision:
+            return entry[1]
+        return None
+
+    def put(self, key, revision, body):
+        """Caches a response built from the given revision."""
+
+        with self.lock:
+            if len(self.entries) >= self.max_entries:
+                self.entries.clear()
+            self.entries[key] = (revision, body)
+
+_cache = ResponseCache()
+
+class QueryError(Exception):
+    """Raised for a request that cannot be answered, with the HTTP status to
+    answer it with."""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+def getIntegerParameter(query, name, default=None, minimum=None, maximum=None):
+    """Reads an integer query string parameter.
+
+    Args:
+        query: The parsed query string.
+        name: The name of the parameter.
+        default: The value used when the parameter is missing.
+        minimum: The smallest value allowed.
+        maximum: Values above this are lowered to it.
+
+    Raises:
+        QueryError: If the parameter is not an integer or is too small.
+    """
+
+    if name not in query:
+        return default
+    try:
+        value = int(query[name][-1])
+    except ValueError:
+        raise QueryError(400, "Parameter '{0}' must be an integer".format(name))
+    if minimum is not None and value < minimum:
+        raise QueryError(400, "Parameter '{0}' must be at least {1}".format(name, minimum))
+    if maximum is not None:
+        value = min(value, maximum)
+    return value
+
+def checkProject(project_code):
+    """Raises a 404 QueryError if the project code is not configured."""
+
+    if project_code not in CrashTrakr_config.getRegistry().getProjectCodes():
+        raise QueryError(404, "Project code '{0}' is unknown".format(project_code))
+
+def queryProjects():
+    """Answers /projects with every configured project and its last saved 
+    build."""
+
+    return {"projects": [{"code": project_code,
+                          "last_build": CrashTrakr_store.lastBuildNumber(project_code),
+                          "builds": "/projects/{0}/builds".format(parse.quote(project_code)),
+                          "summary": "/projects/{0}/summary".format(parse.quote(project_code))}
+                         for project_code in CrashTrakr_config.getRegistry().getProjectCodes()]}
+
+def queryBuilds(project_code, query):
+    """Answers /projects/<code>/builds with a page of saved builds, newest 
+    first. The next page starts below the oldest build of this one, and its
+    link is given in "next".
+
+    Args:
+        project_code: The internal code to the project we wish to read.
+        query: The parsed query string, with optional from, to and limit.
+    """
+
+    first_build = getIntegerParameter(query, "from")
+    last_build = getIntegerParameter(query, "to")
+    limit = getIntegerParameter(query, "limit", DEFAULT_PAGE_SIZE, 1, MAX_PAGE_SIZE)
+
+    rows = CrashTrakr_store.readBuilds(project_code, first_build, last_build, limit + 1)
+    next_link = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_query = {"to": rows[-1][0] - 1, "limit": limit}
+        if first_build is not None:
+            next_query["from"] = first_build
+        next_link = "/projects/{0}/builds?{1}".format(parse.quote(project_code), parse.urlencode(next_query))
+
+    return {"project": project_code,
+            "builds": [dict(zip(BUILD_FIELDS, row)) for row in rows],
+            "next": next_link}
+
+def querySummary(project_code):
+    """Answers /projects/<code>/summary with summary statistics of the whole
+    history and the results of the last saved build."""
+
+    summary = CrashTrakr_store.summarizeBuilds(project_code)
+    last_rows = CrashTrakr_store.readBuilds(project_code, limit=1)
+    summary["project"] = project_code
+    summary["last_result"] = dict(zip(BUILD_FIELDS, last_rows[0])) if last_rows else None
+    return summary
+
+def answerQuery(path):
+    """Answers a GET request, from the cache when the history it was built from
+    did not change since.
+
+    Args:
+        path: The request path, with its query string.
+
+    Returns:
+        The encoded JSON response.
+
+    Raises:
+        QueryError: If the request cannot be answered.
+    """
+
+    parts = parse.urlsplit(path)
+    segments = [parse.unquote(segment) for segment in parts.path.strip("/").split("/")]
+    query = parse.parse_qs(parts.query)
+
+    if segments == ["projects"]:
+        project_codes = CrashTrakr_config.getRegistry().getProjectCodes()
+        revision = tuple(CrashTrakr_store.getRevision(project_code) for project_code in project_codes)
+        answer = queryProjects
+    elif len(segments) == 3 and segments[0] == "projects" and segments[2] in ("builds", "summary"):
+        project_code = segments[1]
+        checkProject(project_code)
+        revision = CrashTrakr_store.getRevision(project_code)
+        if segments[2] == "builds":
+            answer = lambda: queryBuilds(project_code, query)
+        else:
+            answer = lambda: querySummary(project_code)
+    else:
+        raise QueryError(404, "Unknown path '{0}'".format(parts.path))
+
+    body = _cache.get(path, revision)
+    if body is None:
+        body = json.dumps(answer()).encode("utf-8")
+        _cache.put(path, revision, body)
+    return body
+
+class QueryHandler(BaseHTTPRequestHandler):
+    """Serves the read-only query API. Only GET requests are accepted. Every
+    request runs on a thread of its own, which borrows a history store 
+    connection from the shared pool."""
+
+    def do_GET(self):
+        if parse.urlsplit(self.path).path.rstrip("/") == "/metrics":
+            self.sendBody(200, CrashTrakr_metrics.renderMetrics().encode("utf-8"), "text/plain; version=0.0.4")
+            return
+        try:
+            with CrashTrakr_store.pooledConnection():
+                status, body = 200, answerQuery(self.path)
+        except QueryError as error:
+            status, body = error.status, json.dumps({"error": str(error)}).encode("utf-8")
+        self.sendBody(status, body)
+
+    def do_POST(self):
+        self.sendBody(405, json.dumps({"error": "The query API is read-only"}).encode("utf-8"))
+
+    do_PUT = do_POST
+    do_DELETE = do_POST
+
+    def sendBody(self, status, body, content_type="application/json"):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def startApiServer(host="127.0.0.1", port=8080):
+    """Starts the query API on a background thread.
+
+    Args:
+        host: The address to listen on.
+        port: The port to listen on. 0 picks a free port.
+
+    Returns:
+        The running server. Its server_address holds the port in use, and 
+        shutdown() stops it.
+    """
+
+    server = ThreadingHTTPServer((host, port), QueryHandler)
+    threading.Thread(target=server.serve_forever, name="CrashTrakr query API", daemon=True).start()
+    return server
+
+def main():
+    api_settings = (CrashTrakr_config.getRegistry().getConfig() or {}).get("Api", {})
+    server = ThreadingHTTPServer((api_settings.get("Host", "127.0.0.1"), int(api_settings.get("Port", 8080))), 
+                                 QueryHandler)
+    print("Serving the CrashTrakr query API on http://{0}:{1}/projects".format(*server.server_address))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
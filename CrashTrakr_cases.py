@@ -0,0 +1,323 @@
+""" CrashTrakr is a test data retrieval tool built to work together 
+    with Jenkins test automation projects.
+    Copyright (C) 2017 Cosmin Ștefănică
+
+    Permission is hereby granted, free of charge, to any person obtaining a copy
+    of this software and associated documentation files (the "Software"), to deal
+    in the Software without restriction, including without limitation the rights
+    to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+    copies of the Software, and to permit persons to whom the Software is
+    furnished to do so, subject to the following conditions:
+
+    The above copyright notice and this permission notice shall be included in all
+    copies or substantial portions of the Software.
+
+    THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+    IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+    FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+    AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+    LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+    OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+    SOFTWARE.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import urllib.error
+import zlib
+import numpy
+import CrashTrakr_config
+import CrashTrakr_http
+import CrashTrakr_json
+import CrashTrakr_log
+import CrashTrakr_store
+
+FAILED_STATUSES = ("FAILED", "REGRESSION")
+SKIPPED_STATUSES = ("SKIPPED",)
+
+_case_ids = None
+_case_positions = {}
+_case_ids_lock = threading.Lock()
+
+def getCasesLink(project_code, build):
+    """Generates the link to the Jenkins REST API that lists the result of every
+    test case of a build.
+
+    Args:
+        project_code: The internal code to the project we wish to check.
+        build: The build number we wish to check.
+    """
+
+    project_link = CrashTrakr_config.getRegistry().getProjectLink(project_code)
+    if project_link is None:
+        raise ValueError("Project code is unknown!")
+    return project_link + str(build) + "/testReport/api/json?tree=suites%5Bcases%5BclassName,name,status%5D%5D"
+
+def getCaseIds(cases):
+    """Gets the integer IDs of test cases, adding the ones seen for the first
+    time to the case index. Every distinct class and test name is stored once,
+    however many builds and projects it shows up in. Cases another process 
+    added in the meantime are looked up instead of added again, and the cache
+    only learns the IDs of committed cases.
+
+    Args:
+        cases: (class name, test name) tuples.
+
+    Returns:
+        A list of IDs in the same order as cases.
+    """
+
+    global _case_ids
+    with _case_ids_lock:
+        connection = CrashTrakr_store.getConnection()
+        if _case_ids is None:
+            _case_ids = {(row[1], row[2]): row[0] for row in connection.execute("SELECT id, class_name, name FROM cases")}
+
+        new_cases = [case for case in dict.fromkeys(cases) if case not in _case_ids]
+        if new_cases:
+            with connection:
+                connection.executemany("INSERT OR IGNORE INTO cases (class_name, name) VALUES (?, ?)", new_cases)
+            new_case_ids = {}
+            for case in new_cases:
+                new_case_ids[case] = connection.execute("SELECT id FROM cases WHERE class_name = ? AND name = ?", case).fetchone()[0]
+            _case_ids.update(new_case_ids)
+        return [_case_ids[case] for case in cases]
+
+def getCasePositions(project_code, case_ids):
+    """Gets the bit positions of test cases within a project, giving the cases
+    that run in the project for the first time the next free positions. The
+    positions of a project are numbered from 0 and only count its own cases,
+    so its bitsets do not grow with the cases of other projects.
+
+    Args:
+        project_code: The internal code to the project the cases ran in.
+        case_ids: The IDs of the cases, see getCaseIds.
+
+    Returns:
+        A list of positions in the same order as case_ids.
+    """
+
+    with _case_ids_lock:
+        connection = CrashTrakr_store.getConnection()
+        positions = _case_positions.get(project_code)
+        if positions is None:
+            positions = _case_positions[project_code] = dict(connection.execute("SELECT case_id, position FROM project_cases WHERE project = ?", 
+                                                                                (project_code,)))
+
+        new_case_ids = [case_id for case_id in dict.fromkeys(case_ids) if case_id not in positions]
+        if new_case_ids:
+            with connection:
+                connection.executemany("INSERT OR IGNORE INTO project_cases (project, position, case_id) "
+                                       "SELECT ?, COALESCE(MAX(position) + 1, 0), ? FROM project_cases WHERE project = ?",
+                                       [(project_code, case_id, project_code) for case_id in new_case_ids])
+            new_positions = {}
+            for case_id in new_case_ids:
+                new_positions[case_id] = connection.execute("SELECT position FROM project_cases WHERE project = ? AND case_id = ?", 
+                                                            (project_code, case_id)).fetchone()[0]
+            positions.update(new_positions)
+        return [positions[case_id] for case_id in case_ids]
+
+def getCaseNames(project_code, positions):
+    """Gets the (class name, test name) of case positions within a project.
+
+    Args:
+        project_code: The internal code to the project the cases ran in.
+        positions: The positions we wish to look up.
+
+    Returns:
+        A dictionary of positions and (class name, test name) tuples.
+    """
+
+    positions = [int(position) for position in positions]
+    connection = CrashTrakr_store.getConnection()
+    case_names = {}
+    for start in range(0, len(positions), 500):
+        chunk = positions[start:start + 500]
+        query = ("SELECT project_cases.position, cases.class_name, cases.name FROM project_cases "
+                 "JOIN cases ON cases.id = project_cases.case_id "
+                 "WHERE project_cases.project = ? AND project_cases.position IN ({0})").format(",".join("?" * len(chunk)))
+        for row in connection.execute(query, [project_code] + chunk):
+            case_names[row[0]] = (row[1], row[2])
+    return case_names
+
+def packBits(positions, size):
+    """Packs case positions into a compressed bitset with one bit per 
+    position."""
+
+    bits = bytearray((size + 7) // 8)
+    for position in positions:
+        bits[position >> 3] |= 0x80 >> (position & 7)
+    return zlib.compress(bytes(bits))
+
+def saveTestCases(project_code, build, cases):
+    """Saves the result of every test case of a build as three bitsets over the
+    case positions of the project: the cases that ran, failed and were skipped.
+
+    Args:
+        project_code: The internal code to the project we wish to save data for.
+        build: The build number.
+        cases: (class name, test name, status) tuples, with the Jenkins case
+            status, e.g.: PASSED, FAILED, SKIPPED, FIXED, REGRESSION
+    """
+
+    positions = getCasePositions(project_code, getCaseIds([(case[0], case[1]) for case in cases]))
+    size = max(positions) + 1 if positions else 0
+    failed_positions = [position for position, case in zip(positions, cases) if case[2] in FAILED_STATUSES]
+    skipped_positions = [position for position, case in zip(positions, cases) if case[2] in SKIPPED_STATUSES]
+
+    connection = CrashTrakr_store.getConnection()
+    with connection:
+        connection.execute("INSERT OR REPLACE INTO case_runs (project, build, present, failed, skipped) VALUES (?, ?, ?, ?, ?)",
+                           (project_code, build, packBits(positions, size), packBits(failed_positions, size), packBits(skipped_positions, size)))
+        CrashTrakr_store.updateRevision(connection, project_code)
+
+def fetchTestCases(project_code, build):
+    """Gets the result of every test case of a build from the REST API.
+
+    Args:
+        project_code: The internal code to the project we wish to check.
+        build: The build number we wish to check.
+
+    Returns:
+        A list of (class name, test name, status) tuples, None if the request
+        failed.
+    """
+
+    try:
+        api_data = CrashTrakr_http.getClient(CrashTrakr_config.getRegistry().getProjectServer(project_code)).get(getCasesLink(project_code, build), conditional=False)
+    except urllib.error.HTTPError as HTTP_Error:
+        CrashTrakr_log.log("Error fetching {0} build {1} test cases: {2}: {3}".format(project_code, build, HTTP_Error.code, HTTP_Error.reason),
+                           project_code,
+                           "HTTP Error")
+        return None
+    except urllib.error.URLError as URL_Error:
+        CrashTrakr_log.log("Error fetching {0} build {1} test cases. {2}".format(project_code, build, URL_Error.reason),
+                           project_code,
+                           "URL Error")
+        return None
+
+    return [(case["className"], case["name"], case["status"])
+            for case in CrashTrakr_json.iterJsonItems(api_data, "suites.item.cases.item")]
+
+def ingestTestCases(project_code, build_numbers, workers=None):
+    """Fetches and saves the test case results of many builds, fetching in
+    parallel and saving in build order.
+
+    Args:
+        project_code: The internal code to the project we wish to save data for.
+        build_numbers: The build numbers we wish to save.
+        workers: How many requests are sent at the same time. Defaults to the
+            Workers setting.
+
+    Returns:
+        How many builds were saved.
+    """
+
+    if workers is None:
+        workers = int(CrashTrakr_config.getRegistry().getProjectSetting(project_code, "Workers", 8))
+
+    build_numbers = list(build_numbers)
+    saved_builds = 0
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        for build, cases in zip(build_numbers, executor.map(lambda build: fetchTestCases(project_code, build), build_numbers)):
+            if cases is not None:
+                saveTestCases(project_code, build, cases)
+                saved_builds = saved_builds + 1
+    CrashTrakr_log.log("Saved test cases of {0} builds".format(saved_builds), project_code)
+    return saved_builds
+
+def loadCaseMatrix(project_code, first_build=None, last_build=None, limit=None):
+    """Loads the test case results of a range of builds as boolean matrices with
+    one row per build, oldest first, and one column per case position of the
+    project up to the highest position that ran in one of the loaded builds.
+
+    Args:
+        project_code: The internal code to the project we wish to load data for.
+        first_build: The oldest build number to load. None loads from the start.
+        last_build: The newest build number to load. None loads to the end.
+        limit: The maximum number of builds to load, counted from the newest.
+
+    Returns:
+        (builds, present, failed, skipped) where builds is an array of build
+        numbers and the others are boolean matrices.
+    """
+
+    query = "SELECT build, present, failed, skipped FROM case_runs WHERE project = ?"
+    parameters = [project_code]
+    if first_build is not None:
+        query = query + " AND build >= ?"
+        parameters.append(first_build)
+    if last_build is not None:
+        query = query + " AND build <= ?"
+        parameters.append(last_build)
+    query = query + " ORDER BY build DESC"
+    if limit is not None:
+        query = query + " LIMIT ?"
+        parameters.append(limit)
+
+    rows = CrashTrakr_store.getConnection().execute(query, parameters).fetchall()
+    rows.reverse()
+    bitsets = [[zlib.decompress(blob) for blob in row[1:]] for row in rows]
+    size = max((len(bitset) for row in bitsets for bitset in row), default=0) * 8
+
+    builds = numpy.array([row[0] for row in rows], dtype=numpy.int64)
+    matrices = []
+    for column in range(3):
+        matrix = numpy.zeros((len(rows), size), dtype=bool)
+        for index, row in enumerate(bitsets):
+            bits = numpy.unpackbits(numpy.frombuffer(row[column], dtype=numpy.uint8))
+            matrix[index, :len(bits)] = bits
+        matrices.append(matrix)
+    return (builds,) + tuple(matrices)
+
+def findNewlyFailingCases(project_code, build=None, window=50):
+    """Finds the test cases that failed in a build after passing the previous
+    time they ran within the window of builds before it.
+
+    Args:
+        project_code: The internal code to the project we wish to check.
+        build: The build we wish to check. Defaults to the newest saved one.
+        window: How many of the newest builds up to build are checked.
+
+    Returns:
+        A sorted list of (class name, test name) tuples.
+    """
+
+    builds, present, failed, skipped = loadCaseMatrix(project_code, last_build=build, limit=window)
+    if len(builds) < 2:
+        return []
+
+    ran_before = present[:-1] & ~skipped[:-1]
+    last_ran = len(ran_before) - 1 - numpy.argmax(ran_before[::-1], axis=0)
+    passed_last_time = ran_before.any(axis=0) & ~failed[:-1][last_ran, numpy.arange(present.shape[1])]
+    newly_failing = numpy.flatnonzero(failed[-1] & passed_last_time)
+
+    case_names = getCaseNames(project_code, newly_failing)
+    return sorted(case_names[position] for position in newly_failing)
+
+def findFlakyCases(project_code, window=50, min_flips=3):
+    """Finds the test cases that keep flipping between passing and failing.
+
+    Args:
+        project_code: The internal code to the project we wish to check.
+        window: How many of the newest builds are checked.
+        min_flips: How many times a case has to flip to count as flaky.
+
+    Returns:
+        A list of (class name, test name, flips, failures) tuples, the most
+        flaky case first.
+    """
+
+    builds, present, failed, skipped = loadCaseMatrix(project_code, limit=window)
+    if len(builds) < 2:
+        return []
+
+    ran = present & ~skipped
+    ran_both = ran[1:] & ran[:-1]
+    flips = ((failed[1:] != failed[:-1]) & ran_both).sum(axis=0)
+    failures = (failed & ran).sum(axis=0)
+    flaky_cases = numpy.flatnonzero(flips >= min_flips)
+
+    case_names = getCaseNames(project_code, flaky_cases)
+    flaky = [case_names[position] + (int(flips[position]), int(failures[position])) for position in flaky_cases]
+    return sorted(flaky, key=lambda case: (-case[2], -case[3], case[0], case[1]))
@@ -0,0 +1,199 @@
+""" CrashTrakr is a test data retrieval tool built to work together 
+    with Jenkins test automation projects.
+    Copyright (C) 2017 Cosmin Ștefănică
+
+    Permission is hereby granted, free of charge, to any person obtaining a copy
+    of this software and associated documentation files (the "Software"), to deal
+    in the Software without restriction, including without limitation the rights
+    to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+    copies of the Software, and to permit persons to whom the Software is
+    furnished to do so, subject to the following conditions:
+
+    The above copyright notice and this permission notice shall be included in all
+    copies or substantial portions of the Software.
+
+    THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+    IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+    FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+    AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+    LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+    OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+    SOFTWARE.
+"""
+
+import argparse
+import sys
+
+def getProjectCodes(project_codes):
+    """Checks the project codes given on the command line, every configured
+    project when none were given.
+
+    Raises:
+        SystemExit: If the config file is missing or a code is unknown.
+    """
+
+    import CrashTrakr_config
+    registry = CrashTrakr_config.getRegistry()
+    if registry.getConfig() is None:
+        sys.exit("Config file {0} not found.".format(registry.config_file))
+    if not project_codes:
+        return registry.getProjectCodes()
+    for project_code in project_codes:
+        if registry.getProjectLink(project_code) is None:
+            sys.exit("Project code '{0}' is unknown.".format(project_code))
+    return project_codes
+
+def runPoll(arguments):
+    """Checks for new builds once and saves them."""
+
+    import CrashTrakr_main
+    CrashTrakr_main.loadConfig()
+    if arguments.project:
+        updated_projects = [project_code for project_code in getProjectCodes(arguments.project) 
+                            if CrashTrakr_main.pollProject(project_code)]
+    else:
+        getProjectCodes(None)
+        updated_projects = CrashTrakr_main.pollServer(arguments.server)
+    print("Updated projects: {0}".format(", ".join(updated_projects) or "none"))
+
+def runBackfill(arguments):
+    """Imports the past builds of projects."""
+
+    import CrashTrakr_main
+    import CrashTrakr_store
+    CrashTrakr_main.loadConfig()
+    for project_code in getProjectCodes(arguments.project):
+        if arguments.builds:
+            CrashTrakr_main.savePastTestResults(project_code, arguments.builds)
+        else:
+            CrashTrakr_main.populateFreshResults(project_code)
+        last_build = CrashTrakr_store.lastBuildNumber(project_code) or 0
+        if last_build > CrashTrakr_store.getLastSeenBuild(project_code):
+            CrashTrakr_store.setLastSeenBuild(project_code, last_build)
+
+def runShow(arguments):
+    """Prints the newest saved builds of projects."""
+
+    import CrashTrakr_store
+    for project_code in getProjectCodes(arguments.project):
+        print("=-=-=-=-=-=-=-=-=-=-=-=-=-=-=\nProject Code: {0}".format(project_code))
+        print("{0:>8} {1:>8} {2:>8} {3:>8}".format("Build", "Total", "Failed", "Fail %"))
+        for build, total, failed, skipped, duration in CrashTrakr_store.readBuilds(project_code, limit=arguments.limit):
+            fail_rate = "{0:.2f}".format(failed / total * 100) if total > 0 else "???"
+            print("{0:>8} {1:>8} {2:>8} {3:>8}".format(build, total, failed, fail_rate))
+
+def runFlaky(arguments):
+    """Prints the test cases of projects that keep flipping between passing 
+    and failing."""
+
+    import CrashTrakr_cases
+    for project_code in getProjectCodes(arguments.project):
+        print("=-=-=-=-=-=-=-=-=-=-=-=-=-=-=\nProject Code: {0}".format(project_code))
+        print("{0:>6} {1:>8}  {2}".format("Flips", "Failures", "Test case"))
+        for class_name, name, flips, failures in CrashTrakr_cases.findFlakyCases(project_code, arguments.window, arguments.min_flips):
+            print("{0:>6} {1:>8}  {2}.{3}".format(flips, failures, class_name, name))
+
+def runPlot(arguments):
+    """Shows the dashboard, or renders it to image files."""
+
+    getProjectCodes(None)
+    import CrashTrakr_plot
+    if arguments.headless:
+        CrashTrakr_plot.renderHeadless(arguments.headless, arguments.format, arguments.composite, arguments.processes)
+    else:
+        CrashTrakr_plot.main()
+
+def readExportedBuilds(project_code, limit):
+    """Reads the newest limit builds of a project, oldest first. None reads
+    every build."""
+
+    import CrashTrakr_store
+    builds = CrashTrakr_store.readBuilds(project_code, limit=limit)
+    builds.reverse()
+    return builds
+
+def runExport(arguments):
+    """Writes the saved builds of projects as CSV or JSON."""
+
+    import CrashTrakr_series
+    project_codes = getProjectCodes(arguments.project)
+    output_file = open(arguments.output, mode="w", newline="") if arguments.output else sys.stdout
+    try:
+        if arguments.format == "csv":
+            import csv
+            writer = csv.writer(output_file)
+            writer.writerow(("project",) + CrashTrakr_series.COLUMNS)
+            for project_code in project_codes:
+                for build in readExportedBuilds(project_code, arguments.limit):
+                    writer.writerow((project_code,) + tuple(build))
+        else:
+            import json
+            export = {project_code: [dict(zip(CrashTrakr_series.COLUMNS, build)) 
+                                     for build in readExportedBuilds(project_code, arguments.limit)]
+                      for project_code in project_codes}
+            json.dump(export, output_file, indent=2)
+            output_file.write("\n")
+    finally:
+        if output_file is not sys.stdout:
+            output_file.close()
+
+def runDaemon(arguments):
+    """Keeps polling and showing the dashboard until interrupted."""
+
+    import CrashTrakr_main
+    getProjectCodes(None)
+    CrashTrakr_main.runDaemon(show_display=not arguments.no_display)
+
+def createParser():
+    parser = argparse.ArgumentParser(prog="CrashTrakr", description="Retrieves and shows Jenkins test results.")
+    subparsers = parser.add_subparsers(dest="command", metavar="command")
+    subparsers.required = True
+
+    poll_parser = subparsers.add_parser("poll", help="check for new builds once and save them")
+    poll_parser.add_argument("--server", help="only poll the projects of this Jenkins server")
+    poll_parser.add_argument("--project", action="append", help="only poll this project, can be repeated")
+    poll_parser.set_defaults(handler=runPoll)
+
+    backfill_parser = subparsers.add_parser("backfill", help="import the past builds of projects")
+    backfill_parser.add_argument("project", nargs="*", help="project codes, every project when left out")
+    backfill_parser.add_argument("--builds", type=int, help="how many of the newest builds to import, every build when left out")
+    backfill_parser.set_defaults(handler=runBackfill)
+
+    show_parser = subparsers.add_parser("show", help="print the newest saved builds")
+    show_parser.add_argument("project", nargs="*", help="project codes, every project when left out")
+    show_parser.add_argument("--limit", type=int, default=15, help="how many builds to print per project")
+    show_parser.set_defaults(handler=runShow)
+
+    flaky_parser = subparsers.add_parser("flaky", help="print the test cases that keep flipping between passing and failing")
+    flaky_parser.add_argument("project", nargs="*", help="project codes, every project when left out")
+    flaky_parser.add_argument("--window", type=int, default=50, help="how many of the newest builds to check")
+    flaky_parser.add_argument("--min-flips", type=int, default=3, help="how many times a case has to flip to be printed")
+    flaky_parser.set_defaults(handler=runFlaky)
+
+    plot_parser = subparsers.add_parser("plot", help="show the dashboard or render it to image files")
+    plot_parser.add_argument("--headless", metavar="OUTPUT_DIR", 
+                             help="render the dashboard to image files in OUTPUT_DIR instead of showing it")
+    plot_parser.add_argument("--format", default="png", choices=["png", "svg"], help="image format of --headless")
+    plot_parser.add_argument("--composite", action="store_true", help="render a single frame with every project")
+    plot_parser.add_argument("--processes", type=int, help="worker processes used by --headless")
+    plot_parser.set_defaults(handler=runPlot)
+
+    export_parser = subparsers.add_parser("export", help="write the saved builds as CSV or JSON")
+    export_parser.add_argument("project", nargs="*", help="project codes, every project when left out")
+    export_parser.add_argument("--format", default="csv", choices=["csv", "json"], help="output format")
+    export_parser.add_argument("--output", help="file to write, standard output when left out")
+    export_parser.add_argument("--limit", type=int, help="how many of the newest builds to write per project")
+    export_parser.set_defaults(handler=runExport)
+
+    daemon_parser = subparsers.add_parser("daemon", help="keep polling and showing the dashboard")
+    daemon_parser.add_argument("--no-display", action="store_true", help="only poll and save results")
+    daemon_parser.set_defaults(handler=runDaemon)
+
+    return parser
+
+def main(argv=None):
+    arguments = createParser().parse_args(argv)
+    arguments.handler(arguments)
+
+if __name__ == "__main__":
+    main()
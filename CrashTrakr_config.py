@@ -0,0 +1,224 @@
+""" CrashTrakr is a test data retrieval tool built to work together 
+    with Jenkins test automation projects.
+    Copyright (C) 2017 Cosmin Ștefănică
+
+    Permission is hereby granted, free of charge, to any person obtaining a copy
+    of this software and associated documentation files (the "Software"), to deal
+    in the Software without restriction, including without limitation the rights
+    to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+    copies of the Software, and to permit persons to whom the Software is
+    furnished to do so, subject to the following conditions:
+
+    The above copyright notice and this permission notice shall be included in all
+    copies or substantial portions of the Software.
+
+    THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+    IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+    FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+    AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+    LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+    OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+    SOFTWARE.
+"""
+
+import json
+import os
+import threading
+import CrashTrakr_log
+
+CONFIG_FILE = "CrashConfig.json"
+
+class ProjectRegistry:
+    """Holds the parsed config file together with the job links and build 
+    tokens of every project. The config file is only parsed again when its
+    modification time changes. Every successful load increments generation,
+    so callers that apply parts of the config elsewhere can tell whether they
+    are up to date, whichever caller noticed the change first."""
+
+    def __init__(self, config_file=CONFIG_FILE):
+        """
+        Args:
+            config_file: The path to the JSON config file.
+        """
+
+        self.config_file = config_file
+        self.config = None
+        self.servers = {}
+        self.project_servers = {}
+        self.project_links = {}
+        self.build_tokens = {}
+        self.projects = {}
+        self.loaded_mtime = None
+        self.generation = 0
+        self.lock = threading.Lock()
+
+    def checkReload(self):
+        """Parses the config file again if it changed since it was last loaded.
+        A file that cannot be parsed, e.g. one saved halfway or with a typo, is
+        logged and the previous config is kept until the file changes again.
+
+        Returns:
+            True if the config was (re)loaded, False otherwise.
+        """
+
+        try:
+            mtime = os.stat(self.config_file).st_mtime_ns
+        except OSError:
+            mtime = None
+
+        if mtime == self.loaded_mtime:
+            return False
+
+        with self.lock:
+            if mtime == self.loaded_mtime:
+                return False
+            if mtime is None:
+                config = None
+            else:
+                try:
+                    with open(self.config_file) as config_file:
+                        config = json.load(config_file)
+                except (OSError, ValueError) as error:
+                    self.loaded_mtime = mtime
+                    CrashTrakr_log.log("Could not read {0}, keeping the previous config: {1}".format(self.config_file, error), 
+                                       "MAIN", "Error")
+                    return False
+            self.resolveProjects(config)
+            self.config = config
+            self.loaded_mtime = mtime
+            if config is not None:
+                self.generation += 1
+        return config is not None
+
+    def resolveProjects(self, config):
+        """Builds the server, job link and build token dictionaries of a freshly
+        loaded config. A config with a single ServerLink is read as one server
+        named "default"; projects without a Server run on the first server."""
+
+        servers = {}
+        project_servers = {}
+        project_links = {}
+        build_tokens = {}
+        projects = {}
+        if config is not None:
+            for server in config.get("Servers") or [{"Name": "default", "Link": config["ServerLink"]}]:
+                servers[server["Name"]] = server
+            for project in config["Projects"]:
+                server_name = project.get("Server", next(iter(servers)))
+                if server_name not in servers:
+                    raise ValueError("Project {0} runs on unknown server {1}!".format(project["Code"], server_name))
+                project_servers[project["Code"]] = server_name
+                project_links[project["Code"]] = servers[server_name]["Link"] + project["Link"] + '/'
+                build_tokens[project["Code"]] = project.get("BuildToken", "")
+                projects[project["Code"]] = project
+        self.servers = servers
+        self.project_servers = project_servers
+        self.project_links = project_links
+        self.build_tokens = build_tokens
+        self.projects = projects
+
+    def getConfig(self):
+        """Gets the parsed config file, None if there is no config file."""
+
+        self.checkReload()
+        return self.config
+
+    def getProjectCodes(self):
+        """Gets the internal codes of every configured project, in config 
+        order."""
+
+        self.checkReload()
+        return list(self.project_links)
+
+    def getServerNames(self):
+        """Gets the names of every configured Jenkins server, in config 
+        order."""
+
+        self.checkReload()
+        return list(self.servers)
+
+    def getServerLink(self, server_name):
+        """Gets the job link of a Jenkins server, None if the server name is
+        unknown."""
+
+        self.checkReload()
+        server = self.servers.get(server_name)
+        return server["Link"] if server is not None else None
+
+    def getProjectServer(self, project_code):
+        """Gets the name of the Jenkins server a project runs on, None if the
+        project code is unknown."""
+
+        self.checkReload()
+        return self.project_servers.get(project_code)
+
+    def getServerProjects(self, server_name):
+        """Gets the internal codes of the projects running on a Jenkins server,
+        in config order."""
+
+        self.checkReload()
+        return [project_code for project_code, project_server in self.project_servers.items() if project_server == server_name]
+
+    def getServerSetting(self, server_name, name, default=None):
+        """Gets a setting of a Jenkins server. A setting missing from the server
+        falls back to the setting of the same name at the top of the config
+        file, and then to the default.
+
+        Args:
+            server_name: The name of the server we wish to check.
+            name: The name of the setting, e.g.: Workers
+            default: The value used when the setting is not configured at all.
+        """
+
+        self.checkReload()
+        server = self.servers.get(server_name, {})
+        if name in server:
+            return server[name]
+        if self.config is not None and name in self.config:
+            return self.config[name]
+        return default
+
+    def getProjectLink(self, project_code):
+        """Gets the link to the Jenkins job of a project, None if the project 
+        code is unknown."""
+
+        self.checkReload()
+        return self.project_links.get(project_code)
+
+    def getBuildToken(self, project_code):
+        """Gets the remote build token of a project, None if the project code 
+        is unknown."""
+
+        self.checkReload()
+        return self.build_tokens.get(project_code)
+
+    def getProjectSetting(self, project_code, name, default=None):
+        """Gets a setting of a project. A setting missing from the project falls
+        back to the setting of the same name on its Jenkins server, at the top
+        of the config file, and then to the default.
+
+        Args:
+            project_code: The internal code to the project we wish to check.
+            name: The name of the setting, e.g.: PollInterval
+            default: The value used when the setting is not configured at all.
+        """
+
+        self.checkReload()
+        project = self.projects.get(project_code, {})
+        if name in project:
+            return project[name]
+        return self.getServerSetting(self.project_servers.get(project_code), name, default)
+
+_registry = None
+_registry_lock = threading.Lock()
+
+def getRegistry():
+    """Gets the project registry shared by every CrashTrakr module running in
+    this process."""
+
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = ProjectRegistry()
+    return _registry
@@ -0,0 +1,303 @@
+""" CrashTrakr is a test data retrieval tool built to work together 
+    with Jenkins test automation projects.
+    Copyright (C) 2017 Cosmin Ștefănică
+
+    Permission is hereby granted, free of charge, to any person obtaining a copy
+    of this software and associated documentation files (the "Software"), to deal
+    in the Software without restriction, including without limitation the rights
+    to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+    copies of the Software, and to permit persons to whom the Software is
+    furnished to do so, subject to the following conditions:
+
+    The above copyright notice and this permission notice shall be included in all
+    copies or substantial portions of the Software.
+
+    THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+    IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+    FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+    AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+    LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+    OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+    SOFTWARE.
+"""
+
+from collections import OrderedDict
+from urllib import parse
+import base64
+import gzip
+import http.client
+import os
+import threading
+import time
+import urllib.error
+import zlib
+import CrashTrakr_metrics
+
+REDIRECT_CODES = (301, 302, 303, 307, 308)
+
+class HttpClient:
+    """A small HTTP client for the Jenkins REST API. Connections to every 
+    Jenkins host are kept alive and reused, responses are requested gzip
+    compressed, and responses that carried an ETag or Last-Modified header are
+    revalidated with a conditional request so unchanged data comes back as a
+    cheap 304.
+
+    Errors are raised as urllib.error.HTTPError and urllib.error.URLError, the
+    same as urllib.request.urlopen, so callers can handle both the same way.
+    """
+
+    def __init__(self, max_connections=8, timeout=30, cache_size=1024):
+        """
+        Args:
+            max_connections: How many idle connections are kept per host.
+            timeout: The default number of seconds to wait for the server.
+            cache_size: How many responses are kept for conditional requests.
+        """
+
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self.cache_size = cache_size
+        self.idle_connections = {}
+        self.validators = OrderedDict()
+        self.lock = threading.Lock()
+
+    def getConnection(self, host_key, timeout):
+        """Takes an idle connection to a host out of the pool, or opens a new 
+        one.
+
+        Returns:
+            (connection, reused) where reused tells if the connection was
+            already used for an earlier request.
+        """
+
+        with self.lock:
+            idle = self.idle_connections.get(host_key)
+            if idle:
+                connection = idle.pop()
+                connection.timeout = timeout
+                if connection.sock is not None:
+                    connection.sock.settimeout(timeout)
+                return connection, True
+
+        scheme, host, port = host_key
+        if scheme == "https":
+            return http.client.HTTPSConnection(host, port, timeout=timeout), False
+        return http.client.HTTPConnection(host, port, timeout=timeout), False
+
+    def releaseConnection(self, host_key, connection):
+        """Puts a connection back into the pool, closing it if the pool is 
+        full."""
+
+        with self.lock:
+            idle = self.idle_connections.setdefault(host_key, [])
+            if len(idle) < self.max_connections:
+                idle.append(connection)
+                return
+        connection.close()
+
+    def close(self):
+        """Closes every idle connection."""
+
+        with self.lock:
+            for idle in self.idle_connections.values():
+                for connection in idle:
+                    connection.close()
+            self.idle_connections = {}
+
+    def reset(self):
+        """Forgets the idle connections inherited from the parent process 
+        without closing them, since the parent keeps using them."""
+
+        self.idle_connections = {}
+        self.lock = threading.Lock()
+
+    def getValidators(self, url):
+        """Gets the (etag, last modified, body) saved for a URL, None if the URL
+        was never seen."""
+
+        with self.lock:
+            validators = self.validators.get(url)
+            if validators is not None:
+                self.validators.move_to_end(url)
+            return validators
+
+    def saveValidators(self, url, etag, last_modified, body):
+        """Saves the validators and body of a response, dropping the least 
+        recently used ones once the cache is full."""
+
+        with self.lock:
+            self.validators[url] = (etag, last_modified, body)
+            self.validators.move_to_end(url)
+            while len(self.validators) > self.cache_size:
+                self.validators.popitem(last=False)
+
+    def sendRequest(self, method, url, body=None, headers=None, timeout=None):
+        """Sends a single request over a pooled connection. A GET request is
+        sent again on a fresh connection if a reused one was closed by the
+        server meanwhile; other requests are not repeated, since the server
+        may have acted on them before closing the connection.
+
+        Returns:
+            (status, reason, response headers, response body)
+        """
+
+        if timeout is None:
+            timeout = self.timeout
+        parts = parse.urlsplit(url)
+        default_port = 443 if parts.scheme == "https" else 80
+        host_key = (parts.scheme, parts.hostname, parts.port or default_port)
+        path = parts.path or "/"
+        if parts.query:
+            path = path + "?" + parts.query
+
+        request_headers = {"Accept-Encoding": "gzip", "Connection": "keep-alive"}
+        if parts.username is not None:
+            credentials = "{0}:{1}".format(parse.unquote(parts.username), parse.unquote(parts.password or ""))
+            request_headers["Authorization"] = "Basic " + base64.b64encode(credentials.encode()).decode()
+        request_headers.update(headers or {})
+
+        start = time.perf_counter()
+        while True:
+            connection, reused = self.getConnection(host_key, timeout)
+            try:
+                connection.request(method, path, body=body, headers=request_headers)
+                response = connection.getresponse()
+                response_body = response.read()
+            except (http.client.HTTPException, OSError) as error:
+                connection.close()
+                if reused and method == "GET" and isinstance(error, (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError)):
+                    continue
+                CrashTrakr_metrics.increment("crashtrakr_http_errors_total", labels=(("method", method),))
+                raise urllib.error.URLError(error)
+
+            if CrashTrakr_metrics.getRegistry().enabled:
+                labels = (("method", method), ("status", str(response.status)))
+                CrashTrakr_metrics.increment("crashtrakr_http_requests_total", labels=labels)
+                CrashTrakr_metrics.increment("crashtrakr_http_received_bytes_total", len(response_body), labels=labels)
+                CrashTrakr_metrics.observe("crashtrakr_http_request_seconds", time.perf_counter() - start, labels=(("method", method),))
+
+            if response.will_close:
+                connection.close()
+            else:
+                self.releaseConnection(host_key, connection)
+
+            if response.getheader("Content-Encoding", "").lower() == "gzip":
+                try:
+                    response_body = gzip.decompress(response_body)
+                except (OSError, EOFError, zlib.error) as error:
+                    raise urllib.error.URLError(error)
+            return response.status, response.reason, response.msg, response_body
+
+    def get(self, url, timeout=None, conditional=True):
+        """Sends a GET request and returns the body of the response.
+
+        Args:
+            url: The link we wish to get.
+            timeout: Seconds to wait for the server. Defaults to the timeout of
+                the client.
+            conditional: Whether to revalidate a previous response of the same
+                URL instead of downloading it again.
+
+        Raises:
+            urllib.error.HTTPError: If the server answers with an error status.
+            urllib.error.URLError: If the server cannot be reached.
+        """
+
+        for redirect in range(5):
+            headers = {}
+            validators = self.getValidators(url) if conditional else None
+            if validators is not None:
+                etag, last_modified, cached_body = validators
+                if etag:
+                    headers["If-None-Match"] = etag
+                if last_modified:
+                    headers["If-Modified-Since"] = last_modified
+
+            status, reason, response_headers, body = self.sendRequest("GET", url, headers=headers, timeout=timeout)
+
+            if status == 304 and validators is not None:
+                return validators[2]
+            if status in REDIRECT_CODES and response_headers.get("Location"):
+                url = parse.urljoin(url, response_headers["Location"])
+                continue
+            if status >= 400:
+                raise urllib.error.HTTPError(url, status, reason, response_headers, None)
+
+            etag = response_headers.get("ETag")
+            last_modified = response_headers.get("Last-Modified")
+            if conditional and (etag or last_modified):
+                self.saveValidators(url, etag, last_modified, body)
+            return body
+
+        raise urllib.error.URLError("Too many redirects for {0}".format(url))
+
+    def post(self, url, data, timeout=None):
+        """Sends a form encoded POST request.
+
+        Args:
+            url: The link we wish to post to.
+            data: The encoded form data.
+            timeout: Seconds to wait for the server.
+
+        Returns:
+            (status, response headers, response body)
+
+        Raises:
+            urllib.error.HTTPError: If the server answers with an error status.
+            urllib.error.URLError: If the server cannot be reached.
+        """
+
+        status, reason, response_headers, body = self.sendRequest(
+            "POST", url, body=data, 
+            headers={"Content-Type": "application/x-www-form-urlencoded"}, 
+            timeout=timeout)
+        if status >= 400:
+            raise urllib.error.HTTPError(url, status, reason, response_headers, None)
+        return status, response_headers, body
+
+_clients = {}
+_client_lock = threading.Lock()
+
+def getClient(server_name=None):
+    """Gets the HTTP client shared by every CrashTrakr module running in this
+    process. Every Jenkins server gets a client of its own, so a slow server
+    cannot use up the connections of the others.
+
+    Args:
+        server_name: The name of the Jenkins server, None for the default
+            client.
+    """
+
+    client = _clients.get(server_name)
+    if client is None:
+        with _client_lock:
+            client = _clients.get(server_name)
+            if client is None:
+                client = _clients[server_name] = HttpClient()
+    return client
+
+def configure(http_settings, server_name=None):
+    """Configures a shared HTTP client from the Http section of the config
+    file.
+
+    Args:
+        http_settings: Dictionary with any of MaxConnections, Timeout and 
+            CacheSize.
+        server_name: The name of the Jenkins server, None for the default
+            client.
+    """
+
+    client = getClient(server_name)
+    client.max_connections = int(http_settings.get("MaxConnections", client.max_connections))
+    client.timeout = http_settings.get("Timeout", client.timeout)
+    client.cache_size = int(http_settings.get("CacheSize", client.cache_size))
+
+def resetClients():
+    """Forgets the idle connections of every shared client in a forked 
+    process."""
+
+    for client in _clients.values():
+        client.reset()
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=resetClients)
@@ -0,0 +1,74 @@
+""" CrashTrakr is a test data retrieval tool built to work together 
+    with Jenkins test automation projects.
+    Copyright (C) 2017 Cosmin Ștefănică
+
+    Permission is hereby granted, free of charge, to any person obtaining a copy
+    of this software and associated documentation files (the "Software"), to deal
+    in the Software without restriction, including without limitation the rights
+    to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+    copies of the Software, and to permit persons to whom the Software is
+    furnished to do so, subject to the following conditions:
+
+    The above copyright notice and this permission notice shall be included in all
+    copies or substantial portions of the Software.
+
+    THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+    IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+    FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+    AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+    LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+    OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+    SOFTWARE.
+"""
+
+import io
+import json
+import CrashTrakr_metrics
+
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+@CrashTrakr_metrics.timed("crashtrakr_json_parse_seconds", "Time spent parsing whole Jenkins JSON responses.")
+def loadJson(data):
+    """Parses a JSON response from the Jenkins REST API.
+
+    Args:
+        data: The raw response body. The encoding is detected from the bytes
+            themselves, so test names in any language are kept intact.
+    """
+
+    return json.loads(data)
+
+def walkJson(value, path):
+    """Walks an already parsed JSON value along an ijson style path. See 
+    iterJsonItems."""
+
+    if not path:
+        yield value
+        return
+
+    if path[0] == "item":
+        if isinstance(value, list):
+            for element in value:
+                yield from walkJson(element, path[1:])
+    elif isinstance(value, dict) and path[0] in value:
+        yield from walkJson(value[path[0]], path[1:])
+
+def iterJsonItems(data, path):
+    """Yields the values found under a path of a JSON response one at a time.
+    When the optional ijson package is installed the response is parsed 
+    incrementally, so neither the decoded text nor the complete object tree is
+    ever held in memory. Otherwise it falls back to the json module.
+
+    Args:
+        data: The raw response body.
+        path: Dotted path to the values, where "item" stands for every element
+            of a list. e.g.: "builds.item" or "suites.item.cases.item"
+    """
+
+    if ijson is not None:
+        yield from ijson.items(io.BytesIO(data), path, use_float=True)
+    else:
+        yield from walkJson(loadJson(data), path.split("."))
@@ -0,0 +1,284 @@
+""" CrashTrakr is a test data retrieval tool built to work together 
+    with Jenkins test automation projects.
+    Copyright (C) 2017 Cosmin Ștefănică
+
+    Permission is hereby granted, free of charge, to any person obtaining a copy
+    of this software and associated documentation files (the "Software"), to deal
+    in the Software without restriction, including without limitation the rights
+    to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+    copies of the Software, and to permit persons to whom the Software is
+    furnished to do so, subject to the following conditions:
+
+    The above copyright notice and this permission notice shall be included in all
+    copies or substantial portions of the Software.
+
+    THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+    IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+    FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+    AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+    LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+    OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+    SOFTWARE.
+"""
+
+import atexit
+import datetime
+import json
+import os
+import queue
+import threading
+import time
+import CrashTrakr_metrics
+
+LOG_FILE = "CrashTrakr_Log.txt"
+
+LOG_LEVELS = {"Debug": 10,
+              "Notice": 20,
+              "Warning": 30,
+              "Error": 40,
+              "HTTP Error": 40,
+              "URL Error": 40}
+
+class LogWriter:
+    """Writes log messages from an in-memory queue on a background thread, so
+    logging never waits on the disk. Messages are written in batches, and the
+    log file is rotated once it grows too large or too old."""
+
+    def __init__(self, log_file=LOG_FILE, level="Notice", log_format="text", 
+                 max_bytes=10485760, rotate_seconds=0, backup_count=5, flush_interval=0.5):
+        """
+        Args:
+            log_file: The path to the log file.
+            level: Messages below this level are dropped. See LOG_LEVELS.
+            log_format: "text" for the classic one line per message, or "json"
+                for one JSON object per line.
+            max_bytes: Rotate the log file once it is larger than this. 0 never
+                rotates on size.
+            rotate_seconds: Rotate the log file once it is older than this. 0
+                never rotates on time.
+            backup_count: How many rotated log files are kept.
+            flush_interval: The longest time, in seconds, a message waits in the
+                queue before being written.
+        """
+
+        self.log_file = log_file
+        self.queue = queue.SimpleQueue()
+        self.forward_queue = None
+        self.thread = None
+        self.thread_lock = threading.Lock()
+        self.file = None
+        self.file_size = 0
+        self.opened_at = 0
+        self.configure(level, log_format, max_bytes, rotate_seconds, backup_count, flush_interval)
+
+    def configure(self, level="Notice", log_format="text", max_bytes=10485760, 
+                  rotate_seconds=0, backup_count=5, flush_interval=0.5):
+        """Changes the settings of the writer. See __init__ for the arguments."""
+
+        self.level = LOG_LEVELS.get(level, LOG_LEVELS["Notice"])
+        self.log_format = log_format
+        self.max_bytes = max_bytes
+        self.rotate_seconds = rotate_seconds
+        self.backup_count = backup_count
+        self.flush_interval = flush_interval
+
+    def reset(self):
+        """Forgets the writer thread, queue and log file inherited from the
+        parent process, so a forked process starts a writer of its own."""
+
+        self.queue = queue.SimpleQueue()
+        self.forward_queue = None
+        self.thread = None
+        self.thread_lock = threading.Lock()
+        self.file = None
+        self.file_size = 0
+        self.opened_at = 0
+
+    def write(self, message, project_code="MAIN", message_type="Notice"):
+        """Queues a message to be written to the log file, or hands it over to
+        the process writing it when the writer forwards its messages. See
+        forwardLogs.
+
+        Args:
+            message: The message we wish to log
+            project_code: The internal code to the project the message is about.
+            message_type: The type of message we are logging.
+                e.g.: Notice, Error, Warning
+        """
+
+        if LOG_LEVELS.get(message_type, LOG_LEVELS["Notice"]) < self.level:
+            return
+        entry = (datetime.datetime.now(), message_type, project_code, str(message))
+        if self.forward_queue is not None:
+            self.forward_queue.put(entry)
+            return
+        self.writeEntry(entry)
+
+    def writeEntry(self, entry):
+        """Queues a (time, type, project code, message) entry to be written."""
+
+        self.checkThread()
+        self.queue.put(entry)
+
+    def flush(self):
+        """Waits until every queued message has been written to the log file."""
+
+        if self.thread is None:
+            return
+        written = threading.Event()
+        self.queue.put(written)
+        written.wait()
+
+    def checkThread(self):
+        """Starts the background writer thread if it is not running yet."""
+
+        if self.thread is None:
+            with self.thread_lock:
+                if self.thread is None:
+                    self.thread = threading.Thread(target=self.run, name="CrashTrakr log writer", daemon=True)
+                    self.thread.start()
+
+    def formatMessage(self, entry):
+        """Formats a queued (time, type, project code, message) entry as a line 
+        of the log file."""
+
+        timestamp, message_type, project_code, message = entry
+        if self.log_format == "json":
+            return json.dumps({"time": str(timestamp),
+                               "type": message_type,
+                               "project": project_code,
+                               "message": str(message)}) + "\n"
+        return "[{0}][{1}] {2}, {3}\n".format(message_type, project_code, str(timestamp), message)
+
+    def openLogFile(self):
+        """Opens the log file for appending, starting it with a LOG START line 
+        if it does not exist yet."""
+
+        is_new = not os.path.isfile(self.log_file)
+        self.file = open(self.log_file, mode="at", encoding="utf-8")
+        self.file_size = self.file.tell()
+        self.opened_at = time.time()
+        if is_new:
+            self.file.write("LOG START @ {0}\n".format(str(datetime.datetime.now())))
+            self.file.flush()
+
+    def checkRotation(self):
+        """Moves the log file aside once it is too large or too old, keeping the
+        last backup_count files as CrashTrakr_Log.txt.1, .2 and so on."""
+
+        too_large = self.max_bytes and self.file_size >= self.max_bytes
+        too_old = self.rotate_seconds and time.time() - self.opened_at >= self.rotate_seconds
+        if not (too_large or too_old):
+            return
+
+        self.file.close()
+        self.file = None
+        for backup in range(self.backup_count - 1, 0, -1):
+            if os.path.isfile("{0}.{1}".format(self.log_file, backup)):
+                os.replace("{0}.{1}".format(self.log_file, backup), "{0}.{1}".format(self.log_file, backup + 1))
+        if self.backup_count > 0:
+            os.replace(self.log_file, self.log_file + ".1")
+        else:
+            os.remove(self.log_file)
+        self.openLogFile()
+
+    def run(self):
+        """Writes queued messages in batches for as long as the process runs."""
+
+        while True:
+            try:
+                batch = [self.queue.get(timeout=self.flush_interval)]
+            except queue.Empty:
+                continue
+            while True:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            waiting = []
+            lines = []
+            for entry in batch:
+                if isinstance(entry, threading.Event):
+                    waiting.append(entry)
+                else:
+                    lines.append(self.formatMessage(entry))
+
+            if lines:
+                start = time.perf_counter()
+                try:
+                    if self.file is None:
+                        self.openLogFile()
+                    for line in lines:
+                        self.file.write(line)
+                        self.file_size = self.file_size + len(line)
+                        self.checkRotation()
+                    self.file.flush()
+                except OSError:
+                    self.file = None
+                CrashTrakr_metrics.increment("crashtrakr_log_lines_total", len(lines))
+                CrashTrakr_metrics.observe("crashtrakr_log_write_seconds", time.perf_counter() - start)
+
+            for written in waiting:
+                written.set()
+
+_writer = LogWriter()
+
+def getWriter():
+    """Gets the log writer shared by every CrashTrakr module running in this
+    process."""
+
+    return _writer
+
+def configure(log_settings):
+    """Configures the shared log writer from the Log section of the config
+    file.
+
+    Args:
+        log_settings: Dictionary with any of Level, Format, MaxBytes, 
+            RotateSeconds, BackupCount and FlushInterval.
+    """
+
+    _writer.configure(level=log_settings.get("Level", "Notice"),
+                      log_format=log_settings.get("Format", "text"),
+                      max_bytes=int(log_settings.get("MaxBytes", 10485760)),
+                      rotate_seconds=log_settings.get("RotateSeconds", 0),
+                      backup_count=int(log_settings.get("BackupCount", 5)),
+                      flush_interval=log_settings.get("FlushInterval", 0.5))
+
+def forwardLogs(log_queue):
+    """Makes the shared log writer hand its messages over to another process
+    instead of writing them itself. The poller processes of the daemon forward
+    their messages to the daemon process, so only one process appends to and
+    rotates the log file.
+
+    Args:
+        log_queue: multiprocessing.Queue read by serveLogs.
+    """
+
+    _writer.forward_queue = log_queue
+
+def serveLogs(log_queue, stop_event):
+    """Writes the messages forwarded by other processes until stop_event is set
+    and no message is left.
+
+    Args:
+        log_queue: multiprocessing.Queue the messages are forwarded on.
+        stop_event: Event that ends the loop once set.
+    """
+
+    while True:
+        try:
+            _writer.writeEntry(log_queue.get(timeout=1))
+        except queue.Empty:
+            if stop_event.is_set():
+                return
+
+def log(message, project_code="MAIN", message_type="Notice"):
+    """Queues a message for the shared log writer. See LogWriter.write."""
+
+    _writer.write(message, project_code, message_type)
+
+atexit.register(_writer.flush)
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_writer.reset)
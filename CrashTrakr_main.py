@@ -21,29 +21,27 @@
     SOFTWARE.
 """
 
-from urllib import request, parse
-import urllib.request
-import ast
-import datetime
+from urllib import parse
+import urllib.error
 import os
-import pickle
-import subprocess
 import sys
-import psutil
-import json
-
-def checkLogExistence():
-    """Checks to see if the CrashTrakr_Log file exists and creates it if it does
-    not."""
-
-    if not os.path.isfile("CrashTrakr_Log.txt"):
-        log_start=["LOG START @ {0}\n".format(str(datetime.datetime.now()))]      
-        log_file = open("CrashTrakr_Log.txt", mode="wt", encoding="utf-8")
-        log_file.writelines(log_start)
-        log_file.close()
+import time
+import heapq
+import queue
+import random
+import threading
+import CrashTrakr_config
+import CrashTrakr_http
+import CrashTrakr_json
+import CrashTrakr_log
+import CrashTrakr_metrics
+import CrashTrakr_retry
+import CrashTrakr_store
+import CrashTrakr_series
 
 def log(message, project_code="MAIN", message_type="Notice"):
-    """Logs custom messages to a separate CrashTrakr_log.txt file.
+    """Logs custom messages to a separate CrashTrakr_log.txt file. Messages are
+    queued and written in batches by the CrashTrakr_log background writer.
 
     Args:
         message: The message we wish to log
@@ -53,15 +51,7 @@ def log(message, project_code="MAIN", message_type="Notice"):
             e.g.: Notice, Error, Warning
     """
 
-    complete_message = "[{0}][{1}] {2}, {3}\n".format(message_type,
-                                                     project_code, 
-                                                     str(datetime.datetime.now()), 
-                                                     message)
-
-    checkLogExistence()
-    log_file = open("CrashTrakr_Log.txt", mode="at+", encoding="utf-8")
-    log_file.writelines(complete_message)
-    log_file.close()
+    CrashTrakr_log.log(message, project_code, message_type)
 
 def printTestData(project_code):
     """Prints the available test data to the console.
@@ -70,53 +60,49 @@ def printTestData(project_code):
          project_code: The internal code to the project data we wish to show.
     """
 
-    with open("CrashTrakr_data_" + project_code, mode="rb") as fp:
-        log_data = pickle.load(fp)
-    for log in log_data:
-        print(log)
+    for log_data in loadTestData(project_code):
+        print(log_data)
 
-def saveTestData(project_code, last_build_number, completed_tests, failed_tests):
-    """Saves the serialized pickle file that holds all the data we have on the 
-    test runs for a specific project.
+@CrashTrakr_metrics.timed("crashtrakr_save_test_data_seconds", "Time spent in saveTestData.")
+def saveTestData(project_code, last_build_number, completed_tests, failed_tests, skipped_tests=-1, duration=-1):
+    """Saves the test results of a single build to the history store. Saving a
+    build that is already stored replaces its results.
 
     Args:
         project_code: The internal code to the project we wish to save data for.
-        data_to_be_saved: The test data we want to save.
+        last_build_number: The build the results belong to.
+        completed_tests: How many tests were completed.
+        failed_tests: How many tests failed.
+        skipped_tests: How many tests were skipped, -1 if unknown.
+        duration: How long the tests took in milliseconds, -1 if unknown.
     """
-    if last_build_number == "-1":
+    if str(last_build_number) == "-1":
         log("Data not logged", project_code, "HTTP Error")
-    elif last_build_number == "-2":
+    elif str(last_build_number) == "-2":
         log("Data not logged", project_code, "URL Error")
     else:
-        complete_data = [last_build_number, completed_tests, failed_tests]
-        test_data = []
-        if os.path.isfile("CrashTrakr_data_" + project_code):
-            with open ("CrashTrakr_data_" + project_code, mode="rb") as data_file:
-                test_data = pickle.load(data_file)
-                log("Received test data from file!", project_code)
-                
-                data_file.close()
-
-        if(test_data[0][0]) != last_build_number:
-            test_data.insert(0, complete_data)
+        CrashTrakr_store.appendBuild(project_code, int(last_build_number), 
+                                     completed_tests, failed_tests, 
+                                     skipped_tests, duration)
+        log("Test data saved succesfully!", project_code)
 
-        with open("CrashTrakr_data_" + project_code, mode="wb") as data_file:
-            pickle.dump(test_data, data_file)
-            log("Test data saved succesfully!", project_code)
-            data_file.close()
-
-def loadTestData(project_code):
-    """Loads the serialized pickle file that holds all the data we have on the 
-    test runs.
+@CrashTrakr_metrics.timed("crashtrakr_load_test_data_seconds", "Time spent in loadTestData.")
+def loadTestData(project_code, first_build=None, last_build=None, limit=None):
+    """Loads the test results we have saved for a project, newest build first.
 
     Args:
         project_code: The internal code to the project we wish to load data for.
+        first_build: The oldest build number to load. None loads from the start.
+        last_build: The newest build number to load. None loads to the end.
+        limit: The maximum number of builds to load, newest first.
+
+    Returns:
+        A list of [build, completed tests, failed tests] lists.
     """
 
-    with open ("CrashTrakr_data_" + project_code, mode="rb") as data_file:
-        test_data = pickle.load(data_file)
-        log("Received test data!", project_code)
-        data_file.close()
+    test_data = [[build[0], build[1], build[2]] 
+                 for build in CrashTrakr_store.readBuilds(project_code, first_build, last_build, limit)]
+    log("Received test data!", project_code)
     return test_data
 
 def getProjectLink(project_code):
@@ -131,19 +117,25 @@ def getProjectLink(project_code):
             list.
     """
     
-    project_data = loadConfig()
-    project_dictionary = {}
+    loadConfig()
+    project_link = CrashTrakr_config.getRegistry().project_links.get(project_code)
 
-    for project in project_data["Projects"]:
-        project_dictionary[project["Code"]] = project_data["ServerLink"] + project["Link"] + '/'
-
-    if project_code not in project_dictionary:
+    if project_link is None:
         log("Project code '{0}' is unknown".format(project_code), 
             project_code, 
             "Error")
         raise ValueError("Project code is unknown!")
 
-    return project_dictionary[project_code]
+    return project_link
+
+def getProjectClient(project_code):
+    """Gets the shared HTTP client of the Jenkins server a project runs on.
+
+    Args:
+        project_code: The internal code to the project we wish to check.
+    """
+
+    return CrashTrakr_http.getClient(CrashTrakr_config.getRegistry().getProjectServer(project_code))
 
 def getApiLink(project_code, version=-1, last_successful_build=False, last_build=False):
     """Generates the link to the Jenkins REST API that we use to get the test 
@@ -167,13 +159,27 @@ def getApiLink(project_code, version=-1, last_successful_build=False, last_build
 
     if version == (-1):
         if last_successful_build:
-            return getProjectLink(project_code) + "lastSuccessfulBuild/testReport/api/python?tree=failCount,passCount,duration,skipCount"
+            return getProjectLink(project_code) + "lastSuccessfulBuild/testReport/api/json?tree=failCount,passCount,duration,skipCount"
         elif last_build:
-            return getProjectLink(project_code) + "lastBuild/testReport/api/python?tree=failCount,passCount,duration,skipCount"
+            return getProjectLink(project_code) + "lastBuild/testReport/api/json?tree=failCount,passCount,duration,skipCount"
         else:
-            return getProjectLink(project_code) + "lastCompletedBuild/testReport/api/python?tree=failCount,passCount,duration,skipCount"
+            return getProjectLink(project_code) + "lastCompletedBuild/testReport/api/json?tree=failCount,passCount,duration,skipCount"
     else:
-        return getProjectLink(project_code) + str(version) + "/testReport/api/python?tree=failCount,passCount,duration,skipCount"
+        return getProjectLink(project_code) + str(version) + "/testReport/api/json?tree=failCount,passCount,duration,skipCount"
+
+def getBuildsRangeLink(project_code, first_index, last_index):
+    """Generates the link to the Jenkins REST API that lists the test results
+    of a page of builds in a single request.
+
+    Args:
+        project_code: The internal code to the project we wish to check.
+        first_index: The position of the first build in the page. Jenkins
+            lists builds newest first, so 0 is the newest build.
+        last_index: The position after the last build in the page.
+    """
+
+    tree = "builds[number,result,actions[failCount,totalCount,skipCount]]{{{0},{1}}}".format(first_index, last_index)
+    return getProjectLink(project_code) + "api/json?tree=" + parse.quote(tree, safe=",")
 
 def getLastCompletedBuildNumber(project_code):
     """Sends a GET request to the REST API provided by Jenkins to see what the 
@@ -183,21 +189,23 @@ def getLastCompletedBuildNumber(project_code):
         project_code: The internal code to the project we wish to check.
     """
 
-    build_link = getProjectLink(project_code)+"lastCompletedBuild/api/python?tree=id"
+    build_link = getProjectLink(project_code)+"lastCompletedBuild/api/json?tree=id"
 
     try:
-        apiResponse = ast.literal_eval(urllib.request.urlopen(build_link).read().decode("windows-1252"))
+        apiResponse = CrashTrakr_json.loadJson(getProjectClient(project_code).get(build_link))
     except urllib.error.HTTPError as HTTP_Error:
         log("Error fetching {0} last completed build number: {1}: {2}".format(project_code, HTTP_Error.code, HTTP_Error.reason),
             project_code,
             "HTTP Error")
         apiResponse = {"_class": "HTTP Error", "id": "-1"}
+        CrashTrakr_metrics.increment("crashtrakr_error_results_total", labels=(("type", "HTTP Error"),))
 
     except urllib.error.URLError as URL_Error:
         log("Error fetching {0} last completed build number. {1}".format(project_code, URL_Error.reason),
             project_code,
             "URL Error")
         apiResponse = {"_class": "URL Error", "id": "-2"}
+        CrashTrakr_metrics.increment("crashtrakr_error_results_total", labels=(("type", "URL Error"),))
     return int(apiResponse["id"])
 
 def getLastBuildNumber(project_code):
@@ -208,62 +216,355 @@ def getLastBuildNumber(project_code):
         project_code: The internal code to the project we wish to check.
     """
 
-    build_link = getProjectLink(project_code)+"lastBuild/api/python?tree=id"
+    build_link = getProjectLink(project_code)+"lastBuild/api/json?tree=id"
 
     try:
-        apiResponse = ast.literal_eval(urllib.request.urlopen(build_link).read().decode("windows-1252"))
+        apiResponse = CrashTrakr_json.loadJson(getProjectClient(project_code).get(build_link))
     except urllib.error.HTTPError as HTTP_Error:
         log("Error fetching {0} last build number: {1}: {2}".format(project_code, HTTP_Error.code, HTTP_Error.reason),
             project_code,
             "HTTP Error")
         apiResponse = {"_class": "HTTP Error", "id": "-1"}
+        CrashTrakr_metrics.increment("crashtrakr_error_results_total", labels=(("type", "HTTP Error"),))
 
     except urllib.error.URLError as URL_Error:
         log("Error fetching {0} last build number. {1}".format(project_code, URL_Error.reason),
             project_code,
             "URL Error")
         apiResponse = {"_class": "URL Error", "id": "-2"}
+        CrashTrakr_metrics.increment("crashtrakr_error_results_total", labels=(("type", "URL Error"),))
     return int(apiResponse["id"])
 
-def compareBuildNumbers(project_code):
-    lastSavedBuildNumber = loadTestData(project_code)[0][0]
+_jobs_listings = {}
+_jobs_listing_lock = threading.Lock()
+
+def getServerJobsLink(server_name=None):
+    """Generates the link to the Jenkins REST API that lists the last completed
+    build of every job on the server in a single request.
+
+    Args:
+        server_name: The name of the Jenkins server. Defaults to the first
+            configured server.
+    """
+
+    registry = CrashTrakr_config.getRegistry()
+    loadConfig()
+    if server_name is None:
+        server_name = registry.getServerNames()[0]
+    server_link = registry.getServerLink(server_name)
+    if server_link.endswith("job/"):
+        server_link = server_link[:-len("job/")]
+    return server_link + "api/json?tree=" + parse.quote("jobs[name,lastCompletedBuild[number]]", safe=",")
+
+def getLastCompletedBuildNumbers(max_age=0, server_name=None):
+    """Gets the last completed build ID of every configured project on a 
+    Jenkins server with one request to the server. The listing is reused for
+    max_age seconds, so projects polled close together share a single request.
+
+    Args:
+        max_age: How many seconds an earlier listing may be reused for.
+        server_name: The name of the Jenkins server. Defaults to the first
+            configured server.
+
+    Returns:
+        A dictionary of project codes and build numbers. Projects the server 
+        did not list, e.g. jobs inside folders, are left out.
+    """
+
+    registry = CrashTrakr_config.getRegistry()
+    loadConfig()
+    if server_name is None:
+        server_name = registry.getServerNames()[0]
+
+    with _jobs_listing_lock:
+        jobs_listing = _jobs_listings.setdefault(server_name, {"time": 0, "builds": None, "lock": threading.Lock()})
+
+    with jobs_listing["lock"]:
+        if jobs_listing["builds"] is not None and time.monotonic() - jobs_listing["time"] <= max_age:
+            return jobs_listing["builds"]
+
+        jobs_link = getServerJobsLink(server_name)
+        try:
+            api_data = CrashTrakr_http.getClient(server_name).get(jobs_link)
+        except urllib.error.HTTPError as HTTP_Error:
+            log("Error listing the {0} server jobs: {1}: {2}".format(server_name, HTTP_Error.code, HTTP_Error.reason),
+                message_type="HTTP Error")
+            return {}
+        except urllib.error.URLError as URL_Error:
+            log("Error listing the {0} server jobs. {1}".format(server_name, URL_Error.reason),
+                message_type="URL Error")
+            return {}
+
+        job_builds = {}
+        for job in CrashTrakr_json.iterJsonItems(api_data, "jobs.item"):
+            if job.get("lastCompletedBuild"):
+                job_builds[job["name"]] = job["lastCompletedBuild"]["number"]
+
+        project_builds = {}
+        for project_code in registry.getServerProjects(server_name):
+            job_name = parse.unquote(registry.projects[project_code]["Link"])
+            if job_name in job_builds:
+                project_builds[project_code] = job_builds[job_name]
+
+        jobs_listing["builds"] = project_builds
+        jobs_listing["time"] = time.monotonic()
+        return project_builds
+
+def compareBuildNumbers(project_code, last_jenkins_build=None):
+    """Gets how many builds a project is ahead of the last build we have seen.
+
+    Args:
+        project_code: The internal code to the project we wish to check.
+        last_jenkins_build: The last completed build ID, if already known. 
+            Otherwise it is taken from the server jobs listing, or asked for
+            directly when the listing does not have the project.
+    """
+
+    lastSavedBuildNumber = CrashTrakr_store.getLastSeenBuild(project_code)
+    lastJenkinsBuildNumber = last_jenkins_build
+    if lastJenkinsBuildNumber is None:
+        jobs_cache_seconds = float(CrashTrakr_config.getRegistry().getProjectSetting(project_code, "JobsCacheSeconds", 10))
+        server_name = CrashTrakr_config.getRegistry().getProjectServer(project_code)
+        lastJenkinsBuildNumber = getLastCompletedBuildNumbers(jobs_cache_seconds, server_name).get(project_code)
+    if lastJenkinsBuildNumber is None:
+        lastJenkinsBuildNumber = getLastCompletedBuildNumber(project_code)
     print("LastSavedIs")
     print(lastSavedBuildNumber)
-    lastJenkinsBuildNumber = getLastCompletedBuildNumber(project_code)
     print("LastJenkinsIs")
     print(lastJenkinsBuildNumber)
     return lastJenkinsBuildNumber - lastSavedBuildNumber
 
-def getApiTestResults(project_code, version=-1):
+@CrashTrakr_metrics.timed("crashtrakr_api_test_results_seconds", "Time spent in getApiTestResults, retries included.")
+def getApiTestResults(project_code, version=-1, timeout=None, retries=0, backoff=1.0):
     """Sends a GET request to the REST API provided by Jenkins with the link 
     generated by the getApiLink method.
 
     Args:
         project_code: The internal code to the project we wish to check.
         version: The build number we wish to check.
+        timeout: Seconds to wait for the server before giving up on a request.
+            None uses the timeout of the shared HTTP client.
+        retries: How many times a failed request is retried. HTTP errors below
+            500 (e.g. a build without a test report) are never retried.
+        backoff: Seconds to wait before the first retry, doubled on every
+            following attempt.
     """
 
-    try:
-        apiResponse = ast.literal_eval(urllib.request.urlopen(getApiLink(project_code, version)).read().decode("windows-1252"))
-    except urllib.error.HTTPError as HTTP_Error:
-        log("Error fetching {0} test results: {1}: {2}".format(project_code, HTTP_Error.code, HTTP_Error.reason),
-            project_code,
-            "HTTP Error")
-        apiResponse = {"_class": "HTTP Error", 
-                       "duration": -1, 
-                       "failCount": -1, 
-                       "passCount": -1, 
-                       "skipCount": -1}
-    except urllib.error.URLError as URL_Error:
-        log("Error fetching {0} test results. {1}".format(project_code, URL_Error.reason),
+    api_link = getApiLink(project_code, version)
+    attempt = 0
+
+    while True:
+        try:
+            api_data = getProjectClient(project_code).get(api_link, timeout)
+            return CrashTrakr_json.loadJson(api_data)
+        except urllib.error.HTTPError as HTTP_Error:
+            if HTTP_Error.code < 500 or attempt >= retries:
+                log("Error fetching {0} test results: {1}: {2}".format(project_code, HTTP_Error.code, HTTP_Error.reason),
+                    project_code,
+                    "HTTP Error")
+                CrashTrakr_metrics.increment("crashtrakr_error_results_total", labels=(("type", "HTTP Error"),))
+                return {"_class": "HTTP Error", 
+                        "duration": -1, 
+                        "failCount": -1, 
+                        "passCount": -1, 
+                        "skipCount": -1}
+        except (urllib.error.URLError, OSError) as URL_Error:
+            if attempt >= retries:
+                log("Error fetching {0} test results. {1}".format(project_code, getattr(URL_Error, "reason", URL_Error)),
+                    project_code,
+                    "URL Error")
+                CrashTrakr_metrics.increment("crashtrakr_error_results_total", labels=(("type", "URL Error"),))
+                return {"_class": "URL Error", 
+                        "duration": -1, 
+                        "failCount": -1, 
+                        "passCount": -1, 
+                        "skipCount": -1}
+
+        log("Retrying {0} build {1} test results, attempt {2} of {3}".format(project_code, version, attempt + 1, retries),
             project_code,
-            "URL Error")
-        apiResponse = {"_class": "URL Error", 
-                       "duration": -1, 
-                       "failCount": -1, 
-                       "passCount": -1, 
-                       "skipCount": -1}
-    return apiResponse
+            "Warning")
+        time.sleep(backoff * (2 ** attempt))
+        attempt = attempt + 1
+
+def getFetchSettings(project_code=None):
+    """Gets the settings used when fetching many builds from the Jenkins server
+    at once. Every setting can be overridden in the config file for a project,
+    for its server or for every server:
+
+        Workers: How many requests are sent to the server at the same time.
+        Timeout: Seconds to wait for the server before a request fails.
+        Retries: How many times a failed request is retried.
+        RetryBackoff: Seconds to wait before the first retry.
+        BulkImport: Whether builds are listed a page at a time before falling
+            back to one request per build.
+        PageSize: How many builds are listed in a single bulk request.
+
+    Args:
+        project_code: The internal code to the project we wish to fetch. None
+            gets the settings at the top of the config file.
+    """
+
+    loadConfig()
+    registry = CrashTrakr_config.getRegistry()
+    return {"Workers": int(registry.getProjectSetting(project_code, "Workers", 8)),
+            "Timeout": registry.getProjectSetting(project_code, "Timeout", 30),
+            "Retries": int(registry.getProjectSetting(project_code, "Retries", 3)),
+            "RetryBackoff": registry.getProjectSetting(project_code, "RetryBackoff", 1.0),
+            "BulkImport": bool(registry.getProjectSetting(project_code, "BulkImport", True)),
+            "PageSize": int(registry.getProjectSetting(project_code, "PageSize", 100))}
+
+def fetchTestResults(project_code, build_numbers, workers=None):
+    """Fetches the test results of many builds in parallel, using a bounded 
+    number of worker threads.
+
+    Args:
+        project_code: The internal code to the project we wish to check.
+        build_numbers: The build numbers we wish to get results for.
+        workers: How many requests are sent at the same time. Defaults to the
+            Workers setting of the Jenkins server.
+
+    Yields:
+        (build_number, test_results) pairs, in the same order as build_numbers,
+        regardless of the order in which the requests finish.
+    """
+
+    settings = getFetchSettings(project_code)
+    if workers is None:
+        workers = settings["Workers"]
+
+    def fetch(build_number):
+        return getApiTestResults(project_code, build_number,
+                                 timeout=settings["Timeout"],
+                                 retries=settings["Retries"],
+                                 backoff=settings["RetryBackoff"])
+
+    from concurrent.futures import ThreadPoolExecutor
+    build_numbers = list(build_numbers)
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        for build_number, test_results in zip(build_numbers, executor.map(fetch, build_numbers)):
+            yield build_number, test_results
+
+def getBulkTestResults(project_code, first_build, last_build, page_size=None, newest_build=None):
+    """Gets the test results of a range of builds by listing the builds of the
+    project a page at a time, instead of sending one request per build.
+
+    Args:
+        project_code: The internal code to the project we wish to check.
+        first_build: The oldest build number we wish to get results for.
+        last_build: The newest build number we wish to get results for.
+        page_size: How many builds are listed in a single request. Defaults to
+            the PageSize setting of the Jenkins server.
+        newest_build: The newest build of the project, if known. The listing
+            then starts where last_build should be instead of at the newest
+            build. Builds skipped because Jenkins deleted older builds are
+            left out, like builds without a test report.
+
+    Returns:
+        A dictionary of build numbers and their test results. Builds without a
+        test report, or that could not be listed, are left out.
+    """
+
+    settings = getFetchSettings(project_code)
+    if page_size is None:
+        page_size = settings["PageSize"]
+
+    complete_build_data = {}
+    first_index = 0
+    if newest_build is not None:
+        first_index = max(0, newest_build - last_build)
+
+    while True:
+        builds_link = getBuildsRangeLink(project_code, first_index, first_index + page_size)
+        try:
+            api_data = getProjectClient(project_code).get(builds_link, settings["Timeout"])
+        except urllib.error.HTTPError as HTTP_Error:
+            log("Error listing {0} builds: {1}: {2}".format(project_code, HTTP_Error.code, HTTP_Error.reason),
+                project_code,
+                "HTTP Error")
+            break
+        except (urllib.error.URLError, OSError) as URL_Error:
+            log("Error listing {0} builds. {1}".format(project_code, getattr(URL_Error, "reason", URL_Error)),
+                project_code,
+                "URL Error")
+            break
+
+        listed_builds = 0
+        oldest_listed_build = None
+        for build in CrashTrakr_json.iterJsonItems(api_data, "builds.item"):
+            listed_builds = listed_builds + 1
+            oldest_listed_build = build["number"]
+            if not first_build <= build["number"] <= last_build:
+                continue
+            for action in build.get("actions", []):
+                if action and "failCount" in action:
+                    complete_build_data[build["number"]] = {
+                        "_class": "hudson.tasks.junit.TestResult",
+                        "failCount": action["failCount"],
+                        "passCount": action["totalCount"] - action["failCount"] - action["skipCount"],
+                        "skipCount": action["skipCount"],
+                        "duration": -1}
+                    break
+
+        if listed_builds < page_size or oldest_listed_build <= first_build:
+            break
+        first_index = first_index + page_size
+
+    log("Listed {0} builds in bulk".format(len(complete_build_data)), project_code)
+    return complete_build_data
+
+def getBuildRuns(build_numbers):
+    """Splits build numbers into runs of consecutive builds.
+
+    Args:
+        build_numbers: Sorted build numbers.
+
+    Returns:
+        A list of (first build, last build) tuples.
+    """
+
+    build_runs = []
+    for build_number in build_numbers:
+        if build_runs and build_runs[-1][1] == build_number - 1:
+            build_runs[-1][1] = build_number
+        else:
+            build_runs.append([build_number, build_number])
+    return [tuple(build_run) for build_run in build_runs]
+
+def importTestResults(project_code, build_numbers, newest_build=None):
+    """Gets the test results of many builds, listing them in bulk when the 
+    BulkImport setting is on and fetching only the builds the bulk listing left
+    out one by one. Only runs of at least BulkMinimum consecutive builds are
+    listed in bulk, scattered builds are fetched one by one in parallel.
+
+    Args:
+        project_code: The internal code to the project we wish to check.
+        build_numbers: The build numbers we wish to get results for.
+        newest_build: The newest build of the project, if known. Bulk listings
+            then start at the builds asked for instead of at the newest one.
+
+    Yields:
+        (build_number, test_results) pairs, in the same order as build_numbers.
+    """
+
+    build_numbers = list(build_numbers)
+    if not build_numbers:
+        return
+
+    bulk_build_data = {}
+    if getFetchSettings(project_code)["BulkImport"]:
+        bulk_minimum = int(CrashTrakr_config.getRegistry().getProjectSetting(project_code, "BulkMinimum", 5))
+        for first_build, last_build in getBuildRuns(sorted(build_numbers)):
+            if last_build - first_build + 1 >= bulk_minimum:
+                bulk_build_data.update(getBulkTestResults(project_code, first_build, last_build, newest_build=newest_build))
+
+    missing_builds = [build_number for build_number in build_numbers if build_number not in bulk_build_data]
+    fetched_build_data = fetchTestResults(project_code, missing_builds)
+
+    for build_number in build_numbers:
+        if build_number in bulk_build_data:
+            yield build_number, bulk_build_data[build_number]
+        else:
+            yield next(fetched_build_data)
 
 def getPastTestResults(project_code, number_of_builds=6):
     """Gets the last test results for a certain project.
@@ -276,17 +577,14 @@ def getPastTestResults(project_code, number_of_builds=6):
         TypeError: If the requested number of builds is not an integer.
     """
 
-    complete_build_data = []
-
     if type(number_of_builds) is not int:
         log("Number of builds must be an integer",project_code,"Error")
         raise TypeError("Number_of_builds must be an integer!")
 
-    for build in range(number_of_builds):
-        complete_build_data.append(getApiTestResults(project_code, 
-            getLastCompletedBuildNumber(project_code) - build))
+    last_build = getLastCompletedBuildNumber(project_code)
+    build_numbers = [last_build - build for build in range(number_of_builds)]
 
-    return complete_build_data
+    return [test_results for build_number, test_results in importTestResults(project_code, build_numbers)]
 
 def consolePrintTestResults(project_code):
     """Prints the results got from the REST API to the console
@@ -330,96 +628,228 @@ def consolePrintTestResults(project_code):
 
         saveTestData(project_code, getLastCompletedBuildNumber(project_code), 
                     total_tests, 
-                    test_results["failCount"])
-
-def savePastTestResults(project_code, number_of_builds=0):
-
-    test_data = getPastTestResults(project_code,number_of_builds)
-    counter = number_of_builds
-    for test_results in test_data:
-        saved_results = []
-        if test_results["_class"] is not "Error":
-            fail_percentage = test_results["failCount"] / (test_results["failCount"] + test_results["passCount"]) * 100
-            total_tests = test_results["failCount"] + test_results["passCount"]
-            saveTestData(project_code, getLastCompletedBuildNumber(project_code)-counter, 
-                        total_tests, 
-                        test_results["failCount"])
-            log("Loaded past test data, with known data",project_code)
+                    test_results["failCount"],
+                    test_results.get("skipCount", -1),
+                    getDurationMilliseconds(test_results))
+
+def printSavedResults(project_code):
+    """Prints the newest saved build of a project to the console, in the same
+    form as consolePrintTestResults, without asking Jenkins for it again.
+
+    Args:
+        project_code: The internal code to the project we wish to show.
+    """
+
+    rows = CrashTrakr_store.readBuilds(project_code, limit=1)
+    if not rows or rows[0][1] <= 0:
+        print("=-=-=-=-=-=-=-=-=-=-=-=-=-=-=\n"
+              "Project Code: {0}\n".format(project_code)+
+              "Total Tests: ???\n"+
+              "Failed Tests: ???\n"+
+              "Fail Percentage: ???%\n"+
+              "=-=-=-=-=-=-=-=-=-=-=-=-=-=-=\n\n")
+        return
+
+    build, total_tests, failed_tests = rows[0][:3]
+    print("=-=-=-=-=-=-=-=-=-=-=-=-=-=-=\n"
+          "Project Code: {0}\n".format(project_code)+
+          "Last Build: {0}\n".format(build)+
+          "Total Tests: {0}\n".format(total_tests)+
+          "Failed Tests: {0}\n".format(failed_tests)+
+          "Fail Percentage: {0}%\n".format(format(failed_tests / total_tests * 100, ".2f"))+
+          "=-=-=-=-=-=-=-=-=-=-=-=-=-=-=\n\n")
+
+def isErrorResult(test_results):
+    """Checks if the results received from the REST API are one of the error
+    placeholders built when a request fails.
+
+    Args:
+        test_results: The results received from getApiTestResults.
+    """
+
+    return test_results["_class"] in ("HTTP Error", "URL Error")
+
+def getDurationMilliseconds(test_results):
+    """Converts the test duration received from the REST API, in seconds, to
+    the whole milliseconds kept in the history store. Returns -1 if unknown.
+
+    Args:
+        test_results: The results received from getApiTestResults.
+    """
+
+    duration = test_results.get("duration", -1)
+    if duration is None or duration < 0:
+        return -1
+    return int(round(duration * 1000))
+
+def getSavedResults(build_number, test_results):
+    """Converts the results received from the REST API for a single build to a
+    row of the history store, with -1 placeholders if the request failed.
+
+    Args:
+        build_number: The build the results belong to.
+        test_results: The results received from getApiTestResults.
+
+    Returns:
+        A (build, total, failed, skipped, duration) tuple.
+    """
+
+    if isErrorResult(test_results):
+        return (build_number, -1, -1, -1, -1)
+    return (build_number, 
+            test_results["failCount"] + test_results["passCount"], 
+            test_results["failCount"], 
+            test_results.get("skipCount", -1), 
+            getDurationMilliseconds(test_results))
+
+def getSyncFirstBuild(project_code, last_build):
+    """Gets the oldest build kept in sync with Jenkins, the last SyncHistory
+    builds of the project, 0 meaning the whole history.
+
+    Args:
+        project_code: The internal code to the project we wish to sync.
+        last_build: The last completed build ID.
+    """
+
+    sync_history = int(CrashTrakr_config.getRegistry().getProjectSetting(project_code, "SyncHistory", 1000))
+    if sync_history <= 0:
+        return 1
+    return max(1, last_build - sync_history + 1)
+
+def resyncProject(project_code, last_build=None, first_build=None):
+    """Brings the saved history of a project up to date by fetching only the
+    builds the store is missing, or holds with unknown results after a failed
+    request, so catching up after downtime costs work proportional to the gap.
+    The builds are fetched in parallel and saved in batches. Builds that keep
+    failing are given up on after SyncAttempts tries.
+
+    Args:
+        project_code: The internal code to the project we wish to sync.
+        last_build: The last completed build ID, if already known.
+        first_build: The oldest build number to check. Defaults to the last
+            SyncHistory builds, 0 meaning the whole history.
+
+    Returns:
+        A dictionary with the number of builds that were "missing", "saved" 
+        and that "failed" to fetch.
+    """
+
+    registry = CrashTrakr_config.getRegistry()
+    if last_build is None:
+        last_build = getLastCompletedBuildNumber(project_code)
+    if last_build <= 0:
+        return {"missing": 0, "saved": 0, "failed": 0}
+
+    if first_build is None:
+        first_build = getSyncFirstBuild(project_code, last_build)
+    first_build = max(1, first_build)
+    max_attempts = int(registry.getProjectSetting(project_code, "SyncAttempts", 3))
+    save_batch = int(registry.getProjectSetting(project_code, "SaveBatch", 500))
+
+    missing_builds = CrashTrakr_store.findMissingBuilds(project_code, first_build, last_build, max_attempts)
+    saved_builds = []
+    failed_builds = []
+    rows = []
+    for build_number, test_results in importTestResults(project_code, missing_builds, newest_build=last_build):
+        rows.append(getSavedResults(build_number, test_results))
+        if isErrorResult(test_results):
+            failed_builds.append(build_number)
         else:
-            saveTestData(project_code, getLastCompletedBuildNumber(project_code)-counter, -1, -1)
-            log("No test data available", project_code)
-        counter = counter-1
-        print(counter)
+            saved_builds.append(build_number)
+        if len(rows) >= save_batch:
+            CrashTrakr_store.appendBuilds(project_code, rows)
+            rows = []
+    if rows:
+        CrashTrakr_store.appendBuilds(project_code, rows)
+
+    if failed_builds:
+        CrashTrakr_store.recordFetchFailures(project_code, failed_builds)
+    if saved_builds:
+        CrashTrakr_store.clearFetchFailures(project_code, saved_builds)
+
+    log("Synced builds {0} to {1}: {2} missing, {3} saved, {4} failed".format(
+            first_build, last_build, len(missing_builds), len(saved_builds), len(failed_builds)),
+        project_code)
+    return {"missing": len(missing_builds), "saved": len(saved_builds), "failed": len(failed_builds)}
+
+def savePastTestResults(project_code, number_of_builds=0, last_build=None):
+    """Saves the test results of the last builds of a project that are not
+    saved yet, oldest first.
+
+    Args:
+        project_code: The internal code to the project data we wish to save.
+        number_of_builds: How many builds in the past we wish to save results for.
+        last_build: The last completed build ID, if already known.
+    """
+
+    if last_build is None:
+        last_build = getLastCompletedBuildNumber(project_code)
+    if number_of_builds > 0:
+        resyncProject(project_code, last_build, last_build - number_of_builds + 1)
 
 def populateFreshResults(project_code):
     """Populates the CrashTrakr test results in case we are running a fresh 
-    instance with no previous data.
+    instance with no previous data. Builds that are already saved are not
+    fetched again.
 
     Args:
         project_code: The internal code to the project data we wish to save.
     """
 
-    maxBuild = getLastCompletedBuildNumber(project_code)
-    for buildNumber in list(range(1 , maxBuild+1)):
-        test_results = getApiTestResults(project_code, buildNumber)
-        saved_results = []
-        if test_results["_class"] is not "Error":
-            fail_percentage = test_results["failCount"] / (test_results["failCount"] + test_results["passCount"]) * 100
-            total_tests = test_results["failCount"] + test_results["passCount"]
-
-            saved_results.append(buildNumber)
-            saved_results.append(total_tests)
-            saved_results.append(test_results["failCount"])
-            
-            print(saved_results)
-            saveTestData(project_code, buildNumber, 
-                    total_tests, 
-                    test_results["failCount"])
-        else:
-            saved_results.append(buildNumber)
-            saved_results.append(-1)
-            saved_results.append(-1)
-            print(saved_results)
-            saveTestData(project_code, buildNumber, 
-                    -1, 
-                    -1)
-
-def retryAutomatedTestBuild(project_code):
+    resyncProject(project_code, first_build=1)
+
+def retryAutomatedTestBuild(project_code, build=None):
     """Retries the automated tests build if the previous build ended up with more errors than before.
+    The retry is queued and triggered by CrashTrakr_retry, which limits how many
+    retries run on the Jenkins server at once. Retries are only queued in 
+    daemon mode.
 
     Args:
         project_code: The internal code to the project we wish to rebuild.
-    """
+        build: The build that failed, if known.
 
-    project_data = loadConfig()
+    Returns:
+        True if the retry was queued, False if one is already waiting or 
+        running.
+    """
 
-    project_data = loadConfig()
-    token_dictionary = {}
+    return CrashTrakr_retry.requestRetry(project_code, build)
 
-    for project in project_data["Projects"]:
-        token_dictionary[project["Code"]] = project["BuildToken"]
+def compareTestResultsToPreviousBuild(project_code, threshold=100):
+    """Checks if the last saved build of a project looks like a regression: its
+    fail rate spikes above the rolling fail rate of the builds before it, or it
+    failed more than threshold tests more than the previous build.
 
-    query_data = {  "token": token_dictionary[project_code],
-                    "delay": 0}
+    Args:
+        project_code: The internal code to the project we wish to check.
+        threshold: How many more failed tests count as a regression on their
+            own.
 
-    encoded_data = parse.urlencode(query_data).encode()
-    req = request.Request(getProjectLink() + "/build", data=encoded_data)
-    resp = request.urlopen(req)
-    print(resp)
+    Returns:
+        The CrashTrakr_analytics summary of the project, with its "regression"
+        flag set when the last build looks like a regression.
+    """
 
-def compareTestResultsToPreviousBuild(project_code, current_failed_tests, threshold=100):
-    if getApiTestResults(project_code) - getApiTestResults(project_code, getLastCompletedBuildNumber(project_code)-1) > threshold:
-        return True
+    import CrashTrakr_analytics
+    summary = CrashTrakr_analytics.analyzeProject(project_code, fail_threshold=threshold)
+    if summary["regression"]:
+        log("Build {0} looks like a regression: fail rate {1:.2%}, rolling fail rate {2:.2%}".format(
+                summary["last_build"], summary["last_fail_rate"], summary["rolling_fail_rate"] or 0),
+            project_code,
+            "Warning")
+    return summary
 
 def startPlotter():
     """Starts the CrashTrakr_plot script that shows the data to the screen"""
 
+    import subprocess
     subprocess.Popen("CrashTrakr_plot.py", shell=True)
 
 def killPlotter():
     """Searches for and closes the CrashTrakr_plot script that shows the data to
     the screen"""
 
+    import psutil
     thisPID = os.getpid()
     for proc in psutil.process_iter():
         process = psutil.Process(proc.pid)
@@ -442,34 +872,344 @@ This is free software, and you are welcome to redistribute it
 under certain conditions imposed by the MIT license.\n\n""")
     log("Printed license to console.")
 
+_applied_generation = 0
+_applied_generation_lock = threading.Lock()
+
 def loadConfig():
-    """Loads the projects from an external config file"""
-    if os.path.isfile("CrashConfig.json"):
-        project_data = json.load(open("CrashConfig.json"))
-        log("Loaded configuration data.")
-        return project_data
-    else:
+    """Loads the projects from an external config file. The file is only parsed
+    again when it changes, every other call reuses the shared project registry.
+    The Log, Http, Retry and Metrics sections are applied once per loaded 
+    config, even if another registry getter noticed the change first.
+    """
+
+    global _applied_generation
+    registry = CrashTrakr_config.getRegistry()
+    registry.checkReload()
+    config = registry.config
+    if config is None:
         log("Config file not found, cannot load data.")
+        return None
+
+    with _applied_generation_lock:
+        if registry.generation != _applied_generation:
+            _applied_generation = registry.generation
+            CrashTrakr_log.configure(config.get("Log", {}))
+            CrashTrakr_http.configure(config.get("Http", {}))
+            for server_name in registry.getServerNames():
+                CrashTrakr_http.configure(dict(config.get("Http", {}), **registry.servers[server_name].get("Http", {})), server_name)
+            CrashTrakr_retry.configure(config.get("Retry", {}))
+            CrashTrakr_metrics.configure(config.get("Metrics", {}))
+            log("Loaded configuration data.")
+    return config
+
+def hasPendingFetches(project_code):
+    """Checks whether a project has builds whose fetch failed and that are still
+    to be retried, fewer than SyncAttempts times so far.
+
+    Args:
+        project_code: The internal code to the project we wish to check.
+    """
+
+    max_attempts = int(CrashTrakr_config.getRegistry().getProjectSetting(project_code, "SyncAttempts", 3))
+    return CrashTrakr_store.countFetchFailures(project_code, max_attempts) > 0
+
+def pollProject(project_code, last_jenkins_build=None):
+    """Checks a project for builds we have not saved yet and saves them. For a
+    project without new builds, only the builds whose fetch failed before and
+    is still to be retried are fetched again.
+
+    Args:
+        project_code: The internal code to the project we wish to check.
+        last_jenkins_build: The last completed build ID, if already known.
+
+    Returns:
+        True if new builds were saved.
+    """
+
+    difference = compareBuildNumbers(project_code, last_jenkins_build)
+    print(difference)
+    if difference <= 0:
+        if not hasPendingFetches(project_code):
+            return False
+        if not resyncProject(project_code, CrashTrakr_store.getLastSeenBuild(project_code))["saved"]:
+            return False
+        printSavedResults(project_code)
+        CrashTrakr_series.exportSeries(project_code)
+        return True
+
+    last_build = CrashTrakr_store.getLastSeenBuild(project_code) + difference
+    resyncProject(project_code, last_build)
+    CrashTrakr_store.setLastSeenBuild(project_code, last_build)
+    if CrashTrakr_config.getRegistry().getProjectSetting(project_code, "IngestCases", False):
+        first_build = max(last_build - difference + 1, getSyncFirstBuild(project_code, last_build))
+        ingestTestCases(project_code, range(first_build, last_build + 1))
+    printSavedResults(project_code)
+    CrashTrakr_series.exportSeries(project_code)
+    summary = compareTestResultsToPreviousBuild(project_code)
+    if summary["regression"] and CrashTrakr_retry.getOrchestrator().enabled:
+        retryAutomatedTestBuild(project_code, summary["last_build"])
+    return True
+
+def ingestTestCases(project_code, build_numbers):
+    """Saves the result of every test case of the given builds and logs the
+    test cases that started failing in the newest one.
+
+    Args:
+        project_code: The internal code to the project we wish to save data for.
+        build_numbers: The build numbers we wish to save.
+    """
+
+    import CrashTrakr_cases
+    if CrashTrakr_cases.ingestTestCases(project_code, build_numbers):
+        for class_name, name in CrashTrakr_cases.findNewlyFailingCases(project_code):
+            log("Test case started failing: {0}.{1}".format(class_name, name), project_code, "Warning")
+
+def pollServer(server_name=None):
+    """Checks every configured project on a Jenkins server for new builds with
+    a single request to the server, then fetches and saves results only for the
+    projects that have new builds, or builds whose fetch failed and is retried.
+
+    Args:
+        server_name: The name of the Jenkins server. None polls every server at
+            once, each on its own thread, so a slow or unreachable server does
+            not hold up the others.
+
+    Returns:
+        The codes of the projects with new builds.
+    """
+
+    registry = CrashTrakr_config.getRegistry()
+    loadConfig()
+    if server_name is None:
+        server_names = registry.getServerNames()
+        if len(server_names) == 1:
+            return pollServer(server_names[0])
+        from concurrent.futures import ThreadPoolExecutor
+        with ThreadPoolExecutor(max_workers=max(1, len(server_names))) as executor:
+            return [project_code for updated_projects in executor.map(pollServer, server_names) 
+                    for project_code in updated_projects]
+
+    last_jenkins_builds = getLastCompletedBuildNumbers(server_name=server_name)
+    updated_projects = []
+    for project_code in registry.getServerProjects(server_name):
+        last_jenkins_build = last_jenkins_builds.get(project_code)
+        if (last_jenkins_build is not None and last_jenkins_build <= CrashTrakr_store.getLastSeenBuild(project_code)
+                and not hasPendingFetches(project_code)):
+            continue
+        if pollProject(project_code, last_jenkins_build):
+            updated_projects.append(project_code)
+    return updated_projects
+
+def getPollDelay(project_code):
+    """Gets the number of seconds until the next poll of a project, from its 
+    PollInterval setting spread by up to PollJitter of the interval either way,
+    so projects with the same interval do not all hit Jenkins at once.
+
+    Args:
+        project_code: The internal code to the project we wish to poll.
+    """
+
+    registry = CrashTrakr_config.getRegistry()
+    poll_interval = float(registry.getProjectSetting(project_code, "PollInterval", 60))
+    poll_jitter = float(registry.getProjectSetting(project_code, "PollJitter", 0.1))
+    return max(1.0, poll_interval * (1 + random.uniform(-poll_jitter, poll_jitter)))
+
+def getPollShards():
+    """Splits the configured projects into shards that are polled by separate
+    processes. Every Jenkins server is split into as many shards as its
+    Processes setting.
+
+    Returns:
+        A list of (server name, shard index, shard count) tuples.
+    """
+
+    registry = CrashTrakr_config.getRegistry()
+    loadConfig()
+    poll_shards = []
+    for server_name in registry.getServerNames():
+        shard_count = max(1, min(int(registry.getServerSetting(server_name, "Processes", 1)), 
+                                 len(registry.getServerProjects(server_name))))
+        poll_shards.extend((server_name, shard_index, shard_count) for shard_index in range(shard_count))
+    return poll_shards
+
+def getShardName(server_name, shard_index, shard_count):
+    """Gets the name of a poller shard, the same on every run of the daemon."""
+
+    return "{0}-{1}-of-{2}".format(server_name, shard_index, shard_count)
+
+def getShardProjects(server_name=None, shard_index=0, shard_count=1):
+    """Gets the internal codes of the projects in a shard, in config order.
+
+    Args:
+        server_name: The name of the Jenkins server. None takes the projects
+            of every server.
+        shard_index: Which of the shards of the server to take.
+        shard_count: How many shards the projects of the server are split in.
+    """
+
+    registry = CrashTrakr_config.getRegistry()
+    if server_name is None:
+        project_codes = registry.getProjectCodes()
+    else:
+        project_codes = registry.getServerProjects(server_name)
+    return project_codes[shard_index::shard_count]
+
+def runPollLoop(update_queue, stop_event, server_name=None, shard_index=0, shard_count=1):
+    """Polls every project of a shard on its own interval until stop_event is
+    set. The codes of projects with new builds are put on update_queue.
+
+    Args:
+        update_queue: queue.Queue the display reads updated project codes from.
+        stop_event: threading.Event that ends the loop once set.
+        server_name: The name of the Jenkins server to poll. None polls every
+            server.
+        shard_index: Which of the shards of the server to poll.
+        shard_count: How many shards the projects of the server are split in.
+    """
+
+    registry = CrashTrakr_config.getRegistry()
+    schedule = []
+    scheduled_projects = set()
+
+    while not stop_event.is_set():
+        try:
+            loadConfig()
+            shard_projects = getShardProjects(server_name, shard_index, shard_count)
+            for project_code in shard_projects:
+                if project_code not in scheduled_projects:
+                    poll_interval = float(registry.getProjectSetting(project_code, "PollInterval", 60))
+                    poll_jitter = float(registry.getProjectSetting(project_code, "PollJitter", 0.1))
+                    first_poll = time.monotonic() + random.uniform(0, poll_interval * poll_jitter)
+                    heapq.heappush(schedule, (first_poll, project_code))
+                    scheduled_projects.add(project_code)
+        except Exception as error:
+            log("Loading the config failed: {0}".format(error), message_type="Error")
+            stop_event.wait(5)
+            continue
+
+        if not schedule:
+            stop_event.wait(5)
+            continue
+
+        next_poll, project_code = schedule[0]
+        if stop_event.wait(max(0, next_poll - time.monotonic())):
+            break
+        heapq.heappop(schedule)
+
+        if project_code not in getShardProjects(server_name, shard_index, shard_count):
+            scheduled_projects.discard(project_code)
+            continue
+
+        try:
+            if pollProject(project_code):
+                update_queue.put(project_code)
+        except Exception as error:
+            log("Polling failed: {0}".format(error), project_code, "Error")
+        heapq.heappush(schedule, (time.monotonic() + getPollDelay(project_code), project_code))
+
+def runPollShard(update_queue, stop_event, retry_queue, log_queue, server_name, shard_index, shard_count):
+    """Runs the poll loop of a shard in a process of its own. Retries and log
+    messages are forwarded on retry_queue and log_queue to the daemon process,
+    which triggers the retries and writes the log. See runPollLoop for the
+    other arguments."""
+
+    CrashTrakr_log.forwardLogs(log_queue)
+    CrashTrakr_retry.forwardRetries(retry_queue)
+    CrashTrakr_metrics.setProcess(getShardName(server_name, shard_index, shard_count))
+    try:
+        runPollLoop(update_queue, stop_event, server_name, shard_index, shard_count)
+    except KeyboardInterrupt:
+        pass
+
+def runDaemon(show_display=True):
+    """Keeps CrashTrakr running, polling every project on its own schedule and
+    handing new builds straight to the display running in the same process,
+    instead of restarting the plotter after every poll. The query API is served
+    alongside when the Api section of the config file enables it.
+
+    With several Jenkins servers, or a server with a Processes setting above 1,
+    every shard of projects is polled by a process of its own, so one slow or
+    unreachable server cannot hold up polling of the others.
+
+    Args:
+        show_display: Whether to show the dashboard. Without it the daemon only
+            polls and saves results.
+    """
 
-def main():
     project_data = loadConfig()
-    available_projects = []
-    for project in project_data["Projects"]:
-        available_projects.append(project["Code"])
+    printLicense()
+    log("Started daemon mode.")
+    CrashTrakr_retry.startServing()
+
+    api_settings = project_data.get("Api", {})
+    if api_settings.get("Enabled", False):
+        import CrashTrakr_api
+        api_server = CrashTrakr_api.startApiServer(api_settings.get("Host", "127.0.0.1"), int(api_settings.get("Port", 8080)))
+        log("Serving the query API on port {0}.".format(api_server.server_address[1]))
+
+    import multiprocessing
+    poll_shards = getPollShards()
+    if len(poll_shards) > 1:
+        update_queue = multiprocessing.Queue()
+        stop_event = multiprocessing.Event()
+        retry_queue = multiprocessing.Queue()
+        log_queue = multiprocessing.Queue()
+        threading.Thread(target=CrashTrakr_retry.serveRetries, args=(retry_queue, stop_event),
+                         name="CrashTrakr forwarded retries", daemon=True).start()
+        threading.Thread(target=CrashTrakr_log.serveLogs, args=(log_queue, stop_event),
+                         name="CrashTrakr forwarded logs", daemon=True).start()
+        pollers = [multiprocessing.Process(target=runPollShard, args=(update_queue, stop_event, retry_queue, log_queue) + poll_shard,
+                                           name="CrashTrakr poller {0}/{1}".format(poll_shard[0], poll_shard[1]), daemon=True)
+                   for poll_shard in poll_shards]
+        log("Polling {0} servers with {1} processes.".format(len(CrashTrakr_config.getRegistry().getServerNames()), len(pollers)))
+    else:
+        update_queue = queue.Queue()
+        stop_event = threading.Event()
+        pollers = [threading.Thread(target=runPollLoop, args=(update_queue, stop_event), 
+                                    name="CrashTrakr poller", daemon=True)]
+    for poller in pollers:
+        poller.start()
+
+    try:
+        if show_display:
+            import CrashTrakr_plot
+            CrashTrakr_plot.runLive(update_queue)
+        else:
+            while any(poller.is_alive() for poller in pollers):
+                try:
+                    update_queue.get(timeout=1)
+                except queue.Empty:
+                    pass
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop_event.set()
+        for poller in pollers:
+            poller.join(10)
+            if poller.is_alive() and isinstance(poller, multiprocessing.Process):
+                log("Stopping {0}, still waiting on the server.".format(poller.name), message_type="Warning")
+                poller.terminate()
+        if len(poll_shards) > 1:
+            for poll_shard in poll_shards:
+                CrashTrakr_metrics.removeMetricsFile(getShardName(*poll_shard))
+        log("Stopped daemon mode.")
+
+def main():
+    loadConfig()
+    available_projects = CrashTrakr_config.getRegistry().getProjectCodes()
 
     printLicense()
+    pollServer()
 
     for project_code in available_projects:
-        difference = compareBuildNumbers(project_code)
-        print(difference)
-        if difference == 0:
-            consolePrintTestResults(project_code)
-        if difference > 0:
-            savePastTestResults(project_code,difference)
-            consolePrintTestResults(project_code)
         printTestData(project_code)
         #populateFreshResults(project_code)
     restartPlotter()
 
 if __name__ == "__main__":
-    main()
+    import multiprocessing
+    multiprocessing.freeze_support()
+    if "--daemon" in sys.argv:
+        runDaemon(show_display="--no-display" not in sys.argv)
+    else:
+        main()
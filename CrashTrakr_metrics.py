@@ -0,0 +1,302 @@
+""" CrashTrakr is a test data retrieval tool built to work together 
+    with Jenkins test automation projects.
+    Copyright (C) 2017 Cosmin Ștefănică
+
+    Permission is hereby granted, free of charge, to any person obtaining a copy
+    of this software and associated documentation files (the "Software"), to deal
+    in the Software without restriction, including without limitation the rights
+    to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+    copies of the Software, and to permit persons to whom the Software is
+    furnished to do so, subject to the following conditions:
+
+    The above copyright notice and this permission notice shall be included in all
+    copies or substantial portions of the Software.
+
+    THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+    IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+    FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+    AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+    LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+    OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+    SOFTWARE.
+"""
+
+import atexit
+import bisect
+import functools
+import os
+import re
+import threading
+import time
+
+METRICS_FILE = "CrashTrakr_metrics.prom"
+
+DURATION_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+class MetricsRegistry:
+    """Collects counters and timings from the hot paths of CrashTrakr and 
+    exports them in the Prometheus text format. While disabled, recording a
+    value returns right away, so the instrumentation can stay in place."""
+
+    def __init__(self, enabled=False, metrics_file=METRICS_FILE, write_interval=15):
+        """
+        Args:
+            enabled: Whether values are recorded at all.
+            metrics_file: The file the metrics are written to, for the node 
+                exporter textfile collector. None only serves them from the
+                query API.
+            write_interval: Seconds between two writes of the metrics file.
+        """
+
+        self.counters = {}
+        self.histograms = {}
+        self.descriptions = {}
+        self.lock = threading.Lock()
+        self.thread = None
+        self.process_name = None
+        self.forked = False
+        self.configure(enabled, metrics_file, write_interval)
+
+    def configure(self, enabled=False, metrics_file=METRICS_FILE, write_interval=15):
+        """Changes the settings of the registry. See __init__ for the 
+        arguments."""
+
+        self.enabled = enabled
+        self.metrics_file = metrics_file
+        self.write_interval = write_interval
+        if enabled and metrics_file and self.thread is None:
+            self.thread = threading.Thread(target=self.run, name="CrashTrakr metrics writer", daemon=True)
+            self.thread.start()
+
+    def reset(self):
+        """Forgets the values and writer thread inherited from the parent 
+        process. A forked process only writes a metrics file once it is given
+        a name with setProcess, so short-lived workers leave no files behind."""
+
+        self.counters = {}
+        self.histograms = {}
+        self.lock = threading.Lock()
+        self.thread = None
+        self.process_name = None
+        self.forked = True
+        self.configure(self.enabled, self.metrics_file, self.write_interval)
+
+    def setProcess(self, process_name):
+        """Names the process the registry runs in, e.g. a poller shard. Its 
+        metrics are then written to a file named after it, which the next run
+        of the same process replaces, and every series gets a process label so
+        the files of several processes never hold the same series.
+
+        Args:
+            process_name: A name that stays the same across restarts.
+        """
+
+        self.process_name = process_name
+        self.forked = False
+
+    def describe(self, name, description):
+        """Sets the HELP text of a metric."""
+
+        self.descriptions[name] = description
+
+    def increment(self, name, value=1, labels=()):
+        """Adds to a counter.
+
+        Args:
+            name: The name of the metric, e.g.: crashtrakr_http_requests_total
+            value: How much to add.
+            labels: (name, value) tuples telling apart the series of the metric.
+        """
+
+        if not self.enabled:
+            return
+        key = (name, labels)
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, seconds, labels=()):
+        """Records a duration in a histogram. See increment for the 
+        arguments."""
+
+        if not self.enabled:
+            return
+        key = (name, labels)
+        bucket = bisect.bisect_left(DURATION_BUCKETS, seconds)
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = [[0] * (len(DURATION_BUCKETS) + 1), 0.0]
+            histogram[0][bucket] = histogram[0][bucket] + 1
+            histogram[1] = histogram[1] + seconds
+
+    def renderMetrics(self):
+        """Formats every metric in the Prometheus text format."""
+
+        with self.lock:
+            counters = sorted(self.counters.items())
+            histograms = sorted((key, (list(histogram[0]), histogram[1])) for key, histogram in self.histograms.items())
+
+        if self.process_name is not None:
+            process_label = (("process", self.process_name),)
+            counters = [((name, process_label + labels), value) for (name, labels), value in counters]
+            histograms = [((name, process_label + labels), histogram) for (name, labels), histogram in histograms]
+
+        lines = []
+        last_name = None
+        for (name, labels), value in counters:
+            if name != last_name:
+                lines.extend(self.formatHeader(name, "counter"))
+                last_name = name
+            lines.append("{0}{1} {2}".format(name, formatLabels(labels), formatValue(value)))
+
+        for (name, labels), (bucket_counts, total) in histograms:
+            if name != last_name:
+                lines.extend(self.formatHeader(name, "histogram"))
+                last_name = name
+            count = 0
+            for bound, bucket_count in zip(DURATION_BUCKETS + ("+Inf",), bucket_counts):
+                count = count + bucket_count
+                lines.append("{0}_bucket{1} {2}".format(name, formatLabels(labels + (("le", str(bound)),)), count))
+            lines.append("{0}_sum{1} {2}".format(name, formatLabels(labels), formatValue(total)))
+            lines.append("{0}_count{1} {2}".format(name, formatLabels(labels), count))
+        return "\n".join(lines) + "\n"
+
+    def formatHeader(self, name, metric_type):
+        if name in self.descriptions:
+            yield "# HELP {0} {1}".format(name, self.descriptions[name])
+        yield "# TYPE {0} {1}".format(name, metric_type)
+
+    def getMetricsFile(self, process_name=None):
+        """Gets the file the metrics of a process are written to.
+
+        Args:
+            process_name: The name given to the process with setProcess. 
+                Defaults to the name of this process.
+        """
+
+        process_name = process_name or self.process_name
+        if process_name is None:
+            return self.metrics_file
+        root, extension = os.path.splitext(self.metrics_file)
+        return "{0}.{1}{2}".format(root, re.sub(r"[^A-Za-z0-9_.-]", "_", process_name), extension)
+
+    def removeMetricsFile(self, process_name):
+        """Removes the metrics file of a process that stopped, so collectors do
+        not keep serving its last values."""
+
+        if self.metrics_file:
+            try:
+                os.remove(self.getMetricsFile(process_name))
+            except OSError:
+                pass
+
+    def writeMetrics(self):
+        """Writes the metrics file, replacing the old one in a single step so
+        a collector never reads half a file."""
+
+        if not self.enabled or not self.metrics_file or self.forked:
+            return
+        metrics_file = self.getMetricsFile()
+        temporary_file = metrics_file + ".tmp"
+        try:
+            with open(temporary_file, mode="w") as output_file:
+                output_file.write(self.renderMetrics())
+            os.replace(temporary_file, metrics_file)
+        except OSError:
+            pass
+
+    def run(self):
+        """Writes the metrics file every write_interval seconds for as long as
+        the process runs."""
+
+        while self.enabled and self.metrics_file:
+            time.sleep(self.write_interval)
+            self.writeMetrics()
+        self.thread = None
+
+def formatLabels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join('{0}="{1}"'.format(name, str(value).replace("\\", "\\\\").replace('"', '\\"')) for name, value in labels) + "}"
+
+def formatValue(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+_registry = MetricsRegistry()
+
+def getRegistry():
+    """Gets the metrics registry shared by every CrashTrakr module running in
+    this process."""
+
+    return _registry
+
+def configure(metrics_settings):
+    """Configures the shared metrics registry from the Metrics section of the
+    config file.
+
+    Args:
+        metrics_settings: Dictionary with any of Enabled, File and 
+            WriteInterval.
+    """
+
+    _registry.configure(enabled=metrics_settings.get("Enabled", False),
+                        metrics_file=metrics_settings.get("File", METRICS_FILE),
+                        write_interval=metrics_settings.get("WriteInterval", 15))
+
+def increment(name, value=1, labels=()):
+    """Adds to a counter of the shared registry. See MetricsRegistry.increment."""
+
+    if _registry.enabled:
+        _registry.increment(name, value, labels)
+
+def observe(name, seconds, labels=()):
+    """Records a duration in the shared registry. See MetricsRegistry.observe."""
+
+    if _registry.enabled:
+        _registry.observe(name, seconds, labels)
+
+def timed(name, description=None):
+    """Decorates a function so every call is timed into a histogram of the
+    shared registry. While metrics are disabled the only cost is one
+    attribute check per call.
+
+    Args:
+        name: The name of the metric, e.g.: crashtrakr_save_seconds
+        description: The HELP text of the metric.
+    """
+
+    if description is not None:
+        _registry.describe(name, description)
+
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not _registry.enabled:
+                return function(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                _registry.observe(name, time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+def setProcess(process_name):
+    """Names the process of the shared registry. See MetricsRegistry.setProcess."""
+
+    _registry.setProcess(process_name)
+
+def removeMetricsFile(process_name):
+    """Removes the metrics file of a stopped process. See 
+    MetricsRegistry.removeMetricsFile."""
+
+    _registry.removeMetricsFile(process_name)
+
+def renderMetrics():
+    """Formats the shared registry in the Prometheus text format."""
+
+    return _registry.renderMetrics()
+
+atexit.register(_registry.writeMetrics)
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_registry.reset)
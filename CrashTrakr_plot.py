@@ -24,84 +24,335 @@
 import matplotlib.pyplot as plt
 import matplotlib.patches as mpatches
 import matplotlib
-import pickle
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+from matplotlib.ticker import MaxNLocator, MultipleLocator
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import argparse
 import datetime
-import os
+import hashlib
 import json
+import math
+import os
+import time
+import CrashTrakr_config
+import CrashTrakr_metrics
+import CrashTrakr_store
+import CrashTrakr_series
 
-def loadTestData(project_code):
-    """Loads the serialized pickle file that holds all the data we have on the test runs.
+def loadTestData(project_code, limit=None):
+    """Loads the data we have on the test runs from the history store.
 
     Args:
         project_code: The internal code to the project we wish to load data for.
+        limit: How many of the newest builds we wish to load. None loads all.
     """
 
-    with open ("CrashTrakr_data_" + project_code, mode="rb") as test_data_file:
-        test_data = pickle.load(test_data_file)
-        print(test_data)
-    return test_data
+    return [[build[0], build[1], build[2]] for build in CrashTrakr_store.readBuilds(project_code, limit=limit)]
 
-def plotTestData(project_code, plot_position, night_mode):
-    """Plots the serialized test data we have saved.
+def getShownBuilds(project_code):
+    """Gets how many of the newest builds the chart of a project covers, from
+    the ShownBuilds setting."""
+
+    return int(CrashTrakr_config.getRegistry().getProjectSetting(project_code, "ShownBuilds", 15))
+
+def loadDashboardData(project_codes, pixel_width=None):
+    """Loads the visible builds of many projects at the same time.
 
     Args:
-        project_code: The internal code to the project we wish to load data for.
-        plot_position: matplotlib specific plot position. Available values: 311/312/313
+        project_codes: The internal codes to the projects we wish to load.
+        pixel_width: The width of every chart in pixels. Projects showing more
+            builds than that are loaded aggregated. None never aggregates.
+
+    Returns:
+        A dictionary of project codes and (series, level) tuples, where level
+        is how many builds every row of the series covers.
+    """
+
+    project_codes = list(project_codes)
+    if not project_codes:
+        return {}
+
+    def load(project_code):
+        shown_builds = getShownBuilds(project_code)
+        return CrashTrakr_series.getDisplaySeries(project_code, shown_builds, pixel_width or shown_builds)
+
+    workers = int(CrashTrakr_config.getRegistry().getProjectSetting(None, "Workers", 8))
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(project_codes)))) as executor:
+        return dict(zip(project_codes, executor.map(load, project_codes)))
+
+def getGridShape(number_of_projects):
+    """Gets the (rows, columns) of the grid the projects are plotted on. Up to 
+    three projects are stacked in a single column, more are laid out on a grid
+    that is as close to square as possible.
+
+    Args:
+        number_of_projects: How many projects are plotted.
     """
 
-    failedTests = []
-    builds = []
-    completedTests = []
-    test_data = []
+    if number_of_projects <= 3:
+        return max(1, number_of_projects), 1
+    columns = math.ceil(math.sqrt(number_of_projects))
+    return math.ceil(number_of_projects / columns), columns
+
+class ProjectPanel:
+    """The chart of a single project. The filled areas, contour lines and legend
+    are created once and then updated in place whenever new builds arrive, 
+    instead of being plotted again from scratch."""
 
     color_completed = "#18B5E8"
     color_failed = "#E53020"
     contour_completed = "#0BA7D6"
     contour_failed = "#BA1200"
-    shown_builds = 15
-    
-    if night_mode:
-        title_color = "white"
-        axis_color = "white"
-        tick_color = "white"
-        plot_color = ".3"
+
+    def __init__(self, axes, project_code, night_mode, shown_builds=None, animated=False):
+        """
+        Args:
+            axes: The matplotlib axes the project is plotted on.
+            project_code: The internal code to the project we wish to plot.
+            night_mode: Whether the figure uses the dark colors.
+            shown_builds: How many of the newest builds are shown. Defaults to
+                the ShownBuilds setting of the project.
+            animated: Whether the data artists are left out of normal figure
+                draws so they can be redrawn on their own with blitting.
+        """
+
+        self.axes = axes
+        self.project_code = project_code
+        self.shown_builds = shown_builds or getShownBuilds(project_code)
+        self.margin = max(5, self.shown_builds // 4)
+        self.limits = None
+        self.background = None
+
+        if night_mode:
+            title_color = "white"
+            tick_color = "white"
+            plot_color = ".3"
+        else:
+            title_color = "black"
+            tick_color = "black"
+            plot_color = ".9"
+
+        axes.set_facecolor(plot_color)
+        axes.set_title(project_code, color=title_color)
+        axes.grid(True,linewidth="0.5")
+        axes.tick_params(colors=tick_color)
+
+        self.completed_fill = axes.fill_between([], [], color=self.color_completed, antialiased=True, animated=animated)
+        self.failed_fill = axes.fill_between([], [], color=self.color_failed, antialiased=True, animated=animated)
+        self.completed_line, = axes.plot([], [], color=self.contour_completed, antialiased=True, linewidth="0.5", animated=animated)
+        self.failed_line, = axes.plot([], [], color=self.contour_failed, antialiased=True, linewidth="0.5", animated=animated)
+
+        self.legend = axes.legend(handles=[mpatches.Patch(color=self.color_failed, label="Failed Tests"),
+                                           mpatches.Patch(color=self.color_completed, label="Completed Tests"),
+                                           mpatches.Patch(color="gray", label="Last build no."),
+                                           mpatches.Patch(color="gray", label="Generated at")])
+        self.legend.set_animated(animated)
+
+    def getArtists(self):
+        """Gets every artist whose look depends on the project data."""
+
+        return [self.completed_fill, self.failed_fill, self.completed_line, self.failed_line, self.legend]
+
+    def update(self, test_data=None, level=1):
+        """Updates the artists with the newest builds of the project.
+
+        Args:
+            test_data: The series to show. Defaults to the newest saved builds
+                of the project, aggregated if they do not fit the chart width.
+            level: How many builds every row of test_data covers.
+
+        Returns:
+            True if the axis limits changed, which means the whole figure has to
+            be drawn again instead of only the artists. The limits leave room
+            for the next margin builds and for more tests, so most new builds
+            only need the artists redrawn.
+        """
+
+        if test_data is None:
+            test_data, level = CrashTrakr_series.getDisplaySeries(self.project_code, self.shown_builds, 
+                                                                  max(1, int(self.axes.bbox.width)))
+        if not len(test_data):
+            return False
+
+        shown_data = test_data.last(-(-self.shown_builds // level))
+        builds = shown_data.values("build")
+        completedTests = shown_data.values("total")
+        failedTests = shown_data.values("failed")
+        if level == 1:
+            last_build = test_data[-1]
+        else:
+            last_build = CrashTrakr_series.getSeries(self.project_code, 1)[-1]
+
+        self.completed_fill.set_verts([getAreaVertices(builds, completedTests)])
+        self.failed_fill.set_verts([getAreaVertices(builds, failedTests)])
+        self.completed_line.set_data(builds, completedTests)
+        self.failed_line.set_data(builds, failedTests)
+
+        legend_texts = self.legend.get_texts()
+        legend_texts[0].set_text("Failed Tests: " + str(last_build[2]))
+        legend_texts[1].set_text("Completed Tests: " + str(last_build[1]))
+        legend_texts[2].set_text("Last build no.: " + str(last_build[0]))
+        legend_texts[3].set_text("Generated at: " + str(datetime.datetime.now().strftime("%Y-%m-%d %H:%M")))
+
+        limits = self.getLimits(last_build[0], int(completedTests.max()))
+        if limits == self.limits:
+            return False
+
+        self.limits = limits
+        self.axes.axis(limits)
+        if self.shown_builds + self.margin <= 30:
+            self.axes.xaxis.set_major_locator(MultipleLocator(1))
+        else:
+            self.axes.xaxis.set_major_locator(MaxNLocator(integer=True))
+        return True
+
+    def getLimits(self, last_build, max_tests):
+        """Gets the axis limits for the newest build and the highest test count
+        shown. The current limits are kept while the newest build still fits in
+        the margin on the right and the test count fits under the top with 
+        less than half of the chart left empty.
+
+        Args:
+            last_build: The newest build number.
+            max_tests: The highest completed test count shown.
+
+        Returns:
+            An (x min, x max, y min, y max) tuple.
+        """
+
+        if self.limits is not None:
+            x_min, x_max, y_min, y_max = self.limits
+            builds_fit = x_min + self.shown_builds - 1 <= last_build <= x_max
+            tests_fit = max_tests + 10 <= y_max <= 2 * (max_tests + 10)
+            if builds_fit and tests_fit:
+                return self.limits
+            if builds_fit:
+                return (x_min, x_max, 0, int(max_tests * 1.1) + 10)
+            if tests_fit:
+                return (last_build - self.shown_builds + 1, last_build + self.margin, 0, y_max)
+        return (last_build - self.shown_builds + 1, last_build + self.margin, 0, int(max_tests * 1.1) + 10)
+
+    def drawArtists(self):
+        """Draws the data artists on top of the saved background."""
+
+        for artist in self.getArtists():
+            self.axes.draw_artist(artist)
+
+def getAreaVertices(builds, tests):
+    """Gets the outline of the area between a line of test counts and zero, the
+    same polygon fill_between draws.
+
+    Args:
+        builds: The build numbers along the x axis.
+        tests: The test counts along the y axis.
+    """
+
+    return [(builds[0], 0)] + list(zip(builds, tests)) + [(builds[-1], 0)]
+
+@CrashTrakr_metrics.timed("crashtrakr_plot_test_data_seconds", "Time spent setting up a chart in plotTestData.")
+def plotTestData(project_code, plot_position, night_mode, test_data=None, level=1):
+    """Plots the serialized test data we have saved.
+
+    Args:
+        project_code: The internal code to the project we wish to load data for.
+        plot_position: matplotlib specific plot position, either a three digit
+            code such as 311 or a (rows, columns, index) tuple.
+        night_mode: Whether the figure uses the dark colors.
+        test_data: The series to plot, if already loaded.
+        level: How many builds every row of test_data covers.
+
+    Returns:
+        The ProjectPanel the project was plotted on.
+    """
+
+    if isinstance(plot_position, tuple):
+        axes = plt.subplot(*plot_position)
     else:
-        title_color = "black"
-        axis_color = "black"
-        tick_color = "black"
-        plot_color = ".9"
-
-    test_data = loadTestData(project_code)
-    for item in test_data:
-        builds.append(item[0])
-        completedTests.append(item[1])
-        failedTests.append(item[2])
-
-    plt.subplot(plot_position, facecolor=plot_color).set_title(project_code, color=title_color)
-    plt.axis([max(builds)-shown_builds+1, max(builds) + 5, 0, max(completedTests) + 10], color=axis_color)
-    plt.grid(True,linewidth="0.5")
-    plt.xticks(builds[0:shown_builds],color=tick_color)
-    plt.yticks(color=tick_color)
-
-    plt.fill_between(builds[0:shown_builds], completedTests[0:shown_builds], color=color_completed, antialiased=True)
-    plt.fill_between(builds[0:shown_builds], failedTests[0:shown_builds], color=color_failed, antialiased=True)
-    plt.plot(builds[0:shown_builds], completedTests[0:shown_builds], color=contour_completed, antialiased=True, linewidth="0.5")
-    plt.plot(builds[0:shown_builds], failedTests[0:shown_builds], color=contour_failed, antialiased=True, linewidth="0.5")
-
-    failed_patch = mpatches.Patch(color=color_failed, label="Failed Tests: " + str(test_data[0][2]))
-    completed_patch = mpatches.Patch(color=color_completed, label="Completed Tests: " + str(test_data[0][1]))
-    builds_patch = mpatches.Patch(color="gray", label="Last build no.: " + str(test_data[0][0]))
-    generated_patch = mpatches.Patch(color="gray", label="Generated at: " + str(datetime.datetime.now().strftime("%Y-%m-%d %H:%M")))
-
-    plt.legend(handles=[failed_patch, completed_patch, builds_patch, generated_patch])
+        axes = plt.subplot(plot_position)
+    panel = ProjectPanel(axes, project_code, night_mode)
+    panel.update(test_data, level)
+    return panel
+
+class LiveDashboard:
+    """Keeps the charts of every project alive between refreshes. New builds
+    only update the data of the affected charts, which are then redrawn on
+    their own with blitting when the axes did not change."""
+
+    def __init__(self, figure, night_mode):
+        """
+        Args:
+            figure: The figure the dashboard is drawn on.
+            night_mode: Whether the figure uses the dark colors.
+        """
+
+        self.figure = figure
+        self.panels = {}
+        self.last_render_time = None
+
+        available_projects = CrashTrakr_config.getRegistry().getProjectCodes()
+        rows, columns = getGridShape(len(available_projects))
+        dashboard_data = loadDashboardData(available_projects, figure.get_figwidth() * figure.dpi / columns)
+        for index, project_code in enumerate(available_projects):
+            axes = figure.add_subplot(rows, columns, index + 1)
+            self.panels[project_code] = ProjectPanel(axes, project_code, night_mode, animated=True)
+            self.panels[project_code].update(*dashboard_data[project_code])
+        figure.tight_layout(pad=0, w_pad=0, h_pad=0)
+        figure.canvas.mpl_connect("draw_event", self.onDraw)
+
+    def onDraw(self, event):
+        """Saves the background of every chart after a full figure draw, then
+        draws the animated artists on top of it."""
+
+        canvas = self.figure.canvas
+        for panel in self.panels.values():
+            panel.background = canvas.copy_from_bbox(panel.axes.bbox)
+            panel.drawArtists()
+
+    def refresh(self, updated_projects):
+        """Shows the newest builds of the updated projects and reports how long
+        the frame took to render.
+
+        Args:
+            updated_projects: The codes of the projects with new builds.
+
+        Returns:
+            The render time in seconds.
+        """
+
+        start = time.perf_counter()
+        canvas = self.figure.canvas
+        updated_panels = [self.panels[project_code] for project_code in updated_projects if project_code in self.panels]
+
+        full_draw = False
+        for panel in updated_panels:
+            if panel.update():
+                full_draw = True
+
+        if full_draw or not canvas.supports_blit or any(panel.background is None for panel in updated_panels):
+            full_draw = True
+            canvas.draw()
+        else:
+            for panel in updated_panels:
+                canvas.restore_region(panel.background)
+                panel.drawArtists()
+                canvas.blit(panel.axes.bbox)
+        canvas.flush_events()
+
+        self.last_render_time = time.perf_counter() - start
+        CrashTrakr_metrics.observe("crashtrakr_render_seconds", self.last_render_time, 
+                                   labels=(("mode", "full" if full_draw else "blit"),))
+        print("Rendered {0} project(s) in {1:.1f} ms".format(len(updated_panels), self.last_render_time * 1000))
+        return self.last_render_time
 
 def loadConfig():
-    """Loads the projects from an external config file"""
-    if os.path.isfile("CrashConfig.json"):
-        project_data = json.load(open("CrashConfig.json"))
-        return project_data
-    else:
+    """Loads the projects from an external config file, through the project 
+    registry shared with CrashTrakr_main."""
+
+    project_data = CrashTrakr_config.getRegistry().getConfig()
+    if project_data is None:
         return -1
+    return project_data
 
 def printLicense():
     print(  
@@ -111,33 +362,218 @@ def printLicense():
         "under certain conditions imposed by the MIT license."
         )
 
-def main():
-    now = datetime.datetime.now()
-    print(now)
-    night_mode = False
-    printLicense()
+def createFigure():
+    """Creates the dashboard figure, with a light background during the day and
+    a dark one at night.
+
+    Returns:
+        (figure, night_mode)
+    """
+
+    print(datetime.datetime.now())
     matplotlib.rcParams["toolbar"] = "None"
 
-    if int(now.hour) in range(10,16):
-        plt.figure(facecolor=".8")
-        night_mode = False
-    else:
-        plt.figure(facecolor=".2")
-        night_mode = True
-
-    project_data = loadConfig()
-    available_projects = []
-    for project in project_data["Projects"]:
-        available_projects.append(project["Code"])
-
-    position = 311
-    for project_code in available_projects:
-        plotTestData(project_code, position, night_mode)
-        position = position + 1
+    night_mode = isNightMode()
+    figure = plt.figure(facecolor=getFigureColor(night_mode))
+    return figure, night_mode
+
+def isNightMode():
+    """Checks if the dashboard should use the dark colors, which it does 
+    outside of 10:00-16:00."""
+
+    return int(datetime.datetime.now().hour) not in range(10,16)
+
+def getFigureColor(night_mode):
+    """Gets the background color of the dashboard figure."""
+
+    return ".2" if night_mode else ".8"
+
+def drawDashboard(night_mode):
+    """Plots every configured project on the current figure.
+
+    Args:
+        night_mode: Whether the figure uses the dark colors.
+    """
+
+    available_projects = CrashTrakr_config.getRegistry().getProjectCodes()
+    rows, columns = getGridShape(len(available_projects))
+    figure = plt.gcf()
+    dashboard_data = loadDashboardData(available_projects, figure.get_figwidth() * figure.dpi / columns)
+
+    for index, project_code in enumerate(available_projects):
+        plotTestData(project_code, (rows, columns, index + 1), night_mode, *dashboard_data[project_code])
     plt.tight_layout(pad=0, w_pad=0, h_pad=0)
+
+def runLive(update_queue, refresh_interval=1000):
+    """Shows the dashboard and keeps it up to date from inside a running
+    CrashTrakr process, updating the charts of projects with new builds in 
+    place.
+
+    Args:
+        update_queue: queue.Queue the poller puts updated project codes on.
+        refresh_interval: How often, in milliseconds, the queue is checked.
+    """
+
+    printLicense()
+    figure, night_mode = createFigure()
+    dashboard = LiveDashboard(figure, night_mode)
+
+    def refresh():
+        updated_projects = set()
+        while not update_queue.empty():
+            updated_projects.add(update_queue.get_nowait())
+        if updated_projects:
+            dashboard.refresh(updated_projects)
+
+    timer = figure.canvas.new_timer(interval=refresh_interval)
+    timer.add_callback(refresh)
+    timer.start()
+
+    mng = plt.get_current_fig_manager()
+    mng.full_screen_toggle()
+    plt.show()
+
+def getRenderDigest(test_data, level, night_mode, image_format, size):
+    """Gets a hash of everything a rendered chart depends on, so charts whose 
+    data did not change since the last render can be skipped.
+
+    Args:
+        test_data: The series shown on the chart.
+        level: How many builds every row of test_data covers.
+        night_mode: Whether the chart uses the dark colors.
+        image_format: The image file format, e.g.: png, svg
+        size: The (width, height) of the image in inches.
+    """
+
+    digest = hashlib.sha256()
+    for name in CrashTrakr_series.COLUMNS:
+        digest.update(test_data.column(name).tobytes())
+    digest.update(repr((level, night_mode, image_format, size)).encode())
+    return digest.hexdigest()
+
+@CrashTrakr_metrics.timed("crashtrakr_render_image_seconds", "Time spent rendering a chart to an image file.")
+def renderProjectImage(project_code, image_path, night_mode, size=(8, 3)):
+    """Renders the chart of a single project to an image file with the Agg 
+    canvas, without pyplot or a display. Safe to run in worker processes.
+
+    Args:
+        project_code: The internal code to the project we wish to render.
+        image_path: The image file to write. The format follows its extension.
+        night_mode: Whether the chart uses the dark colors.
+        size: The (width, height) of the image in inches.
+    """
+
+    figure = Figure(figsize=size, facecolor=getFigureColor(night_mode))
+    FigureCanvasAgg(figure)
+    test_data, level = CrashTrakr_series.getDisplaySeries(project_code, getShownBuilds(project_code), 
+                                                          size[0] * figure.dpi)
+    ProjectPanel(figure.add_subplot(), project_code, night_mode).update(test_data, level)
+    figure.tight_layout(pad=0.5)
+    figure.savefig(image_path, facecolor=figure.get_facecolor())
+    return image_path
+
+def renderCompositeImage(project_codes, image_path, night_mode, dashboard_data, size=(8, 3)):
+    """Renders the charts of many projects to a single dashboard frame, laid out
+    the same way as the fullscreen dashboard.
+
+    Args:
+        project_codes: The internal codes to the projects we wish to render.
+        image_path: The image file to write. The format follows its extension.
+        night_mode: Whether the charts use the dark colors.
+        dashboard_data: Dictionary of project codes and the (series, level) to
+            show, as returned by loadDashboardData.
+        size: The (width, height) of every chart in inches.
+    """
+
+    rows, columns = getGridShape(len(project_codes))
+    figure = Figure(figsize=(size[0] * columns, size[1] * rows), facecolor=getFigureColor(night_mode))
+    FigureCanvasAgg(figure)
+    for index, project_code in enumerate(project_codes):
+        panel = ProjectPanel(figure.add_subplot(rows, columns, index + 1), project_code, night_mode)
+        panel.update(*dashboard_data[project_code])
+    figure.tight_layout(pad=0.5)
+    figure.savefig(image_path, facecolor=figure.get_facecolor())
+    return image_path
+
+def renderHeadless(output_dir, image_format="png", composite=False, processes=None, size=(8, 3)):
+    """Renders the dashboard to image files, for publishing without a display.
+    Every project is rendered to its own <code>.<format> file across worker
+    processes, or all of them to a single dashboard.<format> frame. Charts whose
+    data did not change since the last render are skipped, the hashes of the
+    last renders are kept in CrashTrakr_render.json next to the images.
+
+    Args:
+        output_dir: The directory the images are written to.
+        image_format: The image file format, e.g.: png, svg
+        composite: Whether to render a single frame with every project.
+        processes: How many worker processes render project images. Defaults
+            to the number of processors.
+        size: The (width, height) of every chart in inches.
+
+    Returns:
+        The paths of the images that were rendered.
+    """
+
+    os.makedirs(output_dir, exist_ok=True)
+    night_mode = isNightMode()
+    available_projects = CrashTrakr_config.getRegistry().getProjectCodes()
+    dashboard_data = loadDashboardData(available_projects, size[0] * matplotlib.rcParams["figure.dpi"])
+
+    manifest_path = os.path.join(output_dir, "CrashTrakr_render.json")
+    manifest = {}
+    if os.path.isfile(manifest_path):
+        with open(manifest_path) as manifest_file:
+            manifest = json.load(manifest_file)
+
+    rendered_images = []
+    if composite:
+        image_path = os.path.join(output_dir, "dashboard." + image_format)
+        digest = hashlib.sha256(repr(available_projects).encode())
+        for project_code in available_projects:
+            digest.update(getRenderDigest(*dashboard_data[project_code], night_mode, image_format, size).encode())
+        if manifest.get("dashboard") != digest.hexdigest() or not os.path.isfile(image_path):
+            renderCompositeImage(available_projects, image_path, night_mode, dashboard_data, size)
+            manifest["dashboard"] = digest.hexdigest()
+            rendered_images.append(image_path)
+    else:
+        changed_projects = []
+        for project_code in available_projects:
+            image_path = os.path.join(output_dir, project_code + "." + image_format)
+            digest = getRenderDigest(*dashboard_data[project_code], night_mode, image_format, size)
+            if manifest.get(project_code) != digest or not os.path.isfile(image_path):
+                changed_projects.append((project_code, image_path))
+                manifest[project_code] = digest
+
+        if changed_projects:
+            with ProcessPoolExecutor(max_workers=processes) as executor:
+                rendered_images = list(executor.map(renderProjectImage,
+                                                    [project_code for project_code, image_path in changed_projects],
+                                                    [image_path for project_code, image_path in changed_projects],
+                                                    [night_mode] * len(changed_projects),
+                                                    [size] * len(changed_projects)))
+
+    CrashTrakr_store.writeFileAtomic(manifest_path, json.dumps(manifest).encode())
+    print("Rendered {0} image(s) to {1}".format(len(rendered_images), output_dir))
+    return rendered_images
+
+def main():
+    printLicense()
+    figure, night_mode = createFigure()
+    drawDashboard(night_mode)
     mng = plt.get_current_fig_manager()
     mng.full_screen_toggle()
     plt.show()
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Shows the CrashTrakr dashboard.")
+    parser.add_argument("--headless", metavar="OUTPUT_DIR", 
+                        help="render the dashboard to image files in OUTPUT_DIR instead of showing it")
+    parser.add_argument("--format", default="png", choices=["png", "svg"], help="image format of --headless")
+    parser.add_argument("--composite", action="store_true", help="render a single frame with every project")
+    parser.add_argument("--processes", type=int, help="worker processes used by --headless")
+    arguments = parser.parse_args()
+
+    if arguments.headless:
+        renderHeadless(arguments.headless, arguments.format, arguments.composite, arguments.processes)
+    else:
+        main()
@@ -0,0 +1,347 @@
+""" CrashTrakr is a test data retrieval tool built to work together 
+    with Jenkins test automation projects.
+    Copyright (C) 2017 Cosmin Ștefănică
+
+    Permission is hereby granted, free of charge, to any person obtaining a copy
+    of this software and associated documentation files (the "Software"), to deal
+    in the Software without restriction, including without limitation the rights
+    to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+    copies of the Software, and to permit persons to whom the Software is
+    furnished to do so, subject to the following conditions:
+
+    The above copyright notice and this permission notice shall be included in all
+    copies or substantial portions of the Software.
+
+    THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+    IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+    FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+    AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+    LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+    OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+    SOFTWARE.
+"""
+
+from urllib import parse
+import collections
+import queue
+import threading
+import time
+import urllib.error
+import CrashTrakr_config
+import CrashTrakr_http
+import CrashTrakr_json
+import CrashTrakr_log
+
+class RetryOrchestrator:
+    """Triggers automated test builds again from a queue on a background thread.
+    A project has at most one retry waiting or running, each server gets a 
+    limited number of retries running at once and a minimum time between them,
+    and the Jenkins queue item of each retry is followed until its build ends,
+    so a night full of regressions cannot flood the executors."""
+
+    def __init__(self, enabled=False, max_in_flight=2, min_interval=300, poll_interval=15, max_wait=21600):
+        """
+        Args:
+            enabled: Whether regressions found while polling are retried.
+                Retries requested directly are always queued.
+            max_in_flight: How many retries may be waiting or running on a
+                server at once.
+            min_interval: The shortest time, in seconds, between two retries
+                triggered on the same server.
+            poll_interval: How often, in seconds, a running retry is checked.
+            max_wait: How long, in seconds, a retry is followed before it is
+                given up on.
+        """
+
+        self.pending = collections.OrderedDict()
+        self.in_flight = {}
+        self.last_trigger = {}
+        self.retry_builds = {}
+        self.condition = threading.Condition()
+        self.thread = None
+        self.configure(enabled, max_in_flight, min_interval, poll_interval, max_wait)
+
+    def configure(self, enabled=False, max_in_flight=2, min_interval=300, poll_interval=15, max_wait=21600):
+        """Changes the settings of the orchestrator. See __init__ for the 
+        arguments."""
+
+        with self.condition:
+            self.enabled = enabled
+            self.max_in_flight = max_in_flight
+            self.min_interval = min_interval
+            self.poll_interval = poll_interval
+            self.max_wait = max_wait
+            self.condition.notify()
+
+    def request(self, project_code, build=None):
+        """Queues a retry of a project's automated tests build.
+
+        Args:
+            project_code: The internal code to the project we wish to rebuild.
+            build: The build that failed, if known. Builds that are themselves
+                retries are not retried again.
+
+        Returns:
+            True if the retry was queued, False if the project already has one
+            waiting or running, or the build is a retry.
+        """
+
+        if CrashTrakr_config.getRegistry().getProjectLink(project_code) is None:
+            raise ValueError("Project code is unknown!")
+
+        with self.condition:
+            if project_code in self.pending or project_code in self.in_flight:
+                return False
+            if build is not None and build == self.retry_builds.get(project_code):
+                CrashTrakr_log.log("Build {0} is already a retry, not retrying it again".format(build), project_code)
+                return False
+            self.pending[project_code] = build
+            self.checkThread()
+            self.condition.notify()
+        CrashTrakr_log.log("Queued a retry of the automated tests build", project_code)
+        return True
+
+    def checkThread(self):
+        """Starts the background thread if it is not running yet. Called with
+        the condition held."""
+
+        if self.thread is None:
+            self.thread = threading.Thread(target=self.run, name="CrashTrakr retries", daemon=True)
+            self.thread.start()
+
+    def getServer(self, project_code):
+        """Gets the Jenkins server a project is built on."""
+
+        return CrashTrakr_config.getRegistry().getProjectServer(project_code)
+
+    def countInFlight(self, server):
+        """Counts the retries waiting or running on a server."""
+
+        return sum(1 for retry in self.in_flight.values() if retry["server"] == server)
+
+    def takeReadyRetries(self, now):
+        """Takes the queued retries that may be triggered now, oldest first.
+        Called with the condition held.
+
+        Returns:
+            A list of (project code, server) tuples.
+        """
+
+        ready = []
+        for project_code in list(self.pending):
+            server = self.getServer(project_code)
+            if self.countInFlight(server) >= self.max_in_flight:
+                continue
+            if now - self.last_trigger.get(server, -self.min_interval) < self.min_interval:
+                continue
+            del self.pending[project_code]
+            self.last_trigger[server] = now
+            self.in_flight[project_code] = {"server": server,
+                                            "queue_url": None,
+                                            "build_url": None,
+                                            "started": now,
+                                            "next_poll": now}
+            ready.append((project_code, server))
+        return ready
+
+    def getWaitTime(self, now):
+        """Gets how long the background thread can sleep before something is
+        due. Called with the condition held."""
+
+        due_times = [retry["next_poll"] for retry in self.in_flight.values()]
+        for project_code in self.pending:
+            server = self.getServer(project_code)
+            if self.countInFlight(server) < self.max_in_flight:
+                due_times.append(self.last_trigger.get(server, -self.min_interval) + self.min_interval)
+        if not due_times:
+            return None
+        return max(0, min(due_times) - now)
+
+    def triggerBuild(self, project_code):
+        """Triggers a build of a project and remembers its Jenkins queue item.
+
+        Returns:
+            True if Jenkins accepted the build.
+        """
+
+        registry = CrashTrakr_config.getRegistry()
+        encoded_data = parse.urlencode({"token": registry.getBuildToken(project_code), "delay": 0}).encode()
+        try:
+            status, response_headers, body = CrashTrakr_http.getClient(registry.getProjectServer(project_code)).post(registry.getProjectLink(project_code) + "build", encoded_data)
+        except urllib.error.HTTPError as HTTP_Error:
+            CrashTrakr_log.log("Error triggering a retry: {0}: {1}".format(HTTP_Error.code, HTTP_Error.reason), project_code, "HTTP Error")
+            return False
+        except urllib.error.URLError as URL_Error:
+            CrashTrakr_log.log("Error triggering a retry. {0}".format(URL_Error.reason), project_code, "URL Error")
+            return False
+
+        queue_url = response_headers.get("Location")
+        with self.condition:
+            self.in_flight[project_code]["queue_url"] = queue_url
+        CrashTrakr_log.log("Triggered a retry of the automated tests build", project_code)
+        return queue_url is not None
+
+    def checkRetry(self, project_code, retry):
+        """Follows a triggered retry through the Jenkins queue until its build
+        ends.
+
+        Returns:
+            True once the retry is over, whatever its result.
+        """
+
+        client = CrashTrakr_http.getClient(self.getServer(project_code))
+        try:
+            if retry["build_url"] is None:
+                queue_item = CrashTrakr_json.loadJson(client.get(parse.urljoin(retry["queue_url"], "api/json"), conditional=False))
+                if queue_item.get("cancelled"):
+                    CrashTrakr_log.log("The retry was cancelled", project_code, "Warning")
+                    return True
+                executable = queue_item.get("executable")
+                if not executable:
+                    return False
+                with self.condition:
+                    retry["build_url"] = executable["url"]
+                    self.retry_builds[project_code] = executable["number"]
+
+            build_data = CrashTrakr_json.loadJson(client.get(parse.urljoin(retry["build_url"], "api/json?tree=building,result,number"), conditional=False))
+        except urllib.error.HTTPError as HTTP_Error:
+            CrashTrakr_log.log("Error checking a retry: {0}: {1}".format(HTTP_Error.code, HTTP_Error.reason), project_code, "HTTP Error")
+            return HTTP_Error.code == 404
+        except urllib.error.URLError as URL_Error:
+            CrashTrakr_log.log("Error checking a retry. {0}".format(URL_Error.reason), project_code, "URL Error")
+            return False
+
+        if build_data.get("building"):
+            return False
+        CrashTrakr_log.log("Retry build {0} ended: {1}".format(build_data.get("number"), build_data.get("result")), project_code)
+        return True
+
+    def runStep(self, project_code, step, retry=None):
+        """Runs triggerBuild or checkRetry for one retry. An unexpected error, 
+        such as a malformed answer from Jenkins, is logged and ends that retry
+        instead of the background thread.
+
+        Returns:
+            What the step returned, None if it raised, which ends the retry.
+        """
+
+        try:
+            if retry is None:
+                return step(project_code)
+            return step(project_code, retry)
+        except Exception as error:
+            CrashTrakr_log.log("Gave up on the retry after an error: {0!r}".format(error), project_code, "Error")
+            return None
+
+    def run(self):
+        """Triggers queued retries and follows running ones until the process
+        ends."""
+
+        while True:
+            with self.condition:
+                wait_time = self.getWaitTime(time.monotonic())
+                if wait_time is None or wait_time > 0:
+                    self.condition.wait(wait_time)
+                now = time.monotonic()
+                ready = self.takeReadyRetries(now)
+                due = [(project_code, retry) for project_code, retry in self.in_flight.items() 
+                       if retry["queue_url"] is not None and retry["next_poll"] <= now]
+
+            finished = [project_code for project_code, server in ready if not self.runStep(project_code, self.triggerBuild)]
+            for project_code, retry in due:
+                if self.runStep(project_code, self.checkRetry, retry) is not False:
+                    finished.append(project_code)
+                elif now - retry["started"] > self.max_wait:
+                    CrashTrakr_log.log("Gave up following the retry", project_code, "Warning")
+                    finished.append(project_code)
+                else:
+                    retry["next_poll"] = now + self.poll_interval
+
+            with self.condition:
+                for project_code in finished:
+                    self.in_flight.pop(project_code, None)
+
+_orchestrator = RetryOrchestrator()
+_retry_queue = None
+_serving = False
+
+def getOrchestrator():
+    """Gets the retry orchestrator shared by every CrashTrakr module running in
+    this process."""
+
+    return _orchestrator
+
+def configure(retry_settings):
+    """Configures the shared retry orchestrator from the Retry section of the
+    config file.
+
+    Args:
+        retry_settings: Dictionary with any of Enabled, MaxInFlight, 
+            MinInterval, PollInterval and MaxWait.
+    """
+
+    _orchestrator.configure(enabled=retry_settings.get("Enabled", False),
+                            max_in_flight=int(retry_settings.get("MaxInFlight", 2)),
+                            min_interval=retry_settings.get("MinInterval", 300),
+                            poll_interval=retry_settings.get("PollInterval", 15),
+                            max_wait=retry_settings.get("MaxWait", 21600))
+
+def startServing():
+    """Lets requestRetry queue retries with the orchestrator of this process. 
+    Only the daemon process serves retries: it runs long enough to follow them
+    and enforce the limits of every server, while a one-shot poll would exit
+    with its retries still queued and forget them."""
+
+    global _serving
+    _serving = True
+
+def forwardRetries(retry_queue):
+    """Makes requestRetry hand retries over to another process instead of the
+    orchestrator of this one. The poller processes of the daemon forward their
+    retries to the daemon process, so the limits of every server hold across
+    all of its pollers.
+
+    Args:
+        retry_queue: multiprocessing.Queue read by serveRetries.
+    """
+
+    global _retry_queue
+    _retry_queue = retry_queue
+
+def serveRetries(retry_queue, stop_event):
+    """Queues the retries forwarded by other processes with the orchestrator of
+    this process until stop_event is set.
+
+    Args:
+        retry_queue: multiprocessing.Queue the retries are forwarded on.
+        stop_event: Event that ends the loop once set.
+    """
+
+    while not stop_event.is_set():
+        try:
+            project_code, build = retry_queue.get(timeout=1)
+        except queue.Empty:
+            continue
+        try:
+            _orchestrator.request(project_code, build)
+        except ValueError as error:
+            CrashTrakr_log.log("Error queueing a retry: {0}".format(error), project_code, "Error")
+
+def requestRetry(project_code, build=None):
+    """Queues a retry with the shared orchestrator, or forwards it to the 
+    process running it. See RetryOrchestrator.request, forwardRetries and 
+    startServing.
+
+    Returns:
+        True if the retry was queued or forwarded, False if the project already
+        has one waiting or running, the build is a retry, or this process does
+        not serve retries.
+    """
+
+    if _retry_queue is not None:
+        _retry_queue.put((project_code, build))
+        return True
+    if not _serving:
+        CrashTrakr_log.log("Retries are only triggered in daemon mode, not retrying", project_code, "Warning")
+        return False
+    return _orchestrator.request(project_code, build)
@@ -0,0 +1,311 @@
+""" CrashTrakr is a test data retrieval tool built to work together 
+    with Jenkins test automation projects.
+    Copyright (C) 2017 Cosmin Ștefănică
+
+    Permission is hereby granted, free of charge, to any person obtaining a copy
+    of this software and associated documentation files (the "Software"), to deal
+    in the Software without restriction, including without limitation the rights
+    to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+    copies of the Software, and to permit persons to whom the Software is
+    furnished to do so, subject to the following conditions:
+
+    The above copyright notice and this permission notice shall be included in all
+    copies or substantial portions of the Software.
+
+    THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+    IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+    FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+    AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+    LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+    OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+    SOFTWARE.
+"""
+
+from array import array
+import mmap
+import os
+import struct
+import CrashTrakr_store
+
+COLUMNS = ("build", "total", "failed", "skipped", "duration")
+SERIES_MAGIC = b"CTS2"
+OLD_SERIES_MAGICS = (b"CTS1",)
+SERIES_HEADER = struct.Struct("=4sIIq")
+SERIES_MIN_ROOM = 1024
+COLUMN_SIZE = array("i").itemsize
+
+class BuildSeries:
+    """The build history of a project held as one int32 column per field, 
+    oldest build first. Slicing a series only creates views over the same
+    memory, so taking the last builds of a long history copies nothing."""
+
+    def __init__(self, columns, backing=None, revision=None):
+        """Builds a series from one memoryview per name in COLUMNS.
+
+        Args:
+            columns: Dictionary of column names and int32 memoryviews.
+            backing: The buffer the columns point into, kept alive for as long
+                as the series is.
+            revision: The history store revision a series read from its file
+                was exported at, None otherwise.
+        """
+
+        self.columns = columns
+        self.backing = backing
+        self.revision = revision
+
+    def __len__(self):
+        return len(self.columns["build"])
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return tuple(self.columns[name][index] for name in COLUMNS)
+        return BuildSeries({name: column[index] for name, column in self.columns.items()}, self.backing, self.revision)
+
+    def last(self, number_of_builds):
+        """Gets a view over the newest builds of the series.
+
+        Args:
+            number_of_builds: How many builds we wish to keep.
+        """
+
+        return self[max(0, len(self) - number_of_builds):]
+
+    def column(self, name):
+        """Gets a column as an int32 memoryview."""
+
+        return self.columns[name]
+
+    def values(self, name):
+        """Gets a column as a NumPy array sharing the same memory, or as the 
+        memoryview itself when NumPy is not installed. NumPy is only imported
+        here, so reading a series does not pay for it."""
+
+        try:
+            import numpy
+        except ImportError:
+            return self.columns[name]
+        return numpy.frombuffer(self.columns[name], dtype=numpy.int32)
+
+def fromRows(rows):
+    """Builds a series from (build, total, failed, skipped, duration) rows,
+    oldest build first.
+
+    Args:
+        rows: Any iterable of rows, read only once.
+    """
+
+    arrays = [array("i") for name in COLUMNS]
+    for row in rows:
+        for column, value in zip(arrays, row):
+            column.append(value)
+    return BuildSeries({name: memoryview(column) for name, column in zip(COLUMNS, arrays)})
+
+def loadSeries(project_code, limit=None):
+    """Loads the history of a project from the history store into a series.
+
+    Args:
+        project_code: The internal code to the project we wish to load data for.
+        limit: How many of the newest builds we wish to load. None loads all.
+    """
+
+    rows = CrashTrakr_store.readBuilds(project_code, limit=limit)
+    rows.reverse()
+    return fromRows(rows)
+
+def getSeriesFile(project_code):
+    """Gets the name of the memory-mapped series file of a project."""
+
+    return "CrashTrakr_series_" + project_code
+
+def getSeriesCapacity(number_of_builds):
+    """Gets how many builds every column of a series file has room for, so new
+    builds can be appended in place for a while before the file is rewritten."""
+
+    return number_of_builds + max(SERIES_MIN_ROOM, number_of_builds // 2)
+
+def saveSeries(project_code, series, revision=0):
+    """Writes a series to its memory-mapped file: a header with the number of
+    builds, the room every column has and the history store revision it was
+    exported at, followed by every column stored back to back in native byte
+    order. The file is replaced in a single step, so a reader that mapped the
+    old file keeps a complete copy.
+
+    Args:
+        project_code: The internal code to the project we wish to save data for.
+        series: The series we wish to save.
+        revision: The history store revision the series was read at.
+
+    Returns:
+        True if the file was written. On Windows a file mapped by another
+        process cannot be replaced; it is then left as it is and getSeries
+        reads the history store instead until the next write.
+    """
+
+    capacity = getSeriesCapacity(len(series))
+    padding = bytes((capacity - len(series)) * COLUMN_SIZE)
+    data = (SERIES_HEADER.pack(SERIES_MAGIC, len(series), capacity, revision) + 
+            b"".join(series.column(name).tobytes() + padding for name in COLUMNS))
+    try:
+        CrashTrakr_store.writeFileAtomic(getSeriesFile(project_code), data)
+    except PermissionError:
+        return False
+    return True
+
+def readSeriesHeader(series_file):
+    """Reads the header of an open series file.
+
+    Returns:
+        (length, capacity, revision), or None if the file was written in an
+        older format and has to be exported again.
+    """
+
+    series_file.seek(0)
+    header = series_file.read(SERIES_HEADER.size)
+    if header[:len(SERIES_MAGIC)] in OLD_SERIES_MAGICS:
+        return None
+    if len(header) < SERIES_HEADER.size:
+        raise ValueError("Unknown series file format!")
+    magic, length, capacity, revision = SERIES_HEADER.unpack(header)
+    if magic != SERIES_MAGIC:
+        raise ValueError("Unknown series file format!")
+    return length, capacity, revision
+
+def appendSeries(series_file, rows, revision):
+    """Appends builds to an open series file in place, behind the builds
+    readers already mapped. The header is only updated once the builds are
+    written, so readers never see a half written build.
+
+    Args:
+        series_file: The series file, opened for reading and writing.
+        rows: (build, total, failed, skipped, duration) rows newer than the
+            last build of the file, oldest first.
+        revision: The history store revision the rows were read at.
+
+    Returns:
+        True if the builds were appended, False if the file has no room left
+        for them.
+    """
+
+    length, capacity, stored_revision = readSeriesHeader(series_file)
+    if length + len(rows) > capacity:
+        return False
+
+    for position, name in enumerate(COLUMNS):
+        series_file.seek(SERIES_HEADER.size + (position * capacity + length) * COLUMN_SIZE)
+        series_file.write(array("i", (row[position] for row in rows)).tobytes())
+    series_file.flush()
+    os.fsync(series_file.fileno())
+    series_file.seek(0)
+    series_file.write(SERIES_HEADER.pack(SERIES_MAGIC, length + len(rows), capacity, revision))
+    series_file.flush()
+    return True
+
+def exportSeries(project_code):
+    """Brings the memory-mapped series file of a project up to date with the
+    history store. When only builds newer than the last one of the file were
+    saved since it was exported, they are appended in place; the file is only
+    rewritten from the whole history when older builds changed, or when it ran
+    out of room.
+
+    Args:
+        project_code: The internal code to the project we wish to export.
+    """
+
+    revision = CrashTrakr_store.getRevision(project_code)
+    series_path = getSeriesFile(project_code)
+    with CrashTrakr_store.lockFile(series_path):
+        if os.path.isfile(series_path):
+            with open(series_path, mode="r+b") as series_file:
+                header = readSeriesHeader(series_file)
+                if header is not None and header[2] == revision:
+                    return
+                if header is not None and header[2] >= CrashTrakr_store.getRewriteRevision(project_code):
+                    first_build = None
+                    if header[0]:
+                        series_file.seek(SERIES_HEADER.size + (header[0] - 1) * COLUMN_SIZE)
+                        first_build = array("i", series_file.read(COLUMN_SIZE))[0] + 1
+                    rows = CrashTrakr_store.readBuilds(project_code, first_build=first_build, newest_first=False)
+                    if appendSeries(series_file, rows, revision):
+                        return
+        saveSeries(project_code, loadSeries(project_code), revision)
+
+def openSeries(project_code):
+    """Opens the memory-mapped series file of a project. The columns point 
+    straight into the mapped file, so no build is read until it is used.
+
+    Args:
+        project_code: The internal code to the project we wish to load data for.
+
+    Returns:
+        The mapped series, or None if the project has no series file or it was
+        written in an older format.
+    """
+
+    if not os.path.isfile(getSeriesFile(project_code)):
+        return None
+
+    with open(getSeriesFile(project_code), mode="rb") as series_file:
+        header = readSeriesHeader(series_file)
+        if header is None:
+            return None
+        length, capacity, revision = header
+        if length == 0:
+            return BuildSeries(fromRows([]).columns, revision=revision)
+        mapped_file = mmap.mmap(series_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    data = memoryview(mapped_file)[SERIES_HEADER.size:].cast("i")
+    columns = {name: data[position * capacity:position * capacity + length] 
+               for position, name in enumerate(COLUMNS)}
+    return BuildSeries(columns, mapped_file, revision)
+
+def getSeries(project_code, limit=None):
+    """Gets the history of a project as a series, from its memory-mapped file
+    when it was exported at the current revision of the history store and from
+    the history store otherwise.
+
+    Args:
+        project_code: The internal code to the project we wish to load data for.
+        limit: How many of the newest builds we wish to keep. None keeps all.
+    """
+
+    series = openSeries(project_code)
+    if series is None or series.revision != CrashTrakr_store.getRevision(project_code):
+        return loadSeries(project_code, limit)
+    if limit is not None:
+        return series.last(limit)
+    return series
+
+def loadAggregatedSeries(project_code, level, limit=None):
+    """Loads the aggregated history of a project into a series with one row per
+    bucket of builds: the last build of the bucket, the mean completed and the
+    mean failed tests. Skipped tests and duration are -1.
+
+    Args:
+        project_code: The internal code to the project we wish to load data for.
+        level: How many builds every bucket covers, one of 
+            CrashTrakr_store.AGGREGATE_LEVELS.
+        limit: How many of the newest buckets we wish to load. None loads all.
+    """
+
+    rows = CrashTrakr_store.readAggregates(project_code, level, limit)
+    rows.reverse()
+    return fromRows((row[0], int(round(row[5])), int(round(row[6])), -1, -1) for row in rows)
+
+def getDisplaySeries(project_code, shown_builds, pixel_width):
+    """Gets the series to draw for the newest builds of a project on a chart of
+    a given width, aggregated when there are more builds than pixels.
+
+    Args:
+        project_code: The internal code to the project we wish to load data for.
+        shown_builds: How many of the newest builds the chart covers.
+        pixel_width: The width of the chart in pixels.
+
+    Returns:
+        (series, level) where level is how many builds every row covers.
+    """
+
+    level = CrashTrakr_store.pickResolution(shown_builds, pixel_width)
+    if level == 1:
+        return getSeries(project_code, shown_builds), level
+    return loadAggregatedSeries(project_code, level, -(-shown_builds // level)), level
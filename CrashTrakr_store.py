@@ -0,0 +1,685 @@
+""" CrashTrakr is a test data retrieval tool built to work together 
+    with Jenkins test automation projects.
+    Copyright (C) 2017 Cosmin Ștefănică
+
+    Permission is hereby granted, free of charge, to any person obtaining a copy
+    of this software and associated documentation files (the "Software"), to deal
+    in the Software without restriction, including without limitation the rights
+    to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+    copies of the Software, and to permit persons to whom the Software is
+    furnished to do so, subject to the following conditions:
+
+    The above copyright notice and this permission notice shall be included in all
+    copies or substantial portions of the Software.
+
+    THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+    IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+    FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+    AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+    LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+    OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+    SOFTWARE.
+"""
+
+import contextlib
+import json
+import os
+import pickle
+import sqlite3
+import tempfile
+import threading
+import zlib
+import CrashTrakr_metrics
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+    import msvcrt
+
+STORE_FILE = "CrashTrakr_data.db"
+STATE_FILE = "CrashTrakr_state.json"
+AGGREGATE_LEVELS = (10, 100, 1000)
+BUSY_TIMEOUT = 30
+POOL_SIZE = 8
+
+_local = threading.local()
+_pool = []
+_pool_lock = threading.Lock()
+_schema_files = set()
+_schema_lock = threading.Lock()
+_migrated_projects = set()
+_state = None
+_state_lock = threading.Lock()
+
+def resetAfterFork():
+    """Forgets the store connections inherited from the parent process, since
+    a SQLite connection must not be shared between processes."""
+
+    global _local, _pool
+    _local = threading.local()
+    _pool = []
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=resetAfterFork)
+
+def writeFileAtomic(path, data):
+    """Replaces a file in a single step: the data is written to a temporary
+    file next to it, flushed to disk and renamed over the old file. Readers
+    see either the old or the new file, never a half written one, and an
+    interrupted write leaves the old file in place.
+
+    Args:
+        path: The file we wish to write.
+        data: The bytes to write.
+    """
+
+    directory = os.path.dirname(os.path.abspath(path))
+    file_descriptor, temporary_path = tempfile.mkstemp(prefix=os.path.basename(path) + ".", suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(file_descriptor, mode="wb") as temporary_file:
+            temporary_file.write(data)
+            temporary_file.flush()
+            os.fsync(temporary_file.fileno())
+        os.replace(temporary_path, path)
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.remove(temporary_path)
+        raise
+
+@contextlib.contextmanager
+def lockFile(path):
+    """Holds an exclusive lock on <path>.lock across processes for as long as
+    the with block runs. Writers that read, change and write back a file take
+    it, so updates from parallel pollers are not lost. Readers need no lock, 
+    since files are only replaced with writeFileAtomic or appended to behind
+    the data readers already see.
+
+    Args:
+        path: The file we wish to lock.
+    """
+
+    with open(path + ".lock", mode="a+b") as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        else:
+            lock_file.seek(0)
+            msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+            else:
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+
+def createSchema(connection):
+    """Switches the store to write-ahead log mode, which is kept in the file,
+    and creates its tables if needed.
+
+    Args:
+        connection: An open connection to the store.
+    """
+
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("CREATE TABLE IF NOT EXISTS builds ("
+                       "project TEXT NOT NULL, "
+                       "build INTEGER NOT NULL, "
+                       "total INTEGER NOT NULL, "
+                       "failed INTEGER NOT NULL, "
+                       "skipped INTEGER NOT NULL DEFAULT -1, "
+                       "duration INTEGER NOT NULL DEFAULT -1, "
+                       "PRIMARY KEY (project, build)) WITHOUT ROWID")
+    connection.execute("CREATE TABLE IF NOT EXISTS aggregates ("
+                       "project TEXT NOT NULL, "
+                       "level INTEGER NOT NULL, "
+                       "bucket INTEGER NOT NULL, "
+                       "count INTEGER NOT NULL, "
+                       "min_rate REAL NOT NULL, "
+                       "max_rate REAL NOT NULL, "
+                       "sum_rate REAL NOT NULL, "
+                       "sum_total INTEGER NOT NULL, "
+                       "sum_failed INTEGER NOT NULL, "
+                       "last_build INTEGER NOT NULL, "
+                       "PRIMARY KEY (project, level, bucket)) WITHOUT ROWID")
+    connection.execute("CREATE TABLE IF NOT EXISTS cases ("
+                       "id INTEGER PRIMARY KEY, "
+                       "class_name TEXT NOT NULL, "
+                       "name TEXT NOT NULL, "
+                       "UNIQUE (class_name, name))")
+    connection.execute("CREATE TABLE IF NOT EXISTS case_runs ("
+                       "project TEXT NOT NULL, "
+                       "build INTEGER NOT NULL, "
+                       "present BLOB NOT NULL, "
+                       "failed BLOB NOT NULL, "
+                       "skipped BLOB NOT NULL, "
+                       "PRIMARY KEY (project, build)) WITHOUT ROWID")
+    connection.execute("CREATE TABLE IF NOT EXISTS fetch_failures ("
+                       "project TEXT NOT NULL, "
+                       "build INTEGER NOT NULL, "
+                       "attempts INTEGER NOT NULL, "
+                       "PRIMARY KEY (project, build)) WITHOUT ROWID")
+    connection.execute("CREATE TABLE IF NOT EXISTS revisions ("
+                       "project TEXT PRIMARY KEY, "
+                       "revision INTEGER NOT NULL)")
+    connection.execute("CREATE TABLE IF NOT EXISTS rewrites ("
+                       "project TEXT PRIMARY KEY, "
+                       "revision INTEGER NOT NULL)")
+    connection.commit()
+    createCasePositions(connection)
+
+def createCasePositions(connection):
+    """Creates the table that gives every test case a bit position of its own
+    within each project it runs in, so the case bitsets of a project only grow
+    with its own cases. Bitsets saved before, which were indexed by the case
+    ID, are renumbered once, by whichever process creates the table.
+
+    Args:
+        connection: An open connection to the store.
+    """
+
+    connection.execute("BEGIN IMMEDIATE")
+    try:
+        created = connection.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'project_cases'").fetchone() is None
+        connection.execute("CREATE TABLE IF NOT EXISTS project_cases ("
+                           "project TEXT NOT NULL, "
+                           "position INTEGER NOT NULL, "
+                           "case_id INTEGER NOT NULL, "
+                           "PRIMARY KEY (project, position), "
+                           "UNIQUE (project, case_id)) WITHOUT ROWID")
+        if created:
+            migrateCaseRuns(connection)
+        connection.commit()
+    except BaseException:
+        connection.rollback()
+        raise
+
+def migrateCaseRuns(connection):
+    """Renumbers case bitsets indexed by the case ID to the case positions of
+    their project, in case ID order. Called within a transaction."""
+
+    runs = connection.execute("SELECT project, build, present, failed, skipped FROM case_runs").fetchall()
+    if not runs:
+        return
+
+    def unpack(blob):
+        return [index * 8 + bit for index, byte in enumerate(zlib.decompress(blob)) if byte 
+                for bit in range(8) if byte & (0x80 >> bit)]
+
+    def pack(case_ids, positions, size):
+        bits = bytearray((size + 7) // 8)
+        for case_id in case_ids:
+            position = positions[case_id]
+            bits[position >> 3] |= 0x80 >> (position & 7)
+        return zlib.compress(bytes(bits))
+
+    project_cases = {}
+    for run in runs:
+        project_cases.setdefault(run[0], set()).update(unpack(run[2]))
+    project_positions = {project: {case_id: position for position, case_id in enumerate(sorted(case_ids))}
+                         for project, case_ids in project_cases.items()}
+    connection.executemany("INSERT INTO project_cases (project, position, case_id) VALUES (?, ?, ?)",
+                           [(project, position, case_id) for project, positions in project_positions.items() 
+                            for case_id, position in positions.items()])
+    for project, build, present, failed, skipped in runs:
+        positions = project_positions[project]
+        connection.execute("UPDATE case_runs SET present = ?, failed = ?, skipped = ? WHERE project = ? AND build = ?",
+                           tuple(pack(unpack(blob), positions, len(positions)) for blob in (present, failed, skipped)) + (project, build))
+
+def openConnection():
+    """Opens a new connection to the history store. The schema is only set up
+    by the first connection a process opens to a store file."""
+
+    connection = sqlite3.connect(STORE_FILE, timeout=BUSY_TIMEOUT, check_same_thread=False)
+    connection.execute("PRAGMA synchronous=NORMAL")
+    store_path = os.path.abspath(STORE_FILE)
+    with _schema_lock:
+        if store_path not in _schema_files:
+            createSchema(connection)
+            _schema_files.add(store_path)
+    return connection
+
+def getConnection():
+    """Gets the connection to the history store used by the current thread,
+    opening the store and creating its tables if needed. The store runs in
+    write-ahead log mode, so the display and the query API keep reading while
+    a poller writes, and writers from other processes wait their turn for up
+    to BUSY_TIMEOUT seconds instead of failing."""
+
+    connection = getattr(_local, "connection", None)
+    if connection is None:
+        connection = openConnection()
+        _local.connection = connection
+    return connection
+
+@contextlib.contextmanager
+def pooledConnection():
+    """Lends the current thread a connection from a pool for as long as the 
+    with block runs, so getConnection returns it. Threads that only live for a
+    single task, like the ones ThreadingHTTPServer starts for every request,
+    then reuse a few connections instead of each opening the store. A thread
+    that already has a connection keeps using it."""
+
+    if getattr(_local, "connection", None) is not None:
+        yield _local.connection
+        return
+
+    with _pool_lock:
+        connection = _pool.pop() if _pool else None
+    if connection is None:
+        connection = openConnection()
+    _local.connection = connection
+    try:
+        yield connection
+    finally:
+        _local.connection = None
+        if connection.in_transaction:
+            connection.rollback()
+        with _pool_lock:
+            if len(_pool) < POOL_SIZE:
+                _pool.append(connection)
+                connection = None
+        if connection is not None:
+            connection.close()
+
+def migratePickle(project_code):
+    """Moves the builds saved in an old CrashTrakr_data_<code> pickle file into
+    the history store. The pickle file is renamed afterwards so the migration
+    only runs once.
+
+    Args:
+        project_code: The internal code to the project we wish to migrate.
+
+    Returns:
+        The number of builds that were migrated.
+    """
+
+    _migrated_projects.add(project_code)
+    pickle_file = "CrashTrakr_data_" + project_code
+    if not os.path.isfile(pickle_file):
+        return 0
+
+    with open(pickle_file, mode="rb") as data_file:
+        test_data = pickle.load(data_file)
+
+    connection = getConnection()
+    with connection:
+        connection.executemany("INSERT OR IGNORE INTO builds (project, build, total, failed) VALUES (?, ?, ?, ?)",
+                               [(project_code, int(item[0]), item[1], item[2]) for item in test_data])
+        updateAggregates(connection, project_code, [int(item[0]) for item in test_data])
+        updateRevision(connection, project_code, rewrite=True)
+    os.replace(pickle_file, pickle_file + ".migrated")
+    return len(test_data)
+
+def checkMigration(project_code):
+    """Runs the pickle migration for a project the first time it is used."""
+
+    if project_code not in _migrated_projects:
+        migratePickle(project_code)
+        connection = getConnection()
+        has_builds = connection.execute("SELECT 1 FROM builds WHERE project = ? LIMIT 1", (project_code,)).fetchone()
+        has_aggregates = connection.execute("SELECT 1 FROM aggregates WHERE project = ? LIMIT 1", (project_code,)).fetchone()
+        if has_builds and not has_aggregates:
+            with connection:
+                updateAggregates(connection, project_code, 
+                                 [row[0] for row in connection.execute("SELECT build FROM builds WHERE project = ?", (project_code,))])
+
+def updateAggregates(connection, project_code, builds):
+    """Brings the multi-resolution aggregates up to date after builds were 
+    saved. Every level is recomputed only for the buckets holding the saved
+    builds, from at most ten rows of the level below it, so saving a build 
+    costs the same however long the history is.
+
+    Args:
+        connection: The connection the builds were saved with.
+        project_code: The internal code to the project the builds belong to.
+        builds: The saved build numbers.
+    """
+
+    buckets = {build // AGGREGATE_LEVELS[0] for build in builds}
+    previous_level = None
+
+    for level in AGGREGATE_LEVELS:
+        if previous_level is not None:
+            buckets = {bucket // (level // previous_level) for bucket in buckets}
+
+        for bucket in buckets:
+            if previous_level is None:
+                row = connection.execute(
+                    "SELECT COUNT(*), MIN(rate), MAX(rate), TOTAL(rate), TOTAL(total), TOTAL(failed), MAX(build) "
+                    "FROM (SELECT build, total, failed, CAST(failed AS REAL) / total AS rate FROM builds "
+                    "WHERE project = ? AND build BETWEEN ? AND ? AND total > 0)",
+                    (project_code, bucket * level, (bucket + 1) * level - 1)).fetchone()
+            else:
+                ratio = level // previous_level
+                row = connection.execute(
+                    "SELECT TOTAL(count), MIN(min_rate), MAX(max_rate), TOTAL(sum_rate), TOTAL(sum_total), "
+                    "TOTAL(sum_failed), MAX(last_build) FROM aggregates "
+                    "WHERE project = ? AND level = ? AND bucket BETWEEN ? AND ?",
+                    (project_code, previous_level, bucket * ratio, (bucket + 1) * ratio - 1)).fetchone()
+
+            if not row[0]:
+                connection.execute("DELETE FROM aggregates WHERE project = ? AND level = ? AND bucket = ?",
+                                   (project_code, level, bucket))
+            else:
+                connection.execute("INSERT OR REPLACE INTO aggregates VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                                   (project_code, level, bucket, int(row[0]), row[1], row[2], row[3], 
+                                    int(row[4]), int(row[5]), row[6]))
+        previous_level = level
+
+def updateRevision(connection, project_code, rewrite=False):
+    """Increments the revision of a project, which every write to its history
+    changes so readers can tell their cached results apart from new ones.
+
+    Args:
+        connection: The connection the builds were saved with.
+        project_code: The internal code to the project that was written to.
+        rewrite: Whether the write replaced or filled in builds older than the
+            newest saved one, instead of only adding newer builds. Readers that
+            keep a copy of the history can then tell whether appending the new
+            builds is enough. See getRewriteRevision.
+    """
+
+    connection.execute("INSERT INTO revisions (project, revision) VALUES (?, 1) "
+                       "ON CONFLICT (project) DO UPDATE SET revision = revision + 1", (project_code,))
+    if rewrite:
+        connection.execute("INSERT OR REPLACE INTO rewrites (project, revision) "
+                           "SELECT project, revision FROM revisions WHERE project = ?", (project_code,))
+
+def getRevision(project_code):
+    """Gets the revision of a project, 0 if it was never written to. See 
+    updateRevision.
+
+    Args:
+        project_code: The internal code to the project we wish to check.
+    """
+
+    checkMigration(project_code)
+    row = getConnection().execute("SELECT revision FROM revisions WHERE project = ?", (project_code,)).fetchone()
+    return row[0] if row else 0
+
+def getRewriteRevision(project_code):
+    """Gets the revision of the last write that changed builds older than the
+    newest saved one, 0 if there never was one. A copy of the history taken at
+    this revision or later only misses builds newer than its last one.
+
+    Args:
+        project_code: The internal code to the project we wish to check.
+    """
+
+    checkMigration(project_code)
+    row = getConnection().execute("SELECT revision FROM rewrites WHERE project = ?", (project_code,)).fetchone()
+    return row[0] if row else 0
+
+@CrashTrakr_metrics.timed("crashtrakr_store_write_seconds", "Time spent saving builds to the history store.")
+def appendBuilds(project_code, builds):
+    """Saves the results of many builds in a single transaction. Saving a build
+    number that is already stored replaces its results.
+
+    Args:
+        project_code: The internal code to the project we wish to save data for.
+        builds: (build, total, failed, skipped, duration) tuples.
+    """
+
+    checkMigration(project_code)
+    connection = getConnection()
+    with connection:
+        previous_last_build = connection.execute("SELECT MAX(build) FROM builds WHERE project = ?", 
+                                                 (project_code,)).fetchone()[0]
+        connection.executemany("INSERT OR REPLACE INTO builds (project, build, total, failed, skipped, duration) "
+                               "VALUES (?, ?, ?, ?, ?, ?)",
+                               [(project_code,) + tuple(build) for build in builds])
+        updateAggregates(connection, project_code, [build[0] for build in builds])
+        rewrite = bool(builds) and previous_last_build is not None and min(build[0] for build in builds) <= previous_last_build
+        updateRevision(connection, project_code, rewrite)
+
+def appendBuild(project_code, build, total, failed, skipped=-1, duration=-1):
+    """Saves the results of a single build.
+
+    Args:
+        project_code: The internal code to the project we wish to save data for.
+        build: The build number.
+        total: How many tests were completed.
+        failed: How many tests failed.
+        skipped: How many tests were skipped, -1 if unknown.
+        duration: How long the tests took in milliseconds, -1 if unknown.
+    """
+
+    appendBuilds(project_code, [(build, total, failed, skipped, duration)])
+
+@CrashTrakr_metrics.timed("crashtrakr_store_read_seconds", "Time spent reading builds from the history store.")
+def readBuilds(project_code, first_build=None, last_build=None, limit=None, newest_first=True):
+    """Reads the saved results of a range of builds.
+
+    Args:
+        project_code: The internal code to the project we wish to load data for.
+        first_build: The oldest build number to read. None reads from the start.
+        last_build: The newest build number to read. None reads to the end.
+        limit: The maximum number of builds to read, counted from the newest
+            end when newest_first is set and from the oldest end otherwise.
+        newest_first: Whether the newest build comes first.
+
+    Returns:
+        A list of (build, total, failed, skipped, duration) tuples.
+    """
+
+    checkMigration(project_code)
+    query = "SELECT build, total, failed, skipped, duration FROM builds WHERE project = ?"
+    parameters = [project_code]
+    if first_build is not None:
+        query = query + " AND build >= ?"
+        parameters.append(first_build)
+    if last_build is not None:
+        query = query + " AND build <= ?"
+        parameters.append(last_build)
+    query = query + (" ORDER BY build DESC" if newest_first else " ORDER BY build ASC")
+    if limit is not None:
+        query = query + " LIMIT ?"
+        parameters.append(limit)
+    return getConnection().execute(query, parameters).fetchall()
+
+def readAggregates(project_code, level, limit=None, newest_first=True):
+    """Reads the aggregated results of a project at one resolution.
+
+    Args:
+        project_code: The internal code to the project we wish to load data for.
+        level: How many builds every bucket covers, one of AGGREGATE_LEVELS.
+        limit: The maximum number of buckets to read.
+        newest_first: Whether the newest bucket comes first.
+
+    Returns:
+        A list of (last build, builds, min fail rate, max fail rate, mean fail
+        rate, mean total, mean failed) tuples, one per bucket with known 
+        results. Fail rates are failed / completed tests.
+    """
+
+    checkMigration(project_code)
+    query = ("SELECT last_build, count, min_rate, max_rate, sum_rate / count, "
+             "CAST(sum_total AS REAL) / count, CAST(sum_failed AS REAL) / count "
+             "FROM aggregates WHERE project = ? AND level = ?")
+    query = query + (" ORDER BY bucket DESC" if newest_first else " ORDER BY bucket ASC")
+    parameters = [project_code, level]
+    if limit is not None:
+        query = query + " LIMIT ?"
+        parameters.append(limit)
+    return getConnection().execute(query, parameters).fetchall()
+
+def summarizeBuilds(project_code):
+    """Gets summary statistics of the whole history of a project.
+
+    Args:
+        project_code: The internal code to the project we wish to summarize.
+
+    Returns:
+        A dictionary with the number of saved builds, the builds saved without
+        results, the first and last build numbers and the min, max and mean 
+        fail rate of the builds with results.
+    """
+
+    checkMigration(project_code)
+    connection = getConnection()
+    builds, errored_builds, first_build, last_build = connection.execute(
+        "SELECT COUNT(*), TOTAL(total < 0), MIN(build), MAX(build) FROM builds WHERE project = ?",
+        (project_code,)).fetchone()
+    known_builds, min_rate, max_rate, sum_rate = connection.execute(
+        "SELECT TOTAL(count), MIN(min_rate), MAX(max_rate), TOTAL(sum_rate) FROM aggregates "
+        "WHERE project = ? AND level = ?", (project_code, AGGREGATE_LEVELS[-1])).fetchone()
+    return {"builds": builds,
+            "errored_builds": int(errored_builds),
+            "first_build": first_build,
+            "last_build": last_build,
+            "min_fail_rate": min_rate,
+            "max_fail_rate": max_rate,
+            "mean_fail_rate": sum_rate / known_builds if known_builds else None}
+
+def pickResolution(number_of_builds, pixel_width):
+    """Picks the finest resolution that still fits a number of builds into a
+    chart, so no more than one point is drawn per pixel.
+
+    Args:
+        number_of_builds: How many builds the chart covers.
+        pixel_width: The width of the chart in pixels.
+
+    Returns:
+        1 for single builds, or one of AGGREGATE_LEVELS.
+    """
+
+    for level in (1,) + AGGREGATE_LEVELS:
+        if number_of_builds <= pixel_width * level:
+            return level
+    return AGGREGATE_LEVELS[-1]
+
+def lastBuildNumber(project_code):
+    """Gets the newest saved build number of a project, None if nothing is 
+    saved yet.
+
+    Args:
+        project_code: The internal code to the project we wish to check.
+    """
+
+    checkMigration(project_code)
+    return getConnection().execute("SELECT MAX(build) FROM builds WHERE project = ?", 
+                                   (project_code,)).fetchone()[0]
+
+def findMissingBuilds(project_code, first_build, last_build, max_attempts=None):
+    """Finds the builds of a range that have to be fetched again: the ones 
+    that are not saved at all, and the ones saved as an error placeholder with
+    unknown results. Only the index of the store is read.
+
+    Args:
+        project_code: The internal code to the project we wish to check.
+        first_build: The oldest build number of the range.
+        last_build: The newest build number of the range.
+        max_attempts: Builds whose fetch already failed this many times are
+            left out. None never leaves a build out.
+
+    Returns:
+        A sorted list of build numbers.
+    """
+
+    checkMigration(project_code)
+    connection = getConnection()
+    missing_builds = []
+    next_build = first_build
+    for (build,) in connection.execute("SELECT build FROM builds WHERE project = ? AND build BETWEEN ? AND ? AND total >= 0 "
+                                       "ORDER BY build", (project_code, first_build, last_build)):
+        missing_builds.extend(range(next_build, build))
+        next_build = build + 1
+    missing_builds.extend(range(next_build, last_build + 1))
+
+    if max_attempts is not None and missing_builds:
+        given_up = {row[0] for row in connection.execute("SELECT build FROM fetch_failures WHERE project = ? AND build BETWEEN ? AND ? "
+                                                         "AND attempts >= ?", (project_code, first_build, last_build, max_attempts))}
+        if given_up:
+            missing_builds = [build for build in missing_builds if build not in given_up]
+    return missing_builds
+
+def recordFetchFailures(project_code, builds):
+    """Counts a failed fetch attempt for every one of the given builds.
+
+    Args:
+        project_code: The internal code to the project we wish to update.
+        builds: The build numbers whose results could not be fetched.
+    """
+
+    connection = getConnection()
+    with connection:
+        connection.executemany("INSERT INTO fetch_failures (project, build, attempts) VALUES (?, ?, 1) "
+                               "ON CONFLICT (project, build) DO UPDATE SET attempts = attempts + 1",
+                               [(project_code, build) for build in builds])
+
+def countFetchFailures(project_code, max_attempts=None):
+    """Counts the builds whose fetch failed and is still to be retried.
+
+    Args:
+        project_code: The internal code to the project we wish to check.
+        max_attempts: Builds whose fetch already failed this many times are
+            not counted. None counts every build.
+    """
+
+    query = "SELECT COUNT(*) FROM fetch_failures WHERE project = ?"
+    parameters = [project_code]
+    if max_attempts is not None:
+        query = query + " AND attempts < ?"
+        parameters.append(max_attempts)
+    return getConnection().execute(query, parameters).fetchone()[0]
+
+def clearFetchFailures(project_code, builds):
+    """Forgets the failed fetch attempts of builds that were fetched since.
+
+    Args:
+        project_code: The internal code to the project we wish to update.
+        builds: The build numbers that were fetched.
+    """
+
+    connection = getConnection()
+    with connection:
+        connection.executemany("DELETE FROM fetch_failures WHERE project = ? AND build = ?",
+                               [(project_code, build) for build in builds])
+
+def readState():
+    """Reads the state file that holds the last build number seen for every
+    project. The file is only read once per process. It is always replaced in
+    a single step, so it can be read without a lock."""
+
+    global _state
+    with _state_lock:
+        if _state is None:
+            _state = {}
+            if os.path.isfile(STATE_FILE):
+                with open(STATE_FILE) as state_file:
+                    _state = json.load(state_file)
+        return _state
+
+def getLastSeenBuild(project_code):
+    """Gets the last build number seen for a project, from the state file or,
+    if the project is not in it yet, from the history store. 0 if no build was
+    seen yet.
+
+    Args:
+        project_code: The internal code to the project we wish to check.
+    """
+
+    last_seen_build = readState().get(project_code)
+    if last_seen_build is None:
+        last_seen_build = lastBuildNumber(project_code) or 0
+    return last_seen_build
+
+def setLastSeenBuild(project_code, build):
+    """Records the last build number seen for a project in the state file. The
+    file is read again under an exclusive lock first, so the builds recorded
+    by pollers running in other processes are kept.
+
+    Args:
+        project_code: The internal code to the project we wish to update.
+        build: The last build number seen.
+    """
+
+    state = readState()
+    with _state_lock, lockFile(STATE_FILE):
+        if os.path.isfile(STATE_FILE):
+            with open(STATE_FILE) as state_file:
+                state.update(json.load(state_file))
+        state[project_code] = build
+        writeFileAtomic(STATE_FILE, json.dumps(state).encode())
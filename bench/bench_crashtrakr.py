@@ -0,0 +1,246 @@
+""" CrashTrakr is a test data retrieval tool built to work together 
+    with Jenkins test automation projects.
+    Copyright (C) 2017 Cosmin Ștefănică
+
+    Permission is hereby granted, free of charge, to any person obtaining a copy
+    of this software and associated documentation files (the "Software"), to deal
+    in the Software without restriction, including without limitation the rights
+    to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+    copies of the Software, and to permit persons to whom the Software is
+    furnished to do so, subject to the following conditions:
+
+    The above copyright notice and this permission notice shall be included in all
+    copies or substantial portions of the Software.
+
+    THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+    IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+    FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+    AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+    LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+    OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+    SOFTWARE.
+"""
+
+import argparse
+import contextlib
+import datetime
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, ".."))
+sys.path.insert(0, BENCH_DIR)
+import matplotlib
+matplotlib.use("Agg")
+import fake_jenkins
+
+def quiet():
+    """Hides the console output of CrashTrakr while a benchmark runs."""
+
+    return contextlib.redirect_stdout(open(os.devnull, "w"))
+
+def timeCall(function, *args):
+    """Calls a function once, returning (seconds taken, return value)."""
+
+    start = time.perf_counter()
+    with quiet():
+        result = function(*args)
+    return time.perf_counter() - start, result
+
+def writeConfig(server, sizes, arguments):
+    """Writes the config file of the benchmark projects, one per build count,
+    in the current directory."""
+
+    config = {"Servers": [{"Name": "bench", "Link": server.link}],
+              "Workers": arguments.workers,
+              "Timeout": 30,
+              "Retries": arguments.retries,
+              "RetryBackoff": 0.01,
+              "BulkImport": not arguments.no_bulk,
+              "PageSize": 100,
+              "Log": {"Level": "Warning"},
+              "Projects": [{"Code": getProjectCode(size), "Link": getJobName(size), "BuildToken": ""} for size in sizes]}
+    with open("CrashConfig.json", mode="w") as config_file:
+        json.dump(config, config_file, indent="\t")
+
+def getJobName(size):
+    return "Bench{0}".format(size)
+
+def getProjectCode(size):
+    return "B{0}".format(size)
+
+def benchPopulate(server, size):
+    """Times populateFreshResults importing the whole history of a job."""
+
+    import CrashTrakr_main
+    import CrashTrakr_store
+
+    server.resetCounters()
+    seconds, result = timeCall(CrashTrakr_main.populateFreshResults, getProjectCode(size))
+    return dict({"name": "populateFreshResults",
+                 "builds": size,
+                 "seconds": seconds,
+                 "stored_builds": CrashTrakr_store.summarizeBuilds(getProjectCode(size))["builds"]},
+                **server.getCounters())
+
+def benchPollCycle(server, jobs, new_builds):
+    """Times the poll cycle of main(), without restarting the plotter, once
+    with no new builds and once with new_builds new builds on every job."""
+
+    import CrashTrakr_main
+    import CrashTrakr_config
+
+    def pollCycle():
+        updated_projects = CrashTrakr_main.pollServer()
+        for project_code in CrashTrakr_config.getRegistry().getProjectCodes():
+            CrashTrakr_main.printTestData(project_code)
+        return updated_projects
+
+    results = []
+    for added_builds in (0, new_builds):
+        for job in jobs:
+            job.builds = job.builds + added_builds
+        server.resetCounters()
+        seconds, updated_projects = timeCall(pollCycle)
+        results.append(dict({"name": "poll cycle",
+                             "builds": sum(job.builds for job in jobs),
+                             "new_builds": added_builds * len(jobs),
+                             "seconds": seconds,
+                             "updated_projects": len(updated_projects)},
+                            **server.getCounters()))
+    return results
+
+def benchSaveTestData(size, calls):
+    """Times saveTestData appending builds to a history of a given size, to
+    show whether saving gets slower as the history grows."""
+
+    import CrashTrakr_main
+    import CrashTrakr_store
+
+    project_code = getProjectCode(size)
+    stored_builds = CrashTrakr_store.summarizeBuilds(project_code)["builds"]
+    first_build = (CrashTrakr_store.lastBuildNumber(project_code) or 0) + 1
+    timings = []
+    with quiet():
+        for build in range(first_build, first_build + calls):
+            start = time.perf_counter()
+            CrashTrakr_main.saveTestData(project_code, build, 1000, build % 23, build % 5, 60000)
+            timings.append(time.perf_counter() - start)
+    timings.sort()
+    return {"name": "saveTestData",
+            "builds": stored_builds,
+            "calls": calls,
+            "seconds": sum(timings),
+            "mean_seconds": sum(timings) / len(timings),
+            "median_seconds": timings[len(timings) // 2],
+            "max_seconds": timings[-1]}
+
+def benchPlot(size, repeat):
+    """Times loading and drawing the chart of a project with its whole history
+    shown, the best of repeat runs."""
+
+    import matplotlib.pyplot as plt
+    import CrashTrakr_plot
+    import CrashTrakr_series
+    import CrashTrakr_store
+
+    project_code = getProjectCode(size)
+    stored_builds = CrashTrakr_store.summarizeBuilds(project_code)["builds"]
+    best_seconds = None
+    for attempt in range(repeat):
+        figure = plt.figure(figsize=(8, 3))
+        start = time.perf_counter()
+        test_data, level = CrashTrakr_series.getDisplaySeries(project_code, stored_builds, 8 * figure.dpi)
+        CrashTrakr_plot.plotTestData(project_code, 111, False, test_data, level)
+        figure.canvas.draw()
+        seconds = time.perf_counter() - start
+        plt.close(figure)
+        best_seconds = seconds if best_seconds is None else min(best_seconds, seconds)
+    return {"name": "plotTestData",
+            "builds": stored_builds,
+            "seconds": best_seconds,
+            "plotted_points": len(test_data),
+            "level": level}
+
+def runBenchmarks(arguments):
+    """Runs every benchmark against a fresh fake Jenkins server and history 
+    store, in the current directory.
+
+    Returns:
+        The list of results.
+    """
+
+    sizes = arguments.sizes
+    jobs = [fake_jenkins.FakeJob(getJobName(size), size) for size in sizes]
+    server = fake_jenkins.FakeJenkins(jobs, arguments.latency, arguments.error_rate, arguments.seed).start()
+    writeConfig(server, sizes, arguments)
+
+    results = []
+    try:
+        for size in sizes:
+            results.append(benchPopulate(server, size))
+            printResult(results[-1])
+        for result in benchPollCycle(server, jobs, arguments.new_builds):
+            results.append(result)
+            printResult(result)
+        for size in sizes:
+            results.append(benchSaveTestData(size, arguments.calls))
+            printResult(results[-1])
+        for size in sizes:
+            results.append(benchPlot(size, arguments.repeat))
+            printResult(results[-1])
+    finally:
+        server.stop()
+        import CrashTrakr_log
+        CrashTrakr_log.getWriter().flush()
+    return results
+
+def printResult(result):
+    print("{0:<22} {1:>8} builds {2:>10.1f} ms".format(result["name"], result["builds"], result["seconds"] * 1000))
+
+def main():
+    parser = argparse.ArgumentParser(description="Times CrashTrakr against a local fake Jenkins server.")
+    parser.add_argument("--sizes", type=lambda sizes: [int(size) for size in sizes.split(",")], default=[10, 1000, 100000],
+                        help="comma separated build counts, one benchmark project each")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds every fake Jenkins response is delayed by")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of result requests that fail with HTTP 500")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the failing requests")
+    parser.add_argument("--workers", type=int, default=8, help="the Workers setting")
+    parser.add_argument("--retries", type=int, default=0, help="the Retries setting")
+    parser.add_argument("--no-bulk", action="store_true", help="turn the BulkImport setting off")
+    parser.add_argument("--new-builds", type=int, default=10, help="builds added to every job for the poll cycle")
+    parser.add_argument("--calls", type=int, default=200, help="saveTestData calls per history size")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per chart, the best one is reported")
+    parser.add_argument("--report", default="bench_report.json", help="where the JSON report is written")
+    parser.add_argument("--keep", action="store_true", help="keep the working directory with the store and log")
+    arguments = parser.parse_args()
+
+    report_path = os.path.abspath(arguments.report)
+    work_dir = tempfile.mkdtemp(prefix="crashtrakr-bench-")
+    original_dir = os.getcwd()
+    os.chdir(work_dir)
+    try:
+        results = runBenchmarks(arguments)
+    finally:
+        os.chdir(original_dir)
+        if arguments.keep:
+            print("Working directory kept at {0}".format(work_dir))
+        else:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    report = {"created": datetime.datetime.now().isoformat(timespec="seconds"),
+              "python": platform.python_version(),
+              "platform": platform.platform(),
+              "settings": {name: value for name, value in vars(arguments).items() if name not in ("report", "keep")},
+              "results": results}
+    with open(report_path, mode="w") as report_file:
+        json.dump(report, report_file, indent=2)
+    print("Report written to {0}".format(report_path))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+""" CrashTrakr is a test data retrieval tool built to work together 
+    with Jenkins test automation projects.
+    Copyright (C) 2017 Cosmin Ștefănică
+
+    Permission is hereby granted, free of charge, to any person obtaining a copy
+    of this software and associated documentation files (the "Software"), to deal
+    in the Software without restriction, including without limitation the rights
+    to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+    copies of the Software, and to permit persons to whom the Software is
+    furnished to do so, subject to the following conditions:
+
+    The above copyright notice and this permission notice shall be included in all
+    copies or substantial portions of the Software.
+
+    THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+    IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+    FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+    AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+    LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+    OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+    SOFTWARE.
+"""
+
+import argparse
+import ast
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import CrashTrakr_json
+
+def buildFixture(number_of_suites, cases_per_suite):
+    """Builds a synthetic testReport response with per-case results, shaped 
+    like the response to tree=suites[cases[className,name,status,duration]].
+
+    Args:
+        number_of_suites: How many test suites the report holds.
+        cases_per_suite: How many test cases every suite holds.
+    """
+
+    statuses = ("PASSED", "FAILED", "SKIPPED", "FIXED", "REGRESSION")
+    suites = []
+    for suite in range(number_of_suites):
+        cases = []
+        for case in range(cases_per_suite):
+            cases.append({"className": "com.example.suite{0}.Tests".format(suite),
+                          "name": "test_{0}_{1}_żółw_测试".format(suite, case),
+                          "status": statuses[(suite + case) % len(statuses)],
+                          "duration": (suite * case % 97) / 10.0})
+        suites.append({"cases": cases, "duration": suite / 3.0, "name": "suite{0}".format(suite)})
+    return {"_class": "hudson.tasks.junit.TestResult", "failCount": 0, "passCount": 0, "skipCount": 0, "suites": suites}
+
+def parsePython(data):
+    """The old path: api/python decoded as windows-1252 and read by 
+    ast.literal_eval."""
+
+    report = ast.literal_eval(data.decode("windows-1252"))
+    return sum(len(suite["cases"]) for suite in report["suites"])
+
+def parseJson(data):
+    """api/json read whole by the json module."""
+
+    report = CrashTrakr_json.loadJson(data)
+    return sum(len(suite["cases"]) for suite in report["suites"])
+
+def parseJsonItems(data):
+    """api/json walked one test case at a time."""
+
+    return sum(1 for case in CrashTrakr_json.iterJsonItems(data, "suites.item.cases.item"))
+
+def measure(parser, data, repeat):
+    """Times a parser, returning the best time in seconds and the peak memory
+    in bytes."""
+
+    best_time = None
+    for attempt in range(repeat):
+        start = time.perf_counter()
+        parser(data)
+        elapsed = time.perf_counter() - start
+        best_time = elapsed if best_time is None else min(best_time, elapsed)
+
+    tracemalloc.start()
+    parser(data)
+    peak_memory = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return best_time, peak_memory
+
+def main():
+    parser = argparse.ArgumentParser(description="Compares the api/python and api/json parsing paths.")
+    parser.add_argument("--suites", type=int, default=200, help="suites in the synthetic fixture")
+    parser.add_argument("--cases", type=int, default=250, help="cases per suite in the synthetic fixture")
+    parser.add_argument("--python-fixture", help="recorded api/python response to use instead")
+    parser.add_argument("--json-fixture", help="recorded api/json response to use instead")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per parser, the best one is reported")
+    arguments = parser.parse_args()
+
+    if arguments.python_fixture and arguments.json_fixture:
+        with open(arguments.python_fixture, mode="rb") as fixture_file:
+            python_data = fixture_file.read()
+        with open(arguments.json_fixture, mode="rb") as fixture_file:
+            json_data = fixture_file.read()
+    else:
+        report = buildFixture(arguments.suites, arguments.cases)
+        python_data = repr(report).encode("windows-1252", errors="backslashreplace")
+        json_data = json.dumps(report, ensure_ascii=False).encode("utf-8")
+
+    print("api/python fixture: {0} bytes, api/json fixture: {1} bytes".format(len(python_data), len(json_data)))
+    print("streaming parser: {0}".format("ijson" if CrashTrakr_json.ijson is not None else "not installed, json fallback"))
+
+    results = [("api/python + literal_eval", parsePython, python_data),
+               ("api/json + loadJson", parseJson, json_data),
+               ("api/json + iterJsonItems", parseJsonItems, json_data)]
+    for name, parser_function, data in results:
+        best_time, peak_memory = measure(parser_function, data, arguments.repeat)
+        print("{0:<28} {1:>9.1f} ms {2:>9.1f} MiB peak".format(name, best_time * 1000, peak_memory / 1048576))
+
+if __name__ == "__main__":
+    main()
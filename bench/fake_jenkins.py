@@ -0,0 +1,310 @@
+""" CrashTrakr is a test data retrieval tool built to work together 
+    with Jenkins test automation projects.
+    Copyright (C) 2017 Cosmin Ștefănică
+
+    Permission is hereby granted, free of charge, to any person obtaining a copy
+    of this software and associated documentation files (the "Software"), to deal
+    in the Software without restriction, including without limitation the rights
+    to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+    copies of the Software, and to permit persons to whom the Software is
+    furnished to do so, subject to the following conditions:
+
+    The above copyright notice and this permission notice shall be included in all
+    copies or substantial portions of the Software.
+
+    THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+    IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+    FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+    AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+    LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+    OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+    SOFTWARE.
+"""
+
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib import parse
+import argparse
+import gzip
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+
+RANGE_PATTERN = re.compile(r"\{(\d+),(\d+)\}")
+
+class FakeJob:
+    """A synthetic Jenkins job whose test results are derived from the build
+    number, so every run of a benchmark sees the same data."""
+
+    def __init__(self, name, builds, total_tests=1000):
+        """
+        Args:
+            name: The name of the job, as used in its link.
+            builds: How many completed builds the job has.
+            total_tests: How many tests every build runs.
+        """
+
+        self.name = name
+        self.builds = builds
+        self.total_tests = total_tests
+
+    def getTestResults(self, build):
+        """Gets the testReport of a build, shaped like the response to
+        tree=failCount,passCount,duration,skipCount."""
+
+        fail_count = (build * 7919) % 23 + (50 if build % 97 == 0 else 0)
+        skip_count = build % 5
+        return {"_class": "hudson.tasks.junit.TestResult",
+                "failCount": fail_count,
+                "passCount": self.total_tests - fail_count - skip_count,
+                "skipCount": skip_count,
+                "duration": 60.0 + build % 13}
+
+    def getBuildListing(self, first_index, last_index):
+        """Gets a page of builds, newest first, shaped like the response to
+        tree=builds[number,result,actions[failCount,totalCount,skipCount]]{first,last}."""
+
+        builds = []
+        for build in range(self.builds - first_index, max(0, self.builds - last_index), -1):
+            test_results = self.getTestResults(build)
+            builds.append({"number": build,
+                           "result": "UNSTABLE" if test_results["failCount"] else "SUCCESS",
+                           "actions": [{}, {"failCount": test_results["failCount"],
+                                            "totalCount": self.total_tests,
+                                            "skipCount": test_results["skipCount"]}]})
+        return {"builds": builds}
+
+class FakeJenkins(ThreadingHTTPServer):
+    """A local stand-in for a Jenkins server that answers the REST API requests
+    CrashTrakr sends, with a configurable latency and rate of failing
+    requests.
+
+    Only the paths CrashTrakr uses are served: the server jobs listing, the
+    last completed build of a job, the testReport of a build, a page of the
+    builds of a job, triggering a build and its queue item. A triggered build
+    completes at once, as the next build of its job, unless hold_queue is set,
+    which keeps every queue item waiting for an executor. Like Jenkins, responses carry ETag
+    and Last-Modified headers, a matching If-None-Match header is answered
+    with a 304 and responses are gzip compressed when the client accepts it.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, jobs, latency=0.0, error_rate=0.0, seed=0, host="127.0.0.1", port=0, drop_connections=False):
+        """
+        Args:
+            jobs: The FakeJob instances the server lists.
+            latency: Seconds every response is delayed by.
+            error_rate: The share of testReport and build listing requests 
+                answered with an HTTP 500 error.
+            seed: Seed of the random numbers that pick the failing requests.
+            host: The address to listen on.
+            port: The port to listen on. 0 picks a free port.
+            drop_connections: Whether to close every connection after a 
+                response without telling the client, like a server whose 
+                keep-alive timeout ran out.
+        """
+
+        super().__init__((host, port), FakeJenkinsHandler)
+        self.jobs = {job.name: job for job in jobs}
+        self.latency = latency
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+        self.drop_connections = drop_connections
+        self.last_modified = formatdate(time.time(), usegmt=True)
+        self.counter_lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+        self.not_modified = 0
+        self.bytes_sent = 0
+        self.queue_items = []
+        self.hold_queue = False
+        self.thread = None
+
+    @property
+    def link(self):
+        """The job link of the server, as used for ServerLink."""
+
+        return "http://{0}:{1}/job/".format(*self.server_address[:2])
+
+    def start(self):
+        """Starts serving on a background thread."""
+
+        self.thread = threading.Thread(target=self.serve_forever, name="Fake Jenkins", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        """Stops serving and closes the listening socket."""
+
+        self.shutdown()
+        self.server_close()
+
+    def resetCounters(self):
+        """Clears the request counters."""
+
+        with self.counter_lock:
+            self.requests = 0
+            self.errors = 0
+            self.not_modified = 0
+            self.bytes_sent = 0
+
+    def getCounters(self):
+        """Gets the requests, errors, 304 answers and bytes sent since the 
+        counters were last cleared."""
+
+        with self.counter_lock:
+            return {"requests": self.requests, "errors": self.errors, 
+                    "not_modified": self.not_modified, "bytes": self.bytes_sent}
+
+    def countRequest(self, status, bytes_sent):
+        """Counts an answered request."""
+
+        with self.counter_lock:
+            self.requests = self.requests + 1
+            self.errors = self.errors + (1 if status >= 400 else 0)
+            self.not_modified = self.not_modified + (1 if status == 304 else 0)
+            self.bytes_sent = self.bytes_sent + bytes_sent
+
+    def queueBuild(self, job):
+        """Adds a completed build to a job, as if a triggered build had run.
+
+        Returns:
+            The number of the queue item of the build.
+        """
+
+        with self.counter_lock:
+            job.builds = job.builds + 1
+            self.queue_items.append((job.name, job.builds))
+            return len(self.queue_items)
+
+    def shouldFail(self):
+        """Picks whether the current request fails."""
+
+        if self.error_rate <= 0:
+            return False
+        with self.counter_lock:
+            return self.random.random() < self.error_rate
+
+class FakeJenkinsHandler(BaseHTTPRequestHandler):
+    """Answers the requests sent to a FakeJenkins server."""
+
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def sendJson(self, status, data):
+        body = json.dumps(data).encode("utf-8")
+        if status != 200:
+            return self.sendBody(status, body, {})
+
+        etag = '"{0}"'.format(hashlib.sha1(body).hexdigest()[:16])
+        headers = {"ETag": etag, "Last-Modified": self.server.last_modified}
+        if etag in (tag.strip() for tag in self.headers.get("If-None-Match", "").split(",")):
+            return self.sendBody(304, b"", headers)
+        if "gzip" in self.headers.get("Accept-Encoding", ""):
+            body = gzip.compress(body)
+            headers["Content-Encoding"] = "gzip"
+        self.sendBody(status, body, headers)
+
+    def sendBody(self, status, body, headers):
+        self.send_response(status)
+        if status != 304:
+            self.send_header("Content-Type", "application/json;charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.server.countRequest(status, len(body))
+        self.end_headers()
+        self.wfile.write(body)
+        if self.server.drop_connections:
+            self.close_connection = True
+
+    def do_GET(self):
+        if self.server.latency:
+            time.sleep(self.server.latency)
+
+        url = parse.urlsplit(self.path)
+        tree = parse.parse_qs(url.query).get("tree", [""])[0]
+        parts = [parse.unquote(part) for part in url.path.strip("/").split("/")]
+
+        if len(parts) == 5 and parts[:2] == ["queue", "item"] and parts[3:] == ["api", "json"]:
+            if not parts[2].isdigit() or not 1 <= int(parts[2]) <= len(self.server.queue_items):
+                return self.sendJson(404, {"error": "Not found"})
+            job_name, build = self.server.queue_items[int(parts[2]) - 1]
+            if self.server.hold_queue:
+                return self.sendJson(200, {"id": int(parts[2]), "cancelled": False, "why": "Waiting for next available executor"})
+            return self.sendJson(200, {"id": int(parts[2]), "cancelled": False,
+                                       "executable": {"number": build, "url": "{0}{1}/{2}/".format(self.server.link, parse.quote(job_name), build)}})
+
+        if parts == ["api", "json"]:
+            return self.sendJson(200, {"jobs": [{"name": job.name, "lastCompletedBuild": {"number": job.builds} if job.builds else None}
+                                                for job in self.server.jobs.values()]})
+
+        if len(parts) < 3 or parts[0] != "job" or parts[1] not in self.server.jobs:
+            return self.sendJson(404, {"error": "Not found"})
+        job = self.server.jobs[parts[1]]
+
+        if parts[2:] == ["api", "json"] and tree.startswith("builds"):
+            if self.server.shouldFail():
+                return self.sendJson(500, {"error": "Injected failure"})
+            page = RANGE_PATTERN.search(tree)
+            first_index, last_index = (int(page.group(1)), int(page.group(2))) if page else (0, job.builds)
+            return self.sendJson(200, job.getBuildListing(first_index, last_index))
+
+        build = parts[2]
+        if build in ("lastCompletedBuild", "lastBuild", "lastSuccessfulBuild"):
+            build = job.builds
+        elif build.isdigit():
+            build = int(build)
+        else:
+            return self.sendJson(404, {"error": "Not found"})
+        if not 1 <= build <= job.builds:
+            return self.sendJson(404, {"error": "Not found"})
+
+        if parts[3:] == ["api", "json"]:
+            return self.sendJson(200, {"id": str(build), "number": build, "building": False, "result": "SUCCESS"})
+        if parts[3:] == ["testReport", "api", "json"]:
+            if self.server.shouldFail():
+                return self.sendJson(500, {"error": "Injected failure"})
+            return self.sendJson(200, job.getTestResults(build))
+        return self.sendJson(404, {"error": "Not found"})
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        parts = self.path.strip("/").split("/")
+        if len(parts) == 3 and parts[0] == "job" and parts[1] in self.server.jobs and parts[2] == "build":
+            queue_item = self.server.queueBuild(self.server.jobs[parts[1]])
+            self.send_response(201)
+            self.send_header("Location", "http://{0}:{1}/queue/item/{2}/".format(*self.server.server_address[:2], queue_item))
+            self.send_header("Content-Length", "0")
+            self.server.countRequest(201, 0)
+            self.end_headers()
+            if self.server.drop_connections:
+                self.close_connection = True
+            return
+        self.sendJson(404, {"error": "Not found"})
+
+def main():
+    parser = argparse.ArgumentParser(description="Serves synthetic Jenkins jobs for trying CrashTrakr out.")
+    parser.add_argument("--port", type=int, default=8080, help="port to listen on")
+    parser.add_argument("--jobs", type=int, default=3, help="how many jobs to serve")
+    parser.add_argument("--builds", type=int, default=1000, help="completed builds per job")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds every response is delayed by")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of result requests that fail with HTTP 500")
+    arguments = parser.parse_args()
+
+    jobs = [FakeJob("Job{0}".format(index + 1), arguments.builds) for index in range(arguments.jobs)]
+    server = FakeJenkins(jobs, arguments.latency, arguments.error_rate, port=arguments.port)
+    print("Serving {0} jobs on {1}".format(len(jobs), server.link))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,25 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "bench"))
+
+import CrashTrakr_store
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    """An empty history store in a temporary working directory."""
+
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(CrashTrakr_store, "_migrated_projects", set())
+    monkeypatch.setattr(CrashTrakr_store, "_state", None)
+    CrashTrakr_store.resetAfterFork()
+    yield CrashTrakr_store
+    connection = getattr(CrashTrakr_store._local, "connection", None)
+    if connection is not None:
+        connection.close()
+    CrashTrakr_store.resetAfterFork()
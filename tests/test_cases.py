@@ -0,0 +1,74 @@
+import zlib
+
+import pytest
+
+import CrashTrakr_cases
+
+
+@pytest.fixture
+def cases(store, monkeypatch):
+    """The test case index of an empty history store."""
+
+    monkeypatch.setattr(CrashTrakr_cases, "_case_ids", None)
+    monkeypatch.setattr(CrashTrakr_cases, "_case_positions", {})
+    return CrashTrakr_cases
+
+
+def saveRuns(cases, project_code, runs):
+    """Saves builds 1, 2, ... with the given {test name: status} results."""
+
+    for build, results in enumerate(runs, start=1):
+        cases.saveTestCases(project_code, build, [("Suite", name, status) for name, status in results.items()])
+
+
+def test_bitsets_only_grow_with_the_cases_of_their_project(cases, store):
+    saveRuns(cases, "A", [{"a{0}".format(index): "PASSED" for index in range(100)}])
+    saveRuns(cases, "B", [{"b0": "PASSED", "b1": "FAILED", "a0": "PASSED"}])
+
+    present = store.getConnection().execute("SELECT present FROM case_runs WHERE project = 'B'").fetchone()[0]
+    assert len(zlib.decompress(present)) == 1
+    builds, present, failed, skipped = cases.loadCaseMatrix("B")
+    assert present.shape == (1, 8)
+    assert cases.getCaseNames("B", failed[0].nonzero()[0]) == {1: ("Suite", "b1")}
+
+
+def test_newly_failing_cases(cases):
+    saveRuns(cases, "P", [{"fixed": "FAILED", "broken": "PASSED", "always": "FAILED", "skipped": "PASSED"},
+                          {"fixed": "PASSED", "broken": "PASSED", "always": "FAILED", "skipped": "SKIPPED"},
+                          {"fixed": "PASSED", "broken": "FAILED", "always": "FAILED", "skipped": "REGRESSION", "new": "FAILED"}])
+
+    assert cases.findNewlyFailingCases("P") == [("Suite", "broken"), ("Suite", "skipped")]
+    assert cases.findNewlyFailingCases("P", build=2) == []
+    assert cases.findNewlyFailingCases("P", window=1) == []
+
+
+def test_flaky_cases(cases):
+    statuses = ["PASSED", "FAILED"]
+    saveRuns(cases, "P", [{"flaky": statuses[build % 2],
+                           "flaky_sometimes": statuses[build // 2 % 2],
+                           "steady": "PASSED",
+                           "gone": statuses[build % 2] if build < 2 else "SKIPPED"} for build in range(6)])
+
+    assert cases.findFlakyCases("P") == [("Suite", "flaky", 5, 3)]
+    assert cases.findFlakyCases("P", min_flips=2) == [("Suite", "flaky", 5, 3), ("Suite", "flaky_sometimes", 2, 2)]
+    assert cases.findFlakyCases("P", window=3, min_flips=2) == [("Suite", "flaky", 2, 2)]
+
+
+def test_bitsets_indexed_by_case_id_are_renumbered(cases, store):
+    connection = store.getConnection()
+    with connection:
+        connection.executemany("INSERT INTO cases (id, class_name, name) VALUES (?, 'Suite', ?)",
+                               [(case_id, "case{0}".format(case_id)) for case_id in range(20)])
+        for build, failed_id in ((1, 18), (2, 17)):
+            connection.execute("INSERT INTO case_runs (project, build, present, failed, skipped) VALUES ('P', ?, ?, ?, ?)",
+                               (build, cases.packBits([17, 18], 20), cases.packBits([failed_id], 20), cases.packBits([], 20)))
+        connection.execute("DROP TABLE project_cases")
+    connection.close()
+    store._local.connection = None
+    store._schema_files.clear()
+
+    builds, present, failed, skipped = cases.loadCaseMatrix("P")
+
+    assert present.shape == (2, 8)
+    assert cases.findNewlyFailingCases("P") == [("Suite", "case17")]
+    assert cases.getCasePositions("P", [18, 3]) == [1, 2]
@@ -0,0 +1,82 @@
+import json
+import urllib.error
+
+import pytest
+
+import CrashTrakr_http
+import fake_jenkins
+
+
+@pytest.fixture
+def jenkins():
+    """A fake Jenkins server with one 10 build job."""
+
+    server = fake_jenkins.FakeJenkins([fake_jenkins.FakeJob("Job", 10, total_tests=50)]).start()
+    yield server
+    server.stop()
+
+
+def test_unchanged_response_is_revalidated(jenkins):
+    client = CrashTrakr_http.HttpClient()
+    url = jenkins.link + "Job/3/testReport/api/json"
+
+    first = client.get(url)
+    second = client.get(url)
+
+    assert json.loads(second) == json.loads(first) == jenkins.jobs["Job"].getTestResults(3)
+    assert jenkins.getCounters()["requests"] == 2
+    assert jenkins.getCounters()["not_modified"] == 1
+
+
+def test_unconditional_request_downloads_again(jenkins):
+    client = CrashTrakr_http.HttpClient()
+    url = jenkins.link + "Job/3/testReport/api/json"
+
+    client.get(url)
+    client.get(url, conditional=False)
+
+    assert jenkins.getCounters()["not_modified"] == 0
+
+
+def test_gzip_response_is_decompressed(jenkins):
+    client = CrashTrakr_http.HttpClient()
+    url = jenkins.link + "Job/api/json?tree=builds[number]{0,10}"
+
+    status, reason, headers, body = client.sendRequest("GET", url)
+
+    assert status == 200
+    assert headers["Content-Encoding"] == "gzip"
+    assert [build["number"] for build in json.loads(body)["builds"]] == list(range(10, 0, -1))
+
+
+def test_error_status_raises_http_error(jenkins):
+    client = CrashTrakr_http.HttpClient()
+
+    with pytest.raises(urllib.error.HTTPError) as error:
+        client.get(jenkins.link + "Job/11/api/json")
+    assert error.value.code == 404
+
+
+def test_get_is_sent_again_on_a_stale_connection(jenkins):
+    client = CrashTrakr_http.HttpClient()
+    jenkins.drop_connections = True
+
+    client.get(jenkins.link + "Job/1/api/json")
+    body = client.get(jenkins.link + "Job/2/api/json")
+
+    assert json.loads(body)["number"] == 2
+    assert jenkins.getCounters()["requests"] == 2
+
+
+def test_post_is_not_sent_again_on_a_stale_connection(jenkins):
+    client = CrashTrakr_http.HttpClient()
+    jenkins.drop_connections = True
+
+    client.get(jenkins.link + "Job/1/api/json")
+    with pytest.raises(urllib.error.URLError):
+        client.post(jenkins.link + "Job/build", b"delay=0sec")
+    assert jenkins.getCounters()["requests"] == 1
+
+    status, headers, body = client.post(jenkins.link + "Job/build", b"delay=0sec")
+    assert status == 201
+    assert jenkins.getCounters()["requests"] == 2
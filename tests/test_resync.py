@@ -0,0 +1,90 @@
+import json
+
+import pytest
+
+import CrashTrakr_config
+import CrashTrakr_main
+import fake_jenkins
+
+
+def writeConfig(server, **settings):
+    """Configures project P on the fake server, with extra top-level settings."""
+
+    config = dict({"Servers": [{"Name": "fake", "Link": server.link}],
+                   "Workers": 4,
+                   "Retries": 0,
+                   "BulkImport": False,
+                   "PageSize": 100,
+                   "Projects": [{"Code": "P", "Link": "Job", "BuildToken": ""}]}, **settings)
+    with open("CrashConfig.json", mode="w") as config_file:
+        json.dump(config, config_file)
+    CrashTrakr_config._registry = CrashTrakr_config.ProjectRegistry()
+
+
+@pytest.fixture
+def jenkins(store, monkeypatch):
+    """A fake Jenkins server with one 100 build job, configured as project P."""
+
+    job = fake_jenkins.FakeJob("Job", 100, total_tests=50)
+    server = fake_jenkins.FakeJenkins([job]).start()
+    monkeypatch.setattr(CrashTrakr_config, "_registry", None)
+    writeConfig(server)
+    server.job = job
+    yield server
+    server.stop()
+
+
+def savedBuilds(store):
+    return [row[0] for row in store.readBuilds("P", newest_first=False) if row[1] >= 0]
+
+
+def test_only_missing_builds_are_fetched(store, jenkins):
+    job = jenkins.job
+    store.appendBuilds("P", [CrashTrakr_main.getSavedResults(build, job.getTestResults(build))
+                             for build in range(1, 101) if build not in (7, 8, 50)])
+    store.appendBuild("P", 60, -1, -1)
+
+    result = CrashTrakr_main.resyncProject("P", 100)
+
+    assert result == {"missing": 4, "saved": 4, "failed": 0}
+    assert jenkins.getCounters()["requests"] == 4
+    assert savedBuilds(store) == list(range(1, 101))
+    assert store.readBuilds("P", first_build=60, last_build=60) == [CrashTrakr_main.getSavedResults(60, job.getTestResults(60))]
+
+    jenkins.resetCounters()
+    assert CrashTrakr_main.resyncProject("P", 100) == {"missing": 0, "saved": 0, "failed": 0}
+    assert jenkins.getCounters()["requests"] == 0
+
+
+def test_downtime_gap_is_listed_in_bulk(store, jenkins):
+    writeConfig(jenkins, BulkImport=True)
+    store.appendBuilds("P", [(build, 50, 1, 0, 10) for build in range(1, 61)])
+
+    result = CrashTrakr_main.resyncProject("P", 100)
+
+    assert result == {"missing": 40, "saved": 40, "failed": 0}
+    assert jenkins.getCounters()["requests"] == 1
+    assert savedBuilds(store) == list(range(1, 101))
+
+
+def test_history_window_limits_the_resync(store, jenkins):
+    writeConfig(jenkins, SyncHistory=10)
+
+    assert CrashTrakr_main.resyncProject("P", 100)["saved"] == 10
+    assert savedBuilds(store) == list(range(91, 101))
+
+
+def test_failed_builds_are_retried_then_given_up_on(store, jenkins):
+    store.appendBuilds("P", [(build, 50, 1, 0, 10) for build in range(1, 98)])
+    jenkins.error_rate = 1.0
+
+    for attempt in range(3):
+        assert CrashTrakr_main.resyncProject("P", 100) == {"missing": 3, "saved": 0, "failed": 3}
+    assert store.summarizeBuilds("P")["errored_builds"] == 3
+    assert store.countFetchFailures("P", 3) == 0
+    assert CrashTrakr_main.resyncProject("P", 100)["missing"] == 0
+
+    jenkins.error_rate = 0.0
+    store.clearFetchFailures("P", [98, 99, 100])
+    assert CrashTrakr_main.resyncProject("P", 100) == {"missing": 3, "saved": 3, "failed": 0}
+    assert store.summarizeBuilds("P")["errored_builds"] == 0
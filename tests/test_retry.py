@@ -0,0 +1,96 @@
+import json
+import time
+
+import pytest
+
+import CrashTrakr_config
+import CrashTrakr_retry
+import fake_jenkins
+
+
+@pytest.fixture
+def jenkins(tmp_path, monkeypatch):
+    """A fake Jenkins server with two 10 build jobs, configured as projects P
+    and Q on the same server."""
+
+    monkeypatch.chdir(tmp_path)
+    server = fake_jenkins.FakeJenkins([fake_jenkins.FakeJob("Job", 10), fake_jenkins.FakeJob("Job2", 10)]).start()
+    with open("CrashConfig.json", mode="w") as config_file:
+        json.dump({"Servers": [{"Name": "fake", "Link": server.link}],
+                   "Projects": [{"Code": "P", "Link": "Job", "BuildToken": "token"},
+                                {"Code": "Q", "Link": "Job2", "BuildToken": "token"}]}, config_file)
+    monkeypatch.setattr(CrashTrakr_config, "_registry", CrashTrakr_config.ProjectRegistry())
+    yield server
+    server.stop()
+
+
+def waitFor(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def test_retry_is_triggered_and_followed(jenkins):
+    orchestrator = CrashTrakr_retry.RetryOrchestrator(min_interval=0, poll_interval=0.05)
+
+    assert orchestrator.request("P", 10)
+    assert not orchestrator.request("P", 10)
+    waitFor(lambda: not orchestrator.in_flight and not orchestrator.pending)
+
+    assert jenkins.jobs["Job"].builds == 11
+    assert orchestrator.retry_builds["P"] == 11
+    assert not orchestrator.request("P", 11)
+    assert orchestrator.request("P", 12)
+
+
+def test_retries_wait_for_the_minimum_interval(jenkins):
+    orchestrator = CrashTrakr_retry.RetryOrchestrator(min_interval=60, poll_interval=0.05)
+
+    orchestrator.request("P")
+    orchestrator.request("Q")
+    waitFor(lambda: "P" not in orchestrator.in_flight and jenkins.jobs["Job"].builds == 11)
+    time.sleep(0.2)
+
+    assert list(orchestrator.pending) == ["Q"]
+    assert jenkins.jobs["Job2"].builds == 10
+
+
+def test_retries_in_flight_are_limited_per_server(jenkins):
+    orchestrator = CrashTrakr_retry.RetryOrchestrator(max_in_flight=1, min_interval=0, poll_interval=0.05)
+    jenkins.hold_queue = True
+
+    orchestrator.request("P")
+    orchestrator.request("Q")
+    waitFor(lambda: jenkins.jobs["Job"].builds == 11)
+    time.sleep(0.2)
+
+    assert list(orchestrator.in_flight) == ["P"]
+    assert list(orchestrator.pending) == ["Q"]
+
+    jenkins.hold_queue = False
+    waitFor(lambda: not orchestrator.in_flight and not orchestrator.pending)
+    assert jenkins.jobs["Job2"].builds == 11
+
+
+def test_failed_trigger_ends_the_retry(jenkins):
+    orchestrator = CrashTrakr_retry.RetryOrchestrator(min_interval=0, poll_interval=0.05)
+    jenkins.jobs.pop("Job")
+
+    assert orchestrator.request("P")
+    waitFor(lambda: not orchestrator.in_flight and not orchestrator.pending)
+
+    assert orchestrator.request("P")
+
+
+def test_retries_are_only_queued_while_serving(jenkins, monkeypatch):
+    orchestrator = CrashTrakr_retry.RetryOrchestrator(min_interval=0, poll_interval=0.05)
+    monkeypatch.setattr(CrashTrakr_retry, "_orchestrator", orchestrator)
+    monkeypatch.setattr(CrashTrakr_retry, "_serving", False)
+
+    assert not CrashTrakr_retry.requestRetry("P")
+    assert not orchestrator.pending and not orchestrator.in_flight
+
+    CrashTrakr_retry.startServing()
+    assert CrashTrakr_retry.requestRetry("P")
+    waitFor(lambda: jenkins.jobs["Job"].builds == 11)
@@ -0,0 +1,104 @@
+import json
+import pickle
+
+import pytest
+
+
+def test_builds_are_read_newest_first(store):
+    store.appendBuilds("P", [(build, 100, build % 3, 0, 10) for build in range(1, 21)])
+
+    assert [row[0] for row in store.readBuilds("P", limit=3)] == [20, 19, 18]
+    assert [row[0] for row in store.readBuilds("P", first_build=5, last_build=7, newest_first=False)] == [5, 6, 7]
+    assert store.readBuilds("P", first_build=4, last_build=4) == [(4, 100, 1, 0, 10)]
+    assert store.lastBuildNumber("P") == 20
+    assert store.readBuilds("Q") == []
+
+
+def test_saving_a_build_again_replaces_it(store):
+    store.appendBuilds("P", [(1, 100, 10, 0, 10), (2, 100, 20, 0, 10)])
+    store.appendBuild("P", 2, 200, 50)
+
+    assert store.readBuilds("P") == [(2, 200, 50, -1, -1), (1, 100, 10, 0, 10)]
+
+
+def test_aggregates_follow_saved_builds(store):
+    store.appendBuilds("P", [(build, 100, 10, 0, 10) for build in range(10, 20)])
+    store.appendBuilds("P", [(build, 100, 30, 0, 10) for build in range(20, 25)])
+
+    assert store.readAggregates("P", 10, newest_first=False) == [
+        (19, 10, 0.1, 0.1, pytest.approx(0.1), 100.0, 10.0),
+        (24, 5, 0.3, 0.3, pytest.approx(0.3), 100.0, 30.0)]
+
+    store.appendBuild("P", 15, 100, 50)
+    last_build, count, min_rate, max_rate, mean_rate, mean_total, mean_failed = store.readAggregates("P", 10, newest_first=False)[0]
+    assert (count, min_rate, max_rate) == (10, 0.1, 0.5)
+    assert mean_failed == pytest.approx(14.0)
+
+    summary = store.summarizeBuilds("P")
+    assert (summary["builds"], summary["first_build"], summary["last_build"]) == (15, 10, 24)
+    assert summary["max_fail_rate"] == 0.5
+
+
+def test_errored_builds_are_left_out_of_aggregates(store):
+    store.appendBuilds("P", [(1, 100, 10, 0, 10), (2, -1, -1, -1, -1), (3, 100, 20, 0, 10)])
+
+    assert store.readAggregates("P", 10) == [(3, 2, 0.1, 0.2, pytest.approx(0.15), 100.0, 15.0)]
+    assert store.summarizeBuilds("P")["errored_builds"] == 1
+
+
+def test_revisions_tell_appends_from_rewrites(store):
+    assert (store.getRevision("P"), store.getRewriteRevision("P")) == (0, 0)
+
+    store.appendBuilds("P", [(1, 100, 10, 0, 10), (2, 100, 10, 0, 10)])
+    store.appendBuild("P", 3, 100, 10)
+    assert (store.getRevision("P"), store.getRewriteRevision("P")) == (2, 0)
+
+    store.appendBuild("P", 2, 100, 20)
+    assert (store.getRevision("P"), store.getRewriteRevision("P")) == (3, 3)
+    assert store.getRevision("Q") == 0
+
+
+def test_pickle_history_is_migrated_once(store, tmp_path):
+    with open("CrashTrakr_data_P", mode="wb") as data_file:
+        pickle.dump([[1, 100, 5], [2, 100, 6], ["3", 90, 7]], data_file)
+
+    assert store.readBuilds("P", newest_first=False) == [(1, 100, 5, -1, -1), (2, 100, 6, -1, -1), (3, 90, 7, -1, -1)]
+    assert not (tmp_path / "CrashTrakr_data_P").exists()
+    assert (tmp_path / "CrashTrakr_data_P.migrated").exists()
+    assert store.readAggregates("P", 10)[0][:2] == (3, 3)
+
+
+def test_missing_builds_cover_gaps_and_errors(store):
+    store.appendBuilds("P", [(build, 100, 1, 0, 10) for build in range(1, 21) if build not in (3, 4, 15)])
+    store.appendBuild("P", 10, -1, -1)
+
+    assert store.findMissingBuilds("P", 1, 25) == [3, 4, 10, 15, 21, 22, 23, 24, 25]
+    assert store.findMissingBuilds("P", 5, 14) == [10]
+    assert store.findMissingBuilds("Q", 1, 3) == [1, 2, 3]
+
+
+def test_builds_are_given_up_on_after_max_attempts(store):
+    store.recordFetchFailures("P", [3, 4])
+    store.recordFetchFailures("P", [3])
+
+    assert store.countFetchFailures("P") == 2
+    assert store.countFetchFailures("P", max_attempts=2) == 1
+    assert store.findMissingBuilds("P", 1, 5, max_attempts=2) == [1, 2, 4, 5]
+
+    store.clearFetchFailures("P", [3, 4])
+    assert store.countFetchFailures("P") == 0
+    assert store.findMissingBuilds("P", 1, 5, max_attempts=2) == [1, 2, 3, 4, 5]
+
+
+def test_last_seen_builds_of_other_writers_are_kept(store):
+    store.appendBuild("P", 7, 100, 1)
+    assert store.getLastSeenBuild("P") == 7
+    assert store.getLastSeenBuild("Q") == 0
+
+    store.setLastSeenBuild("P", 8)
+    with open(store.STATE_FILE, mode="w") as state_file:
+        json.dump({"P": 8, "Q": 3}, state_file)
+    store.setLastSeenBuild("R", 1)
+
+    with open(store.STATE_FILE) as state_file:
+        assert json.load(state_file) == {"P": 8, "Q": 3, "R": 1}